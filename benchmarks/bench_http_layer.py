@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark da camada HTTP contra o emulador local da API do IBGE
+
+Exercita `make_request_with_retry`, o coletor (`collect_population_data`),
+`IBGEAPIClient` e `DataManager` com latência, erros e rajadas de 503
+injetados, e reporta vazão, latência p50/p99 e o custo das novas tentativas
+(requisições extras enviadas ao servidor por chamada).
+
+Com --max-p99-ms ou --max-retry-overhead o script termina com código 1
+quando algum cenário ultrapassa o limite (uso em CI).
+
+Uso:
+    python benchmarks/bench_http_layer.py --calls 200 --concurrency 8 --latency-ms 20 --error-rate 0.02
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.ibge_emulator import EmulatorConfig, IBGEEmulator
+
+
+def run_scenario(name, call, emulator, calls, concurrency):
+    """Executa `call` `calls` vezes em paralelo e coleta as métricas do cenário"""
+    emulator.reset_stats()
+    latencies = []
+    failures = 0
+
+    def timed_call(_):
+        start = time.perf_counter()
+        try:
+            ok = call() is not None
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    # Os módulos medidos imprimem muito: descartar a saída durante a medição
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for elapsed, ok in executor.map(timed_call, range(calls)):
+                latencies.append(elapsed)
+                failures += not ok
+        wall = time.perf_counter() - start
+
+    server = emulator.stats()
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'scenario': name,
+        'calls': calls,
+        'failures': failures,
+        'throughput_per_s': calls / wall,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'server_requests': server['requests'],
+        'retry_overhead': server['requests'] / calls - 1,
+        'status': server['status'],
+        'mb_transferred': server['bytes_sent'] / 1024 ** 2
+    }
+
+
+def build_scenarios(base_url, work_dir):
+    """Cenários medidos (importa os módulos já apontando para o emulador)"""
+    from src.data import collect_ibge_data
+    from src.data.api_client import IBGEAPIClient, DataManager, DataCache
+    import streamlit as st
+    from streamlit.logger import set_log_level
+
+    # Avisos do Streamlit fora de uma sessão (st.warning etc.) não interessam aqui;
+    # a configuração é carregada antes para não restaurar o nível padrão depois
+    st.get_option('logger.level')
+    set_log_level('error')
+
+    client = IBGEAPIClient()
+    manager = DataManager()
+    manager.cache = DataCache(os.path.join(work_dir, 'cache'))
+
+    return [
+        ('make_request_with_retry (estados)',
+         lambda: collect_ibge_data.make_request_with_retry(f"{base_url}/v1/localidades/estados")),
+        ('make_request_with_retry (agregados N6)',
+         lambda: collect_ibge_data.make_request_with_retry(
+             f"{base_url}/v3/agregados/6579/periodos/2023/variaveis/9324?localidades=N6[all]")),
+        ('collect_population_data', collect_ibge_data.collect_population_data),
+        ('IBGEAPIClient.get_population_by_state', lambda: client.get_population_by_state(2023)),
+        ('DataManager.get_population_data', lambda: manager.get_population_data(2023, use_cache=False))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da camada HTTP com o emulador do IBGE")
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--burst-every', type=int, default=100)
+    parser.add_argument('--burst-length', type=int, default=3)
+    parser.add_argument('--municipios', type=int, default=5570)
+    parser.add_argument('--retry-backoff', type=float, default=0.05, help="espera entre tentativas (s)")
+    parser.add_argument('--json', help="grava os resultados neste arquivo")
+    parser.add_argument('--max-p99-ms', type=float, help="falha se algum cenário passar deste p99")
+    parser.add_argument('--max-retry-overhead', type=float, help="falha se algum cenário passar deste custo de retentativas")
+    args = parser.parse_args()
+
+    config = EmulatorConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        burst_every=args.burst_every, burst_length=args.burst_length, n_municipios=args.municipios
+    )
+
+    with IBGEEmulator(config=config) as emulator, tempfile.TemporaryDirectory() as work_dir:
+        # Configuração lida na importação dos módulos do projeto
+        os.environ['IBGE_API_BASE_URL'] = emulator.base_url
+        os.environ['IBGE_RETRY_BACKOFF'] = str(args.retry_backoff)
+        print(f"🛰️ Emulador em {emulator.base_url} | latência {args.latency_ms:g}±{args.jitter_ms:g} ms | "
+              f"erros {args.error_rate:.0%} | rajadas de 503: {args.burst_length}/{args.burst_every}")
+        print(f"🧪 {args.calls} chamadas por cenário, {args.concurrency} em paralelo\n")
+
+        results = []
+        cwd = os.getcwd()
+        # O coletor e o cache gravam em caminhos relativos: isolar no diretório temporário
+        os.chdir(work_dir)
+        try:
+            scenarios = build_scenarios(emulator.base_url, work_dir)
+            for name, call in scenarios:
+                result = run_scenario(name, call, emulator, args.calls, args.concurrency)
+                results.append(result)
+                print(
+                    f"  {name:<42} {result['throughput_per_s']:8.1f} ch/s | "
+                    f"p50 {result['p50_ms']:8.1f} ms | p99 {result['p99_ms']:8.1f} ms | "
+                    f"retentativas +{result['retry_overhead']:.1%} | falhas {result['failures']} | "
+                    f"{result['mb_transferred']:.1f} MB"
+                )
+        finally:
+            os.chdir(cwd)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados salvos em: {args.json}")
+
+    regressions = [
+        result['scenario'] for result in results
+        if (args.max_p99_ms is not None and result['p99_ms'] > args.max_p99_ms)
+        or (args.max_retry_overhead is not None and result['retry_overhead'] > args.max_retry_overhead)
+    ]
+    if regressions:
+        print(f"\n❌ Limites ultrapassados: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark da normalização e do casamento de nomes de municípios
+
+Gera uma dimensão de municípios com nomes no estilo brasileiro (repetidos
+entre UFs) e uma carga de consultas com variações reais de digitação:
+nomes sem acento, em caixa alta e com erros de digitação. Mede a vazão
+(nomes/s) de cada etapa: normalização (fria e memoizada), casamento exato
+por nome normalizado + UF e busca aproximada só para os resíduos.
+
+Uso:
+    python benchmarks/bench_name_matching.py --names 100000 --municipios 5570
+"""
+
+import argparse
+import os
+import sys
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.data import name_matching
+from src.data.localidades import LocalidadesDimension, UFS_REFERENCIA, UF_COLUMNS
+
+PREFIXOS = ['São', 'Santa', 'Santo Antônio', 'Nova', 'Bom Jesus', 'Porto', 'Campo', 'Vila', 'Alto', 'Barra',
+            'Conceição', 'Lagoa', 'Serra', 'Ribeirão', 'Monte', 'Palmeira', 'Boa Vista', 'Água', 'Cachoeira', 'Poço']
+NUCLEOS = ['Paraíso', 'Esperança', 'Alegre', 'Verde', 'Branco', 'Grande', 'Floresta', 'Jardim', 'Bonito', 'Feliz',
+           'Itaúna', 'Guaraí', 'Jacaré', 'Araçá', 'Tabocas', 'Angico', 'Cedro', 'Jatobá', 'Ipê', 'Buriti',
+           'Canaã', 'Piranhas', 'Timbó', 'Mangabeira', 'Juazeiro']
+SUFIXOS = ['', ' do Norte', ' do Sul', " d'Oeste", ' da Serra', ' dos Campos', ' do Piauí', ' Velho', ' Novo']
+
+
+def build_dimension(n_municipios, seed=42):
+    """Dimensão com as 27 UFs e `n_municipios` nomes sorteados (únicos na UF, repetidos entre UFs)"""
+    rng = np.random.default_rng(seed)
+    combinations = np.array([f"{p} {n}{s}" for p in PREFIXOS for n in NUCLEOS for s in SUFIXOS], dtype=object)
+    rows = []
+    per_uf = -(-n_municipios // len(UFS_REFERENCIA))
+    for uf_id, sigla, _, _ in UFS_REFERENCIA:
+        names = rng.choice(combinations, size=min(per_uf, len(combinations)), replace=False)
+        rows.extend((uf_id * 100000 + i * 10 + 1, name, uf_id, sigla) for i, name in enumerate(names))
+    municipios = pd.DataFrame(rows[:n_municipios], columns=['id', 'nome', 'uf_id', 'sigla'])
+    return LocalidadesDimension(pd.DataFrame(UFS_REFERENCIA, columns=UF_COLUMNS), municipios)
+
+
+def strip_accents(name):
+    return unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+
+
+def typo(name, rng):
+    """Um erro de digitação: troca, omissão ou duplicação de uma letra"""
+    position = int(rng.integers(1, len(name) - 1))
+    kind = rng.integers(3)
+    if kind == 0:
+        return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+    if kind == 1:
+        return name[:position] + name[position + 1:]
+    return name[:position] + name[position] + name[position:]
+
+
+def build_queries(dimension, n_names, typo_share=0.1, seed=7):
+    """Consultas (nome, UF, código esperado) com variações de grafia"""
+    rng = np.random.default_rng(seed)
+    municipios = dimension.municipios
+    sample = municipios.iloc[rng.integers(len(municipios), size=n_names)].reset_index(drop=True)
+    names = sample['nome'].to_numpy(dtype=object).copy()
+
+    variant = rng.random(n_names)
+    for i in np.flatnonzero(variant < 0.3):
+        names[i] = strip_accents(names[i])
+    for i in np.flatnonzero((variant >= 0.3) & (variant < 0.5)):
+        names[i] = names[i].upper()
+    for i in np.flatnonzero(variant >= 1 - typo_share):
+        names[i] = typo(names[i], rng)
+    return pd.Series(names), sample['sigla'], sample['id']
+
+
+def timed_run(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de normalização e casamento de nomes")
+    parser.add_argument('--names', type=int, default=100_000)
+    parser.add_argument('--municipios', type=int, default=5570)
+    parser.add_argument('--typos', type=float, default=0.1, help="fração de consultas com erro de digitação")
+    args = parser.parse_args()
+
+    dimension = build_dimension(args.municipios)
+    names, ufs, expected = build_queries(dimension, args.names, args.typos)
+    print(f"📐 {len(names):,} consultas contra {len(dimension.municipios):,} municípios "
+          f"({names.nunique():,} grafias distintas)")
+
+    name_matching._normalized_memo.clear()
+    _, cold = timed_run(lambda: name_matching.normalize_names(names))
+    _, warm = timed_run(lambda: name_matching.normalize_names(names))
+    _, per_row = timed_run(lambda: names.map(name_matching.normalize_name))
+
+    exact, exact_time = timed_run(lambda: dimension.codes_for_names(names, 'municipio', ufs))
+    _, index_time = timed_run(lambda: [dimension._fuzzy_index('municipio', sigla) for sigla in ufs.unique()])
+    fuzzy, fuzzy_time = timed_run(lambda: dimension.codes_for_names(names, 'municipio', ufs, fuzzy=True))
+    residuals = int(exact.isna().sum())
+
+    def rate(seconds, count=len(names)):
+        return f"{count / seconds:>12,.0f} nomes/s ({seconds * 1000:8.1f} ms)"
+
+    print(f"  normalização por linha (referência): {rate(per_row)}")
+    print(f"  normalização vetorizada (fria):      {rate(cold)}")
+    print(f"  normalização memoizada:              {rate(warm)}")
+    print(f"  casamento exato (nome + UF):         {rate(exact_time)}")
+    print(f"  exato + aproximado nos resíduos:     {rate(fuzzy_time)}")
+    if residuals:
+        print(f"  aproximado, só os resíduos:          {rate(max(fuzzy_time - exact_time, 1e-9), residuals)}")
+    print(f"  montagem dos índices de n-gramas (uma vez por UF): {index_time * 1000:.1f} ms")
+
+    exact_hits = exact.notna()
+    fuzzy_hits = fuzzy.notna() & ~exact_hits
+    correct = (fuzzy[fuzzy_hits] == expected[fuzzy_hits]).sum()
+    print(f"  casados exatamente:  {exact_hits.mean():7.2%} (corretos: {(exact[exact_hits] == expected[exact_hits]).mean():.2%})")
+    print(f"  casados aproximados: {fuzzy_hits.sum():,} de {residuals:,} resíduos "
+          f"(corretos: {correct / max(fuzzy_hits.sum(), 1):.2%})")
+    print(f"  sem correspondência: {fuzzy.isna().sum():,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark do reprocessamento offline (arquivo de dados brutos → parsers)
+
+Monta um arquivo temporário com respostas no formato da API (lista de
+estados e agregados municipais de vários anos, cada coleta repetida
+algumas vezes como nas coletas diárias) e mede o reprocessamento com 1 e
+com N processos (limitado ao número de CPUs da máquina).
+
+Uso:
+    python benchmarks/bench_replay.py --collections 24 --municipios 5570 --repeats 3 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.ibge_emulator import build_agregados_payload, build_estados_payload
+from src.data.raw_archive import RawArchive
+from src.data.replay import replay
+
+
+def build_archive(base_dir, collections, municipios, repeats):
+    """Arquivo com `collections` payloads distintos, cada um coletado `repeats` vezes"""
+    archive = RawArchive(base_dir=base_dir)
+    start = datetime(2025, 1, 1)
+    for index in range(collections):
+        if index % 2 == 0:
+            endpoint, payload = 'localidades_estados', build_estados_payload()
+            payload[0]['nome'] += f" ({index})"  # conteúdo distinto por coleta
+        else:
+            endpoint = 'agregados_6579'
+            payload = build_agregados_payload('6579', str(2000 + index), '9324', 'N6[all]', municipios)
+        for repeat in range(repeats):
+            archive.put(payload, endpoint, fetched_at=start + timedelta(hours=index * repeats + repeat))
+    return archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do reprocessamento offline")
+    parser.add_argument('--collections', type=int, default=24, help="payloads distintos")
+    parser.add_argument('--municipios', type=int, default=5570)
+    parser.add_argument('--repeats', type=int, default=3, help="coletas com o mesmo conteúdo")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        archive = build_archive(base_dir, args.collections, args.municipios, args.repeats)
+        stats = archive.stats()
+        print(f"📐 {stats['coletas']} coletas, {stats['blobs']} blobs distintos: "
+              f"{stats['bytes_coletados'] / 1e6:.1f} MB de JSON → {stats['bytes_armazenados'] / 1e6:.2f} MB armazenados")
+
+        print(f"   CPUs disponíveis: {os.cpu_count()}")
+        for workers in sorted({1, min(args.workers, os.cpu_count() or 1)}):
+            start = time.perf_counter()
+            results = replay(max_workers=workers, archive=archive)
+            elapsed = time.perf_counter() - start
+            records = sum(len(result['records']) for result in results)
+            print(f"  {workers} processo(s): {elapsed * 1000:8.1f} ms "
+                  f"({stats['bytes_coletados'] / 1e6 / elapsed:6.1f} MB/s de JSON, {records:,} registros)")
+
+
+if __name__ == "__main__":
+    main()
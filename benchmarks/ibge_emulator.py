@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Emulador local da API de serviços de dados do IBGE
+
+Reproduz os endpoints usados pelo projeto, com latência, taxa de erros,
+rajadas de 503 e tamanho de payload configuráveis:
+
+    /api/v1/localidades/estados
+    /api/v1/localidades/municipios
+    /api/v3/agregados/<agregado>/periodos/<período>/variaveis/<variável>?localidades=N3[all]|N6[all]
+    /api/v1/projecoes/populacao[/<localidade>]
+
+Para apontar o projeto para o emulador, defina IBGE_API_BASE_URL antes de
+importar os módulos (ex.: http://127.0.0.1:8765/api).
+
+Uso:
+    python benchmarks/ibge_emulator.py --port 8765 --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# (id, sigla, nome, região, população 2022)
+ESTADOS = [
+    (11, 'RO', 'Rondônia', 'Norte', 1815695), (12, 'AC', 'Acre', 'Norte', 907005),
+    (13, 'AM', 'Amazonas', 'Norte', 4229217), (14, 'RR', 'Roraima', 'Norte', 619805),
+    (15, 'PA', 'Pará', 'Norte', 8778625), (16, 'AP', 'Amapá', 'Norte', 869739),
+    (17, 'TO', 'Tocantins', 'Norte', 1607630), (21, 'MA', 'Maranhão', 'Nordeste', 7172653),
+    (22, 'PI', 'Piauí', 'Nordeste', 3305353), (23, 'CE', 'Ceará', 'Nordeste', 9242132),
+    (24, 'RN', 'Rio Grande do Norte', 'Nordeste', 3551853), (25, 'PB', 'Paraíba', 'Nordeste', 4061427),
+    (26, 'PE', 'Pernambuco', 'Nordeste', 9676171), (27, 'AL', 'Alagoas', 'Nordeste', 3365729),
+    (28, 'SE', 'Sergipe', 'Nordeste', 2338948), (29, 'BA', 'Bahia', 'Nordeste', 15050284),
+    (31, 'MG', 'Minas Gerais', 'Sudeste', 21411923), (32, 'ES', 'Espírito Santo', 'Sudeste', 4074920),
+    (33, 'RJ', 'Rio de Janeiro', 'Sudeste', 17463349), (35, 'SP', 'São Paulo', 'Sudeste', 46649132),
+    (41, 'PR', 'Paraná', 'Sul', 11677936), (42, 'SC', 'Santa Catarina', 'Sul', 7289000),
+    (43, 'RS', 'Rio Grande do Sul', 'Sul', 11468735), (50, 'MS', 'Mato Grosso do Sul', 'Centro-Oeste', 2829302),
+    (51, 'MT', 'Mato Grosso', 'Centro-Oeste', 3567974), (52, 'GO', 'Goiás', 'Centro-Oeste', 7140020),
+    (53, 'DF', 'Distrito Federal', 'Centro-Oeste', 3122193)
+]
+REGIOES = {'Norte': (1, 'N'), 'Nordeste': (2, 'NE'), 'Sudeste': (3, 'SE'), 'Sul': (4, 'S'), 'Centro-Oeste': (5, 'CO')}
+NIVEIS = {'N1': 'Brasil', 'N2': 'Grande Região', 'N3': 'Unidade da Federação', 'N6': 'Município'}
+
+ROUTES = [
+    ('estados', re.compile(r'^/api/v1/localidades/estados/?$')),
+    ('municipios', re.compile(r'^/api/v1/localidades/municipios/?$')),
+    ('agregados', re.compile(r'^/api/v3/agregados/(\d+)/periodos/([^/]+)/variaveis/([^/]+)/?$')),
+    ('projecoes', re.compile(r'^/api/v1/projecoes/populacao(?:/(\w+))?/?$'))
+]
+
+
+class EmulatorConfig:
+    """Parâmetros de comportamento do emulador"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 burst_every=0, burst_length=0, n_municipios=5570, seed=42):
+        """
+        Args:
+            latency_ms (float): latência base de cada resposta
+            jitter_ms (float): variação aleatória somada à latência (0..jitter)
+            error_rate (float): probabilidade de responder 500
+            burst_every (int): a cada N requisições inicia uma rajada de 503 (0 desliga)
+            burst_length (int): número de requisições 503 em cada rajada
+            n_municipios (int): tamanho da resposta de agregados com localidades=N6[all]
+            seed (int): semente do gerador aleatório
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.n_municipios = n_municipios
+        self.seed = seed
+
+
+def _localidades(nivel, n_municipios):
+    """Localidades (id, nome, população) do nível pedido"""
+    if nivel == 'N6':
+        rng = random.Random(nivel)
+        municipios = []
+        for index in range(n_municipios):
+            estado = ESTADOS[index % len(ESTADOS)]
+            code = estado[0] * 100000 + index // len(ESTADOS) * 10 + 1
+            municipios.append((code, f"Município {index} ({estado[1]})", int(rng.lognormvariate(9.5, 1.2))))
+        return municipios
+    if nivel == 'N1':
+        return [(1, 'Brasil', sum(estado[4] for estado in ESTADOS))]
+    return [(estado[0], estado[2], estado[4]) for estado in ESTADOS]
+
+
+def build_estados_payload():
+    """Resposta de /localidades/estados"""
+    return [
+        {
+            'id': code,
+            'sigla': sigla,
+            'nome': nome,
+            'regiao': {'id': REGIOES[regiao][0], 'sigla': REGIOES[regiao][1], 'nome': regiao}
+        }
+        for code, sigla, nome, regiao, _ in ESTADOS
+    ]
+
+
+def build_municipios_payload(n_municipios):
+    """Resposta de /localidades/municipios (mesmos códigos de agregados com N6; 10 municípios por microrregião)"""
+    ufs = {estado[0]: estado for estado in ESTADOS}
+    payload = []
+    for index, (code, nome, _) in enumerate(_localidades('N6', n_municipios)):
+        uf_id, sigla, uf_nome, regiao, _ = ufs[code // 100000]
+        uf = {
+            'id': uf_id, 'sigla': sigla, 'nome': uf_nome,
+            'regiao': {'id': REGIOES[regiao][0], 'sigla': REGIOES[regiao][1], 'nome': regiao}
+        }
+        micro_index = index // len(ESTADOS) // 10 + 1
+        payload.append({
+            'id': code,
+            'nome': nome,
+            'microrregiao': {
+                'id': uf_id * 1000 + micro_index,
+                'nome': f"Microrregião {micro_index} ({sigla})",
+                'mesorregiao': {'id': uf_id * 100 + 1, 'nome': f"Mesorregião ({sigla})", 'UF': uf}
+            }
+        })
+    return payload
+
+
+def build_agregados_payload(agregado, periodos, variaveis, localidades, n_municipios):
+    """Resposta de /agregados no formato da API v3 (uma série por localidade)"""
+    nivel = re.match(r'(N\d+)', localidades or 'N3').group(1)
+    anos = [periodo for periodo in re.split(r'[|,]', periodos) if periodo]
+    return [
+        {
+            'id': variavel,
+            'variavel': 'População residente',
+            'unidade': 'Pessoas',
+            'resultados': [{
+                'classificacoes': [],
+                'series': [
+                    {
+                        'localidade': {'id': str(code), 'nivel': {'id': nivel, 'nome': NIVEIS.get(nivel, nivel)}, 'nome': nome},
+                        'serie': {ano: str(populacao) for ano in anos}
+                    }
+                    for code, nome, populacao in _localidades(nivel, n_municipios)
+                ]
+            }]
+        }
+        for variavel in variaveis.split('|')
+    ]
+
+
+def build_projecoes_payload(localidade):
+    """Resposta de /projecoes/populacao"""
+    total = sum(estado[4] for estado in ESTADOS)
+    return {
+        'localidade': localidade or 'BR',
+        'horario': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+        'projecao': {
+            'populacao': total,
+            'periodoMedio': {'incrementoPopulacional': 19, 'nascimento': 21, 'obito': 54}
+        }
+    }
+
+
+class _EmulatorHandler(BaseHTTPRequestHandler):
+    """Atende as requisições consultando o emulador dono do servidor"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, body = self.server.emulator.handle(self.path)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Sem log por requisição (distorce as medições)
+        pass
+
+
+class IBGEEmulator:
+    """Servidor HTTP local que imita a API do IBGE"""
+
+    def __init__(self, host='127.0.0.1', port=0, config=None):
+        self.config = config or EmulatorConfig()
+        self._server = ThreadingHTTPServer((host, port), _EmulatorHandler)
+        self._server.daemon_threads = True
+        self._server.emulator = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._payloads = {}
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        """URL base a usar em IBGE_API_BASE_URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        """Inicia o servidor em uma thread de fundo"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerra o servidor"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        """Zera os contadores de requisições"""
+        with self._lock:
+            self._requests = 0
+            self._status = Counter()
+            self._bytes_sent = 0
+
+    def stats(self):
+        """Contadores desde o último reset: requisições, status e bytes enviados"""
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'status': dict(self._status),
+                'bytes_sent': self._bytes_sent
+            }
+
+    def _payload(self, route, match, query):
+        """JSON serializado da rota (montado uma vez e reaproveitado)"""
+        localidades = query.get('localidades', [''])[0]
+        key = (route, match.groups(), localidades)
+        if key not in self._payloads:
+            if route == 'estados':
+                data = build_estados_payload()
+            elif route == 'municipios':
+                data = build_municipios_payload(self.config.n_municipios)
+            elif route == 'agregados':
+                data = build_agregados_payload(*match.groups(), localidades, self.config.n_municipios)
+            else:
+                data = build_projecoes_payload(match.group(1))
+            self._payloads[key] = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return self._payloads[key]
+
+    def _injected_failure(self):
+        """Decide se a requisição atual deve falhar (rajada de 503 ou erro 500)"""
+        config = self.config
+        with self._lock:
+            index = self._requests
+            self._requests += 1
+            if config.burst_every and index % config.burst_every < config.burst_length:
+                return 503
+            if config.error_rate and self._rng.random() < config.error_rate:
+                return 500
+            delay = config.latency_ms + self._rng.random() * config.jitter_ms
+        if delay:
+            time.sleep(delay / 1000)
+        return None
+
+    def handle(self, path):
+        """Processa uma requisição GET e retorna (status, corpo)"""
+        failure = self._injected_failure()
+        if failure:
+            status, body = failure, json.dumps({'erro': 'falha simulada'}).encode('utf-8')
+        else:
+            parts = urlsplit(path)
+            status, body = 404, b'{"erro": "rota desconhecida"}'
+            for route, pattern in ROUTES:
+                match = pattern.match(parts.path)
+                if match:
+                    status, body = 200, self._payload(route, match, parse_qs(parts.query))
+                    break
+
+        with self._lock:
+            self._status[status] += 1
+            self._bytes_sent += len(body)
+        return status, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulador local da API do IBGE")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--burst-every', type=int, default=0)
+    parser.add_argument('--burst-length', type=int, default=0)
+    parser.add_argument('--municipios', type=int, default=5570)
+    args = parser.parse_args()
+
+    config = EmulatorConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        burst_every=args.burst_every, burst_length=args.burst_length, n_municipios=args.municipios
+    )
+    with IBGEEmulator(args.host, args.port, config) as emulator:
+        print(f"🛰️ Emulador do IBGE em {emulator.base_url} (Ctrl+C para encerrar)")
+        print(f"   export IBGE_API_BASE_URL={emulator.base_url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"\n📊 {emulator.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Teste de carga: N sessões simultâneas do dashboard
+
+Compara o modo antigo (cada sessão com sua cópia do DataFrame + `df.copy()`
+a cada rerun) com a camada compartilhada (`SharedPopulationDataset`), medindo
+o RSS do processo e a latência por rerun. A camada compartilhada é medida
+nos dois caminhos: arrays em memória (`from_dataframe`) e arrays mapeados de
+disco (`save` + `np.load(mmap_mode='r')`, o caminho usado pelo dashboard).
+
+Uso:
+    python benchmarks/load_test_sessions.py --sessions 50 --locations 5570
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.data.shared_store import SharedPopulationDataset
+from benchmarks.synthetic import REGIONS, YEARS, synthetic_panel
+
+
+def current_rss_mb():
+    """RSS atual do processo em MB (Linux: /proc; demais: pico via resource)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS informa em bytes, Linux em KB
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def rerun_copy_mode(session_state, df, year, region):
+    """Um rerun no modo antigo: cópia completa + máscaras booleanas"""
+    filtered_df = df.copy()
+    filtered_df = filtered_df[filtered_df['ano'] == year]
+    if region != 'Todas':
+        filtered_df = filtered_df[filtered_df['regiao'] == region]
+    session_state['filtered_df'] = filtered_df
+    return filtered_df['populacao'].sum(), filtered_df.groupby('regiao')['populacao'].sum()
+
+
+def rerun_shared_mode(session_state, dataset, year, region):
+    """Um rerun usando fatias sem cópia dos dados compartilhados"""
+    filtered_df = dataset.frame(ano=year, regiao=None if region == 'Todas' else region)
+    session_state['filtered_df'] = filtered_df
+    return filtered_df['populacao'].sum(), filtered_df.groupby('regiao', observed=True)['populacao'].sum()
+
+
+def run_sessions(mode, panel, n_sessions, reruns, shared_dir=None):
+    """Simula N sessões simultâneas, cada uma com `reruns` interações"""
+    sessions = [{} for _ in range(n_sessions)]
+    latencies = []
+    latencies_lock = threading.Lock()
+    rss_before = current_rss_mb()
+
+    start = time.perf_counter()
+    if mode == 'copy':
+        # Cada sessão recebia sua própria cópia de st.cache_data
+        for state in sessions:
+            state['df'] = panel.copy()
+        shared = None
+    elif mode == 'mmap':
+        # Arrays já publicados em disco: só o mapeamento é feito aqui
+        shared = SharedPopulationDataset.load(shared_dir, mmap_mode='r')
+    else:
+        shared = SharedPopulationDataset.from_dataframe(panel)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    def session_worker(index):
+        rng = np.random.default_rng(index)
+        state = sessions[index]
+        for _ in range(reruns):
+            year = int(rng.choice(YEARS))
+            region = rng.choice(['Todas'] + REGIONS)
+            start = time.perf_counter()
+            if mode == 'copy':
+                rerun_copy_mode(state, state['df'], year, region)
+            else:
+                rerun_shared_mode(state, shared, year, region)
+            elapsed = time.perf_counter() - start
+            with latencies_lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=session_worker, args=(i,)) for i in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rss_after = current_rss_mb()
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'mode': mode,
+        'load_ms': load_ms,
+        'rss_delta_mb': rss_after - rss_before,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'reruns': len(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga de sessões do dashboard")
+    parser.add_argument('--sessions', type=int, default=30)
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--locations', type=int, default=5570)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.sessions} sessões × {args.reruns} reruns, {args.locations} locais × {len(YEARS)} anos")
+    panel = synthetic_panel(args.locations)
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        # Publicado antes da medição, como faria o primeiro processo do servidor
+        shared_dir = SharedPopulationDataset.from_dataframe(panel).save(base_dir)
+
+        # mmap primeiro: o RSS das medições seguintes não volta ao sistema
+        for mode in ('mmap', 'shared', 'copy'):
+            result = run_sessions(mode, panel, args.sessions, args.reruns, shared_dir)
+            print(
+                f"  {result['mode']:>6}: carga {result['load_ms']:8.1f} ms | "
+                f"ΔRSS {result['rss_delta_mb']:8.1f} MB | "
+                f"p50 {result['p50_ms']:7.2f} ms | p99 {result['p99_ms']:7.2f} ms | "
+                f"{result['reruns']} reruns"
+            )
+
+
+if __name__ == "__main__":
+    main()
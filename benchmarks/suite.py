@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks (micro e macro) com histórico de resultados
+
+Mede limpeza, validação, cada método do `PopulationAnalyzer`, a montagem do
+painel histórico do dashboard, os passos de filtro/agregação do dashboard,
+a agregação/checagem pela hierarquia geográfica, a autocorrelação espacial
+(Moran/Gi* com permutações), a projeção por coortes e a detecção de
+alterações entre coletas em painéis sintéticos de tamanho configurável
+(nível UF ou municipal).
+
+Cada execução é acrescentada a benchmarks/results/history.jsonl com o commit,
+a data e as versões das bibliotecas, e comparada com a execução anterior do
+mesmo benchmark/tamanho para apontar regressões. Com --plot gera as curvas
+de escala (tempo × linhas) da execução atual.
+
+Uso:
+    python benchmarks/suite.py --sizes uf,1000,5570
+    python benchmarks/suite.py --filter analysis. --sizes uf --repeat 3
+    python benchmarks/suite.py --fail-on-regression --threshold 1.3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from benchmarks.synthetic import YEARS, synthetic_level_panel, synthetic_yearly_records
+
+RESULTS_DIR = os.path.join(project_root, 'benchmarks', 'results')
+HISTORY_FILE = os.path.join(RESULTS_DIR, 'history.jsonl')
+
+# Os métodos pesados (modelos, figuras, testes por reamostragem) ficam limitados a painéis menores
+ANALYZER_METHODS = [
+    'basic_statistics', 'distribution_analysis', 'regional_analysis', 'correlation_analysis',
+    'growth_analysis', 'outlier_detection', 'predictive_modeling', 'plot_analysis'
+]
+MAX_ROWS = {
+    'analysis.predictive_modeling': 200_000,
+    'analysis.distribution_analysis': 100_000,
+    'analysis.plot_analysis': 100_000,
+    'analysis.regional_analysis': 10_000,
+    'analysis.correlation_analysis': 10_000
+}
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registra uma fábrica de benchmark: recebe o painel e devolve a função medida
+
+    Recursos da preparação (diretórios temporários etc.) ficam no atributo
+    `cleanup` da função, chamado pela suíte depois da medição.
+    """
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+@benchmark('cleaning.clean_population_data')
+def bench_clean(panel):
+    from src.data.data_cleaning import clean_population_data
+    return lambda: clean_population_data(panel)
+
+
+@benchmark('cleaning.validate_data_quality')
+def bench_validate(panel):
+    from src.data.data_cleaning import validate_data_quality
+    return lambda: validate_data_quality(panel)
+
+
+def _analyzer_benchmark(method):
+    def factory(panel):
+        from src.analytics.statistical_analysis import PopulationAnalyzer
+        from src.analytics.figure_cache import get_figure_cache
+        from src.analytics.derived_metrics import get_derived_metrics_store
+
+        analyzer = PopulationAnalyzer(panel)
+        analyzer.fingerprint  # calculado uma vez, fora da medição
+
+        def run():
+            # Sem caches aquecidos: mede o cálculo, não a consulta
+            get_figure_cache().clear()
+            get_derived_metrics_store().clear()
+            result = getattr(analyzer, method)()
+            if method == 'plot_analysis':
+                plt.close(result)
+            return result
+        return run
+    return factory
+
+
+for _method in ANALYZER_METHODS:
+    benchmark(f'analysis.{_method}')(_analyzer_benchmark(_method))
+
+
+@benchmark('dashboard.build_historical_panel')
+def bench_historical_panel(panel):
+    from src.data.panel import build_historical_panel
+    df_base = panel.drop_duplicates('nome')[['id', 'sigla', 'nome', 'regiao']]
+    yearly_records = synthetic_yearly_records(panel)
+    return lambda: build_historical_panel(df_base, yearly_records)
+
+
+@benchmark('dashboard.shared_dataset_build')
+def bench_shared_build(panel):
+    from src.data.shared_store import SharedPopulationDataset
+    return lambda: SharedPopulationDataset.from_dataframe(panel)
+
+
+@benchmark('dashboard.filter_aggregate')
+def bench_filter_aggregate(panel):
+    from src.data.shared_store import SharedPopulationDataset
+    dataset = SharedPopulationDataset.from_dataframe(panel)
+    year = YEARS[-1]
+
+    def run():
+        # Mesmo trabalho de um rerun: filtro por ano/região + agregações dos gráficos
+        for region in [None] + dataset.regions():
+            filtered_df = dataset.frame(ano=year, regiao=region)
+            filtered_df['populacao'].sum()
+            filtered_df.groupby('regiao', observed=True)['populacao'].sum()
+            filtered_df.nlargest(10, 'populacao')
+    return run
+
+
+def _hierarchy_for(panel):
+    """Hierarquia compatível com o painel (municípios sintéticos recebem códigos do emulador)"""
+    from src.data.hierarchy import GeoHierarchy, uf_hierarchy
+    from benchmarks.ibge_emulator import build_municipios_payload
+
+    if panel['id'].isin(uf_hierarchy().codes['UF']).all():
+        return uf_hierarchy(), panel, 'UF'
+    ids, uniques = pd.factorize(panel['id'])
+    payload = build_municipios_payload(len(uniques))
+    codes = np.array([municipio['id'] for municipio in payload])
+    return GeoHierarchy.from_municipios(payload), panel.assign(id=codes[ids]), 'municipio'
+
+
+@benchmark('hierarchy.rollup')
+def bench_hierarchy_rollup(panel):
+    hierarchy, panel, level = _hierarchy_for(panel)
+    return lambda: hierarchy.rollup_frame(panel, 'populacao', level)
+
+
+@benchmark('hierarchy.check_consistency')
+def bench_hierarchy_consistency(panel):
+    hierarchy, panel, level = _hierarchy_for(panel)
+    reported = hierarchy.rollup_frame(panel, 'populacao', level)
+    return lambda: hierarchy.check_consistency(reported, 'populacao')
+
+
+def _spatial_inputs(panel):
+    """Último ano do painel e a vizinhança (tabela real das UFs ou grade sintética)"""
+    from benchmarks.synthetic import synthetic_adjacency
+    from src.analytics.spatial import SpatialWeights, load_adjacency
+
+    snapshot = panel[panel['ano'] == panel['ano'].max()].groupby('id')['populacao'].sum()
+    is_uf = snapshot.index.max() < 100
+    pairs = load_adjacency('UF') if is_uf else synthetic_adjacency(snapshot.index)
+    return snapshot, SpatialWeights.from_pairs(pairs, snapshot.index)
+
+
+@benchmark('spatial.moran_global')
+def bench_moran_global(panel):
+    from src.analytics.spatial import moran_global
+    snapshot, weights = _spatial_inputs(panel)
+    return lambda: moran_global(snapshot, weights)
+
+
+@benchmark('spatial.moran_local')
+def bench_moran_local(panel):
+    from src.analytics.spatial import moran_local
+    snapshot, weights = _spatial_inputs(panel)
+    return lambda: moran_local(snapshot, weights)
+
+
+@benchmark('spatial.getis_ord')
+def bench_getis_ord(panel):
+    from src.analytics.spatial import getis_ord
+    snapshot, weights = _spatial_inputs(panel)
+    return lambda: getis_ord(snapshot, weights)
+
+
+@benchmark('projection.cohort_component')
+def bench_cohort_projection(panel):
+    from src.analytics.projection import CohortProjection
+    projection = CohortProjection.from_panel(panel)
+    return lambda: projection.run(horizon=20)
+
+
+@benchmark('changes.diff')
+def bench_changes_diff(panel):
+    import tempfile
+    from src.data.change_capture import ChangeTracker
+
+    workdir = tempfile.TemporaryDirectory()
+    tracker = ChangeTracker('bench', keys=['id', 'ano'], base_dir=workdir.name)
+    tracker.commit(tracker.diff(panel))
+
+    # Coleta seguinte com ~1% das linhas alteradas
+    changed = panel.copy()
+    rows = np.random.default_rng(0).random(len(changed)) < 0.01
+    changed.loc[rows, 'populacao'] += 1
+
+    def run():
+        return tracker.diff(changed)
+    run.cleanup = workdir.cleanup
+    return run
+
+
+def measure(function, repeat, min_time=0.05):
+    """
+    Mede a função como no timeit: calibra o número de chamadas por amostra
+
+    Returns:
+        dict: mínimo, mediana e desvio (segundos por chamada), chamadas por amostra
+    """
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    number = max(1, int(min_time / first)) if first > 0 else 1
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        'min_s': min(samples),
+        'median_s': float(np.median(samples)),
+        'std_s': float(np.std(samples)),
+        'number': number
+    }
+
+
+def environment_info():
+    """Commit, data e versões usadas na execução"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=project_root,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__
+    }
+
+
+def load_history(path=HISTORY_FILE):
+    """Lê todas as execuções gravadas"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_results(history, machine):
+    """Último resultado de cada (benchmark, tamanho) na mesma máquina"""
+    previous = {}
+    for run in history:
+        if run['env'].get('machine') != machine:
+            continue
+        for result in run['results']:
+            previous[(result['benchmark'], result['size'])] = result
+    return previous
+
+
+def plot_scaling(results, path):
+    """Curvas de escala: mediana por chamada × número de linhas"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    names = sorted({result['benchmark'] for result in results})
+    for name in names:
+        points = sorted((r['rows'], r['median_s']) for r in results if r['benchmark'] == name)
+        if len(points) > 1:
+            ax.plot(*zip(*points), marker='o', label=name)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('Linhas do painel')
+    ax.set_ylabel('Tempo por chamada (s)')
+    ax.set_title('Curvas de escala dos benchmarks')
+    ax.legend(fontsize=7)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do projeto")
+    parser.add_argument('--sizes', default='uf,1000,5570', help="'uf' e/ou números de municípios")
+    parser.add_argument('--filter', default='', help="executa só benchmarks que contêm este texto")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=1.25, help="razão de tempo considerada regressão")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--no-save', action='store_true', help="não grava no histórico")
+    parser.add_argument('--plot', action='store_true', help="gera benchmarks/results/scaling.png")
+    parser.add_argument('--list', action='store_true', help="lista os benchmarks e sai")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+
+    env = environment_info()
+    previous = previous_results(load_history(), env['machine'])
+    selected = {name: factory for name, factory in BENCHMARKS.items() if args.filter in name}
+
+    print(f"⏱️ {len(selected)} benchmarks | tamanhos {args.sizes} | commit {env['commit']}")
+    results, regressions = [], []
+    for size in args.sizes.split(','):
+        panel = synthetic_level_panel(size)
+        print(f"\n📐 Tamanho {size}: {len(panel):,} linhas")
+        for name, factory in selected.items():
+            if len(panel) > MAX_ROWS.get(name, float('inf')):
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                function = factory(panel)
+                try:
+                    timing = measure(function, args.repeat)
+                finally:
+                    getattr(function, 'cleanup', lambda: None)()
+            result = {'benchmark': name, 'size': size, 'rows': len(panel), **timing}
+            results.append(result)
+
+            comparison = ''
+            before = previous.get((name, size))
+            if before:
+                ratio = result['median_s'] / before['median_s']
+                comparison = f" | {ratio:5.2f}x vs anterior"
+                if ratio > args.threshold:
+                    regressions.append(f"{name} [{size}] {ratio:.2f}x")
+                    comparison += " ⚠️"
+            print(f"  {name:<40} {result['median_s'] * 1000:10.2f} ms (mín {result['min_s'] * 1000:.2f}){comparison}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'env': env, 'results': results}, ensure_ascii=False) + '\n')
+        print(f"\n💾 Resultados acrescentados a {HISTORY_FILE}")
+
+    if args.plot:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        plot_path = os.path.join(RESULTS_DIR, 'scaling.png')
+        plot_scaling(results, plot_path)
+        print(f"📈 Curvas de escala: {plot_path}")
+
+    if regressions:
+        print(f"\n⚠️ Possíveis regressões (>{args.threshold:.2f}x): {'; '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
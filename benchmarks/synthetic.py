@@ -0,0 +1,86 @@
+"""
+Geradores de painéis sintéticos para testes de carga e benchmarks
+"""
+
+import numpy as np
+import pandas as pd
+
+REGIONS = ['Norte', 'Nordeste', 'Sudeste', 'Sul', 'Centro-Oeste']
+YEARS = list(range(2020, 2026))
+
+
+def synthetic_panel(n_locations, years=YEARS, seed=42):
+    """Gera um painel (local × ano) no formato usado pelo dashboard"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n_locations) + 1100000
+    base = rng.lognormal(mean=10, sigma=1.2, size=n_locations)
+    growth = rng.normal(loc=0.008, scale=0.01, size=n_locations)
+    regions = rng.choice(REGIONS, size=n_locations)
+
+    frames = []
+    for offset, year in enumerate(years):
+        frames.append(pd.DataFrame({
+            'id': ids,
+            'sigla': [f"L{i % 27:02d}" for i in range(n_locations)],
+            'nome': [f"Local {i}" for i in range(n_locations)],
+            'regiao': regions,
+            'ano': year,
+            'populacao': (base * (1 + growth) ** offset).astype('int64'),
+            'fonte': 'Sintético'
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_uf_panel(years=YEARS, seed=42):
+    """Painel no nível UF: as 27 unidades da federação reais com população sintética"""
+    from src.data.schema import REGIOES, SIGLAS_UF
+    from benchmarks.ibge_emulator import ESTADOS
+
+    rng = np.random.default_rng(seed)
+    growth = rng.normal(loc=0.006, scale=0.004, size=len(ESTADOS))
+    frames = []
+    for offset, year in enumerate(years):
+        frames.append(pd.DataFrame({
+            'id': [estado[0] for estado in ESTADOS],
+            'sigla': pd.Categorical([estado[1] for estado in ESTADOS], categories=SIGLAS_UF),
+            'nome': [estado[2] for estado in ESTADOS],
+            'regiao': pd.Categorical([estado[3] for estado in ESTADOS], categories=REGIOES),
+            'ano': year,
+            'populacao': (np.array([estado[4] for estado in ESTADOS]) * (1 + growth) ** offset).astype('int64'),
+            'fonte': 'Sintético'
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def synthetic_yearly_records(panel):
+    """Registros por ano no formato devolvido pela API ({'nome', 'populacao', 'fonte'})"""
+    return {
+        int(year): group[['nome', 'populacao', 'fonte']].to_dict('records')
+        for year, group in panel.groupby('ano')
+    }
+
+
+def synthetic_level_panel(level, years=YEARS, seed=42):
+    """Painel sintético por nível: 'uf' ou número de municípios (ex.: '5570')"""
+    if str(level).lower() == 'uf':
+        return synthetic_uf_panel(years, seed)
+    return synthetic_panel(int(level), years, seed)
+
+
+def synthetic_adjacency(codes):
+    """
+    Tabela de adjacência (origem, destino) de uma grade com vizinhança rainha
+
+    Substitui a malha municipal nos benchmarks: os códigos são dispostos em
+    uma grade quase quadrada, cada um vizinho das até 8 células ao redor.
+    """
+    codes = np.asarray(codes)
+    width = int(np.ceil(np.sqrt(len(codes))))
+    rows, cols = np.divmod(np.arange(len(codes)), width)
+    pairs = []
+    for d_row, d_col in [(0, 1), (1, -1), (1, 0), (1, 1)]:
+        target_row, target_col = rows + d_row, cols + d_col
+        target = target_row * width + target_col
+        valid = (target_col >= 0) & (target_col < width) & (target < len(codes))
+        pairs.append(pd.DataFrame({'origem': codes[valid], 'destino': codes[target[valid]]}))
+    return pd.concat(pairs, ignore_index=True)
@@ -1,18 +1,105 @@
 # Configurações para coleta de dados
 
-# URLs das APIs
-IBGE_POPULATION_URL = "https://servicodados.ibge.gov.br/api/v1/projecoes/populacao"
-IBGE_STATES_URL = "https://servicodados.ibge.gov.br/api/v1/localidades/estados"
+import os
+
+# URLs das APIs (IBGE_API_BASE_URL permite apontar para o emulador local)
+IBGE_API_BASE_URL = os.environ.get("IBGE_API_BASE_URL", "https://servicodados.ibge.gov.br/api").rstrip("/")
+IBGE_POPULATION_URL = f"{IBGE_API_BASE_URL}/v1/projecoes/populacao"
+IBGE_STATES_URL = f"{IBGE_API_BASE_URL}/v1/localidades/estados"
 
 # Configurações de arquivos
 RAW_DATA_PATH = "data/raw"
+RAW_ARCHIVE_PATH = "data/raw/archive"  # respostas brutas por hash de conteúdo (comprimidas)
+RAW_ARCHIVE_CODEC = os.environ.get("IBGE_RAW_CODEC", "auto")  # 'zstd', 'gzip' ou 'auto'
+REPLAY_MAX_WORKERS = 4  # processos do reprocessamento offline (src/data/replay.py)
 PROCESSED_DATA_PATH = "data/processed"
 EXTERNAL_DATA_PATH = "data/external"
 
 # Configurações de requisições
 REQUEST_TIMEOUT = 30  # segundos
 MAX_RETRIES = 3
+RETRY_BACKOFF = float(os.environ.get("IBGE_RETRY_BACKOFF", 2))  # segundos entre tentativas
 
 # Configurações de dados
 ENCODING = "utf-8"
-DATE_FORMAT = "%Y%m%d_%H%M%S"
\ No newline at end of file
+DATE_FORMAT = "%Y%m%d_%H%M%S"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Configurações de análises em segundo plano
+ANALYSIS_MAX_WORKERS = 2
+ANALYSIS_MAX_CACHED_JOBS = 16
+ANALYSIS_POLL_INTERVAL = 1.0  # segundos entre atualizações do progresso no dashboard
+
+# Testes por reamostragem (bootstrap e permutação) do analisador
+RESAMPLING_REPLICATES = 4999
+RESAMPLING_SEED = 42
+RESAMPLING_CONFIDENCE = 0.95
+RESAMPLING_MAX_WORKERS = 1  # processos para os blocos de réplicas
+RESAMPLING_BLOCK_SIZE = 2500  # réplicas por bloco (cada bloco com a sua semente derivada)
+RESAMPLING_CHUNK_ELEMENTS = 4_000_000  # limite de réplicas × observações por lote em memória
+
+# Análise espacial: tabelas de vizinhança (pares de códigos IBGE com fronteira comum)
+ADJACENCY_UF_FILE = "data/external/adjacencia_uf.csv"
+ADJACENCY_MUNICIPIOS_FILE = "data/external/adjacencia_municipios.csv"
+SPATIAL_PERMUTATIONS = 999
+SPATIAL_SIGNIFICANCE = 0.05
+
+# Projeção por componentes demográficos (coortes idade × sexo)
+PROJECTION_HORIZON = 20  # anos projetados
+PROJECTION_MAX_AGE = 100  # última idade (grupo aberto)
+PROJECTION_MAX_WORKERS = 4  # processos (localidades divididas entre eles)
+# Taxas brutas anuais usadas quando não há resposta de projeções arquivada
+PROJECTION_DEFAULT_RATES = {'taxa_natalidade': 0.0125, 'taxa_mortalidade': 0.0072, 'taxa_migracao': 0.0}
+
+# Varredura de cenários de projeção (resultados em conjunto particionado por cenário/ano)
+SCENARIO_DATASET = "projection_scenarios"
+SCENARIO_MAX_WORKERS = 4
+SCENARIO_WRITE_BATCH = 32  # cenários por gravação (cada gravação publica uma versão do catálogo)
+
+# Dados compartilhados entre sessões (arrays mapeados em memória)
+SHARED_DATA_PATH = "data/cache/shared"
+
+# Artefatos de insights pré-calculados
+INSIGHTS_PATH = "data/processed/insights"
+
+# Pipeline de dados (coleta → limpeza → validação → publicação)
+PIPELINE_PATH = "data/processed/pipeline"
+PIPELINE_STATE_FILE = "data/processed/pipeline/_estado_pipeline.json"
+PIPELINE_MAX_WORKERS = 4
+PIPELINE_COLLECT_MAX_AGE = 86400  # segundos (coleta diária)
+
+# Captura de alterações entre coletas (snapshot de hashes + deltas)
+CHANGES_PATH = "data/processed/changes"
+
+# Conjuntos particionados em data/processed (com catálogo)
+PROCESSED_DATASET = "ibge_population"
+CLEANED_DATASET = "cleaned_population"
+
+# Instrumentação (spans, contadores e perfil)
+APP_ENV = os.environ.get("APP_ENV", "development")
+VERBOSE_OUTPUT = APP_ENV != "production"  # mensagens de progresso no stdout
+# Desligada por padrão em produção; IBGE_INSTRUMENTATION=1/0 força o comportamento
+INSTRUMENTATION_ENABLED = os.environ.get(
+    "IBGE_INSTRUMENTATION", "0" if APP_ENV == "production" else "1"
+) != "0"
+METRICS_EVENTS_FILE = "data/logs/metrics_events.jsonl"
+METRICS_EVENTS_BUFFER = 500  # eventos em memória antes de gravar no log
+METRICS_EVENTS_MAX_BYTES = 10 * 1024 ** 2  # tamanho do log antes da rotação
+METRICS_EVENTS_BACKUPS = 3  # arquivos rotacionados mantidos (.1, .2, ...)
+METRICS_SUMMARY_FILE = "data/logs/metrics_summary.json"
+
+# Dimensão de localidades (UFs e municípios) versionada
+LOCALIDADES_PATH = "data/cache/localidades"
+
+# Pré-aquecimento do cache (cron diário)
+WARMUP_MAX_WORKERS = 4
+
+# Cache de dados da API (DataCache)
+CACHE_LOCK_TIMEOUT = 60  # segundos de espera pelo lock de uma chave do cache
+DATASET_LOCK_TIMEOUT = 300  # segundos de espera pelo lock de escrita de um conjunto particionado
+CACHE_TTL = 86400  # segundos em que uma entrada é considerada atual
+# Stale-while-revalidate: entrada expirada é servida na hora e atualizada em segundo plano
+CACHE_STALE_WHILE_REVALIDATE = os.environ.get("IBGE_CACHE_SWR", "1") != "0"
+CACHE_STALE_MAX_AGE = 7 * 86400  # expiração definitiva: acima disso a busca na API bloqueia
+CACHE_STALE_IF_ERROR = True  # com a API fora, servir o último snapshot (qualquer idade) antes dos dados estáticos
+CACHE_REVALIDATE_WORKERS = 2
@@ -0,0 +1,243 @@
+"""
+Motor de métricas derivadas do painel (local × ano)
+
+Em uma única passada vetorizada sobre a matriz local × ano calcula:
+crescimento anual absoluto e percentual, CAGR em janelas arbitrárias,
+ranking por ano e sua variação, e participação no total nacional.
+O resultado é materializado uma vez por versão dos dados e servido ao
+dashboard e aos relatórios.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data.fingerprint import data_fingerprint
+
+DEFAULT_CAGR_WINDOWS = (1, 3, 5)
+ATTRIBUTE_COLUMNS = ['nome', 'sigla', 'regiao']
+
+
+def build_panel_matrix(df, key='id', value='populacao', duplicates='raise'):
+    """
+    Converte o painel longo em matriz densa local × ano
+
+    Args:
+        df (pd.DataFrame): painel longo com `key`, ano e `value`
+        key (str): coluna que identifica o local
+        value (str): coluna com os valores da matriz
+        duplicates (str): o que fazer com linhas repetidas de (local, ano):
+            'raise' (ValueError) ou 'sum' (soma os valores)
+
+    Returns:
+        tuple: (locais, anos, matriz float64 com NaN nas células ausentes)
+    """
+    locations, location_index = np.unique(df[key].to_numpy(), return_inverse=True)
+    years, year_index = np.unique(df['ano'].to_numpy(), return_inverse=True)
+    values = df[value].to_numpy(dtype='float64')
+
+    cells = location_index * len(years) + year_index
+    counts = np.bincount(cells, minlength=len(locations) * len(years))
+    if (counts > 1).any():
+        if duplicates != 'sum':
+            repeated = np.flatnonzero(counts > 1)
+            examples = ', '.join(
+                f"({locations[cell // len(years)]}, {years[cell % len(years)]})" for cell in repeated[:5]
+            )
+            raise ValueError(
+                f"{len(repeated)} par(es) ({key}, ano) repetido(s) no painel, ex.: {examples}"
+            )
+        # Soma explícita; células sem nenhum valor válido continuam NaN
+        sums = np.bincount(cells, weights=np.nan_to_num(values), minlength=len(counts))
+        present = np.bincount(cells, weights=~np.isnan(values), minlength=len(counts))
+        matrix = np.where(present > 0, sums, np.nan).reshape(len(locations), len(years))
+        return locations, years.astype(int), matrix
+
+    matrix = np.full((len(locations), len(years)), np.nan)
+    matrix[location_index, year_index] = values
+    return locations, years.astype(int), matrix
+
+
+def _rank_columns(matrix):
+    """Ranking decrescente por coluna (1 = maior); células ausentes ficam no fim"""
+    filled = np.where(np.isnan(matrix), -np.inf, matrix)
+    order = np.argsort(-filled, axis=0, kind='stable')
+    ranks = np.empty_like(order)
+    rows = np.arange(matrix.shape[0])[:, None]
+    ranks[order, np.arange(matrix.shape[1])] = rows
+    return (ranks + 1).astype(float)
+
+
+def compute_derived_metrics(matrix, years, cagr_windows=DEFAULT_CAGR_WINDOWS):
+    """
+    Calcula todas as métricas derivadas sobre a matriz local × ano
+
+    Args:
+        matrix (np.ndarray): população (locais × anos)
+        years (np.ndarray): anos das colunas, em ordem crescente
+        cagr_windows (tuple): janelas em anos para o CAGR
+
+    Returns:
+        dict: nome da métrica -> matriz com o mesmo formato de `matrix`
+    """
+    # Variações anuais só entre anos consecutivos: depois de um ano ausente o
+    # valor fica NaN em vez de uma variação de vários anos rotulada como anual
+    consecutive = np.zeros(len(years), dtype=bool)
+    consecutive[1:] = np.diff(years) == 1
+
+    previous = np.full_like(matrix, np.nan)
+    previous[:, 1:] = matrix[:, :-1]
+    previous[:, ~consecutive] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics = {
+            'crescimento_absoluto': matrix - previous,
+            'crescimento_percentual': (matrix - previous) / previous * 100,
+            'participacao_nacional': matrix / np.nansum(matrix, axis=0) * 100
+        }
+
+        ranks = _rank_columns(matrix)
+        rank_change = np.full_like(ranks, np.nan)
+        rank_change[:, 1:] = ranks[:, :-1] - ranks[:, 1:]
+        rank_change[:, ~consecutive] = np.nan
+        metrics['ranking'] = ranks
+        metrics['variacao_ranking'] = rank_change
+
+        # CAGR: cada coluna é comparada com a coluna de (ano - janela), se existir
+        for window in cagr_windows:
+            base_index = np.searchsorted(years, years - window)
+            valid = (base_index < len(years)) & (years[np.minimum(base_index, len(years) - 1)] == years - window)
+            cagr = np.full_like(matrix, np.nan)
+            columns = np.flatnonzero(valid)
+            if len(columns):
+                base = matrix[:, base_index[columns]]
+                cagr[:, columns] = ((matrix[:, columns] / base) ** (1 / window) - 1) * 100
+            metrics[f'cagr_{window}a'] = cagr
+
+    return metrics
+
+
+class DerivedMetrics:
+    """Métricas derivadas materializadas para uma versão dos dados"""
+
+    def __init__(self, df, key=None, cagr_windows=DEFAULT_CAGR_WINDOWS, duplicates='raise'):
+        self.key = key or ('id' if 'id' in df.columns else 'nome')
+        self.cagr_windows = tuple(cagr_windows)
+        self.locations, self.years, self.matrix = build_panel_matrix(df, key=self.key, duplicates=duplicates)
+        self.metrics = compute_derived_metrics(self.matrix, self.years, self.cagr_windows)
+
+        attribute_columns = [column for column in ATTRIBUTE_COLUMNS if column in df.columns and column != self.key]
+        attributes = (
+            df.drop_duplicates(self.key)
+            .set_index(self.key)[attribute_columns]
+            .reindex(self.locations)
+        )
+        # Atributos como categorias: repetir códigos é muito mais barato que repetir textos
+        self.attributes = {
+            column: pd.Categorical(attributes[column].astype(str)) for column in attribute_columns
+        }
+        self._frame = None
+
+    def _add_attributes(self, frame, repeats):
+        """Adiciona nome/sigla/região repetindo os códigos categóricos de cada local"""
+        for column, categorical in self.attributes.items():
+            frame[column] = pd.Categorical.from_codes(
+                np.repeat(categorical.codes, repeats), dtype=categorical.dtype
+            )
+        return frame
+
+    def to_frame(self):
+        """Retorna as métricas em formato longo (uma linha por local e ano)"""
+        if self._frame is None:
+            n_locations, n_years = self.matrix.shape
+            columns = {
+                self.key: np.repeat(self.locations, n_years),
+                'ano': np.tile(self.years, n_locations),
+                'populacao': self.matrix.ravel()
+            }
+            for name, values in self.metrics.items():
+                columns[name] = values.ravel()
+
+            frame = self._add_attributes(pd.DataFrame(columns), n_years)
+            self._frame = frame.dropna(subset=['populacao']).reset_index(drop=True)
+        return self._frame
+
+    def for_year(self, year):
+        """Métricas de um ano específico"""
+        frame = self.to_frame()
+        return frame[frame['ano'] == year]
+
+    def projection(self, horizon=5, window=None):
+        """
+        Projeta a população pelo CAGR observado
+
+        Args:
+            horizon (int): número de anos projetados após o último ano
+            window (int): janela do CAGR (padrão: todo o período observado)
+
+        Returns:
+            pd.DataFrame: projeção em formato longo (local, ano, populacao_projetada)
+        """
+        last = self.matrix[:, -1]
+        window = window or int(self.years[-1] - self.years[0])
+        base_index = int(np.searchsorted(self.years, self.years[-1] - window))
+        base = self.matrix[:, base_index]
+        span = self.years[-1] - self.years[base_index]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = (last / base) ** (1 / span) if span > 0 else np.ones_like(last)
+
+        steps = np.arange(1, horizon + 1)
+        projected = last[:, None] * growth[:, None] ** steps[None, :]
+
+        frame = self._add_attributes(pd.DataFrame({
+            self.key: np.repeat(self.locations, horizon),
+            'ano': np.tile(self.years[-1] + steps, len(self.locations)),
+            'populacao_projetada': projected.ravel().round()
+        }), horizon)
+        return frame.dropna(subset=['populacao_projetada'])
+
+
+class DerivedMetricsStore:
+    """Cache em memória das métricas materializadas por versão dos dados"""
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df, cagr_windows=DEFAULT_CAGR_WINDOWS):
+        """Retorna as métricas da versão dos dados, materializando se necessário"""
+        key = (data_fingerprint(df), tuple(cagr_windows))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        derived = DerivedMetrics(df, cagr_windows=cagr_windows)
+        with self._lock:
+            self._entries[key] = derived
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return derived
+
+    def clear(self):
+        """Descarta todas as métricas materializadas"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Instância compartilhada por todas as sessões do processo
+_derived_metrics_store = DerivedMetricsStore()
+
+
+def get_derived_metrics_store():
+    """Retorna o cache de métricas derivadas compartilhado do processo"""
+    return _derived_metrics_store
+
+
+def get_derived_metrics(df, cagr_windows=DEFAULT_CAGR_WINDOWS):
+    """Retorna as métricas derivadas materializadas para o painel informado"""
+    return _derived_metrics_store.get(df, cagr_windows)
@@ -0,0 +1,86 @@
+"""
+Cache de figuras renderizadas das análises estatísticas
+
+As figuras do matplotlib são renderizadas uma única vez para bytes (PNG/SVG),
+fechadas imediatamente e servidas do cache nas próximas visualizações.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+
+SUPPORTED_FORMATS = ('png', 'svg')
+
+
+class FigureCache:
+    """Cache LRU em memória de figuras já renderizadas"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint, figure_type, fmt='png'):
+        """Retorna os bytes da figura se estiverem no cache"""
+        key = (fingerprint, figure_type, fmt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        return None
+
+    def get_or_render(self, fingerprint, figure_type, build_figure, fmt='png', dpi=100):
+        """Retorna a figura do cache ou a constrói, renderiza e fecha"""
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Formato não suportado: {fmt}. Use um de {SUPPORTED_FORMATS}")
+
+        cached = self.get(fingerprint, figure_type, fmt)
+        if cached is not None:
+            return cached
+
+        fig = build_figure()
+        try:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+            rendered = buffer.getvalue()
+        finally:
+            # Fecha a figura para liberar a memória do matplotlib
+            plt.close(fig)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[(fingerprint, figure_type, fmt)] = rendered
+            self._entries.move_to_end((fingerprint, figure_type, fmt))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return rendered
+
+    def clear(self):
+        """Limpa o cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Retorna estatísticas de uso do cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(value) for value in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Instância compartilhada por todas as sessões do processo
+_figure_cache = FigureCache()
+
+
+def get_figure_cache():
+    """Retorna o cache de figuras compartilhado do processo"""
+    return _figure_cache
@@ -0,0 +1,237 @@
+"""
+Pipeline de insights pré-calculados
+
+Calcula rankings, taxas de crescimento, participação regional e maiores
+variações a partir do painel canônico (local × ano) e grava um artefato
+JSON compacto e versionado pela impressão digital dos dados. O dashboard
+carrega o artefato mais recente em tempo constante.
+
+A reconstrução é incremental: cada local tem um hash das suas linhas, e as
+métricas por local só são recalculadas quando esse hash muda.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from config.data_config import INSIGHTS_PATH, ENCODING
+from src.data.fingerprint import data_fingerprint
+from src.monitoring.instrumentation import echo
+
+INSIGHTS_SCHEMA_VERSION = 1
+LATEST_POINTER = 'latest.json'
+HASH_COLUMNS = ['nome', 'sigla', 'regiao', 'ano', 'populacao']
+
+
+def _location_key(df):
+    """Coluna que identifica cada local (código IBGE quando disponível)"""
+    return 'id' if 'id' in df.columns else 'nome'
+
+
+def location_hashes(df):
+    """Hash do conteúdo de cada local (independente da ordem das linhas)"""
+    key = _location_key(df)
+    columns = [column for column in HASH_COLUMNS if column in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    combined = row_hashes.groupby(df[key].to_numpy()).sum()
+    return {str(location): format(int(value), '016x') for location, value in combined.items()}
+
+
+def compute_location_metrics(df):
+    """
+    Calcula as métricas de cada local em uma passada vetorizada
+
+    Returns:
+        dict: chave do local -> métricas (nome, região, população inicial/final, crescimento)
+    """
+    if df.empty:
+        return {}
+
+    key = _location_key(df)
+    panel = df.pivot_table(index=key, columns='ano', values='populacao', aggfunc='sum')
+    first_year, last_year = panel.columns.min(), panel.columns.max()
+
+    attributes = df.drop_duplicates(key).set_index(key)
+    metrics = pd.DataFrame({
+        'nome': attributes['nome'].astype(str),
+        'regiao': attributes['regiao'].astype(str) if 'regiao' in attributes else 'N/A',
+        'ano_inicial': int(first_year),
+        'ano_final': int(last_year),
+        'populacao_inicial': panel[first_year],
+        'populacao_final': panel[last_year]
+    })
+    metrics['crescimento_absoluto'] = metrics['populacao_final'] - metrics['populacao_inicial']
+    metrics['crescimento_percentual'] = (
+        metrics['crescimento_absoluto'] / metrics['populacao_inicial'] * 100
+    ).round(4)
+
+    if len(panel.columns) > 1:
+        previous_year = panel.columns[-2]
+        metrics['crescimento_ultimo_ano'] = (
+            (panel[last_year] - panel[previous_year]) / panel[previous_year] * 100
+        ).round(4)
+    else:
+        metrics['crescimento_ultimo_ano'] = 0.0
+
+    metrics = metrics.dropna(subset=['populacao_inicial', 'populacao_final'])
+    metrics[['populacao_inicial', 'populacao_final', 'crescimento_absoluto']] = (
+        metrics[['populacao_inicial', 'populacao_final', 'crescimento_absoluto']].astype('int64')
+    )
+    return {str(location): row for location, row in metrics.to_dict('index').items()}
+
+
+def summarize_insights(location_metrics):
+    """Agrega as métricas por local nos insights exibidos pelo dashboard"""
+    metrics = pd.DataFrame.from_dict(location_metrics, orient='index')
+    if metrics.empty:
+        return {}
+
+    metrics['rank_inicial'] = metrics['populacao_inicial'].rank(ascending=False, method='min').astype(int)
+    metrics['rank_final'] = metrics['populacao_final'].rank(ascending=False, method='min').astype(int)
+    metrics['variacao_ranking'] = metrics['rank_inicial'] - metrics['rank_final']
+
+    ranked = metrics.sort_values('populacao_final', ascending=False)
+    total_population = int(metrics['populacao_final'].sum())
+    region_counts = metrics['regiao'].value_counts()
+    region_population = metrics.groupby('regiao')['populacao_final'].sum().sort_values(ascending=False)
+
+    def records(frame, columns):
+        return frame[columns].to_dict('records')
+
+    return {
+        'ano_referencia': int(metrics['ano_final'].max()),
+        'total_estados': len(metrics),
+        'total_regioes': int(metrics['regiao'].nunique()),
+        'populacao_total': total_population,
+        'estado_mais_populoso': ranked.iloc[0]['nome'],
+        'estado_menos_populoso': ranked.iloc[-1]['nome'],
+        'regiao_mais_estados': region_counts.index[0],
+        'regiao_menos_estados': region_counts.index[-1],
+        'distribuicao_regional': {region: int(count) for region, count in region_counts.items()},
+        'participacao_regional': {
+            region: round(float(population) / total_population * 100, 2)
+            for region, population in region_population.items()
+        },
+        'top_5_estados': [
+            {'nome': row['nome'], 'populacao': int(row['populacao_final']), 'regiao': row['regiao']}
+            for row in ranked.head(5).to_dict('records')
+        ],
+        'ranking': ranked['nome'].tolist(),
+        'maior_crescimento_percentual': records(
+            metrics.nlargest(5, 'crescimento_percentual'), ['nome', 'crescimento_percentual']
+        ),
+        'maior_crescimento_absoluto': records(
+            metrics.nlargest(5, 'crescimento_absoluto'), ['nome', 'crescimento_absoluto']
+        ),
+        'maiores_subidas_ranking': records(
+            metrics[metrics['variacao_ranking'] > 0].nlargest(5, 'variacao_ranking'),
+            ['nome', 'rank_inicial', 'rank_final']
+        ),
+        'maiores_quedas_ranking': records(
+            metrics[metrics['variacao_ranking'] < 0].nsmallest(5, 'variacao_ranking'),
+            ['nome', 'rank_inicial', 'rank_final']
+        ),
+        'estados_por_regiao': metrics.groupby('regiao')['nome'].apply(list).to_dict()
+    }
+
+
+def build_insights(df, previous=None):
+    """
+    Constrói o artefato de insights, reaproveitando métricas de locais inalterados
+
+    Args:
+        df (pd.DataFrame): painel com colunas nome, regiao, ano e populacao
+        previous (dict): artefato anterior (opcional) para reconstrução incremental
+
+    Returns:
+        dict: artefato com insights, hashes e métricas por local
+    """
+    hashes = location_hashes(df)
+    previous_locations = {}
+    if previous and previous.get('schema_version') == INSIGHTS_SCHEMA_VERSION:
+        previous_locations = previous.get('locations', {})
+
+    changed = [
+        location for location, location_hash in hashes.items()
+        if previous_locations.get(location, {}).get('hash') != location_hash
+    ]
+
+    # Recalcular apenas os locais alterados
+    key = _location_key(df)
+    changed_rows = df[df[key].astype(str).isin(changed)]
+    changed_metrics = compute_location_metrics(changed_rows)
+
+    locations = {}
+    for location, location_hash in hashes.items():
+        if location in changed_metrics:
+            metrics = changed_metrics[location]
+        elif location in previous_locations:
+            metrics = previous_locations[location]['metrics']
+        else:
+            continue
+        locations[location] = {'hash': location_hash, 'metrics': metrics}
+
+    return {
+        'schema_version': INSIGHTS_SCHEMA_VERSION,
+        'data_fingerprint': data_fingerprint(df),
+        'data_analise': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'locais_recalculados': len(changed_metrics),
+        'insights': summarize_insights({
+            location: entry['metrics'] for location, entry in locations.items()
+        }),
+        'locations': locations
+    }
+
+
+def save_insights(artifact, insights_dir=INSIGHTS_PATH):
+    """Grava o artefato versionado e atualiza o ponteiro para a versão mais recente"""
+    os.makedirs(insights_dir, exist_ok=True)
+    filename = f"insights_{artifact['data_fingerprint'][:12]}.json"
+    path = os.path.join(insights_dir, filename)
+
+    _write_json_atomic(path, artifact)
+    _write_json_atomic(os.path.join(insights_dir, LATEST_POINTER), {
+        'file': filename,
+        'data_fingerprint': artifact['data_fingerprint']
+    })
+
+    echo(f"💡 Insights salvos em: {path} ({artifact['locais_recalculados']} locais recalculados)")
+    return path
+
+
+def _write_json_atomic(path, payload):
+    """Grava JSON compacto em arquivo temporário e renomeia"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding=ENCODING) as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'), default=str)
+    os.replace(tmp_path, path)
+
+
+def load_latest_insights(insights_dir=INSIGHTS_PATH):
+    """Carrega o artefato mais recente (ou None se não existir)"""
+    pointer_path = os.path.join(insights_dir, LATEST_POINTER)
+    try:
+        with open(pointer_path, 'r', encoding=ENCODING) as f:
+            pointer = json.load(f)
+        with open(os.path.join(insights_dir, pointer['file']), 'r', encoding=ENCODING) as f:
+            return json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def update_insights(df, insights_dir=INSIGHTS_PATH):
+    """
+    Garante um artefato de insights atualizado para o painel informado
+
+    Se o artefato mais recente já corresponde aos dados, ele é reutilizado;
+    caso contrário é reconstruído de forma incremental e salvo.
+    """
+    previous = load_latest_insights(insights_dir)
+    if previous and previous.get('data_fingerprint') == data_fingerprint(df):
+        return previous
+
+    artifact = build_insights(df, previous)
+    save_insights(artifact, insights_dir)
+    return artifact
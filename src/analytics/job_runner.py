@@ -0,0 +1,212 @@
+"""
+Executor de análises estatísticas em segundo plano
+
+Cada job é identificado pela impressão digital dos dados e pelas análises
+pedidas, então usuários que pedem a mesma análise compartilham a mesma
+computação (e o mesmo resultado em cache).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from config.data_config import ANALYSIS_MAX_WORKERS, ANALYSIS_MAX_CACHED_JOBS
+from src.data.fingerprint import data_fingerprint
+from src.monitoring.instrumentation import worker_task
+
+DEFAULT_ANALYSES = (
+    'basic_statistics',
+    'regional_analysis',
+    'correlation_analysis',
+    'outlier_detection',
+    'plot_analysis'
+)
+
+
+@worker_task
+def _run_analysis(data, analysis_name):
+    """Executa uma análise no processo de trabalho (função de topo para ser serializável)"""
+    from src.analytics.statistical_analysis import PopulationAnalyzer
+
+    analyzer = PopulationAnalyzer(data)
+    if analysis_name == 'plot_analysis':
+        # Figuras voltam como bytes: objetos do matplotlib não atravessam processos
+        return analyzer.render_figure('analysis')
+    return getattr(analyzer, analysis_name)()
+
+
+class AnalysisJob:
+    """Job de análise com uma tarefa por método do analisador"""
+
+    def __init__(self, job_id, analyses):
+        self.job_id = job_id
+        self.analyses = tuple(analyses)
+        self.futures = {}
+        self.created_at = time.time()
+
+    @property
+    def progress(self):
+        """Fração de análises concluídas (0.0 a 1.0)"""
+        if not self.futures:
+            return 0.0
+        done = sum(1 for future in self.futures.values() if future.done())
+        return done / len(self.futures)
+
+    @property
+    def state(self):
+        """Estado do job: 'running', 'done' ou 'failed'"""
+        if not all(future.done() for future in self.futures.values()):
+            return 'running'
+        if any(future.exception() is not None for future in self.futures.values()):
+            return 'failed'
+        return 'done'
+
+    def errors(self):
+        """Retorna os erros das análises que falharam"""
+        return {
+            name: str(future.exception())
+            for name, future in self.futures.items()
+            if future.done() and future.exception() is not None
+        }
+
+    def results(self):
+        """Retorna os resultados das análises já concluídas com sucesso"""
+        return {
+            name: future.result()
+            for name, future in self.futures.items()
+            if future.done() and future.exception() is None
+        }
+
+
+class AnalysisJobRunner:
+    """Executor de jobs de análise com deduplicação por impressão digital dos dados"""
+
+    def __init__(self, max_workers=ANALYSIS_MAX_WORKERS, max_cached_jobs=ANALYSIS_MAX_CACHED_JOBS,
+                 executor_class=ProcessPoolExecutor):
+        self.max_workers = max_workers
+        self.max_cached_jobs = max_cached_jobs
+        self.executor_class = executor_class
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Cria o pool de processos sob demanda"""
+        if self._executor is None:
+            self._executor = self.executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    @staticmethod
+    def make_job_id(fingerprint, analyses):
+        """Gera o ID do job a partir dos dados e das análises pedidas"""
+        return f"{fingerprint[:16]}-{'+'.join(analyses)}"
+
+    def submit(self, data, analyses=DEFAULT_ANALYSES):
+        """
+        Submete um job de análise e retorna seu ID
+
+        Se um job com os mesmos dados e análises já existe (em execução ou
+        concluído), o ID existente é retornado e nada é recalculado.
+        """
+        analyses = tuple(analyses)
+        job_id = self.make_job_id(data_fingerprint(data), analyses)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.state != 'failed':
+                self._jobs.move_to_end(job_id)
+                return job_id
+
+            job = AnalysisJob(job_id, analyses)
+            self._submit_tasks(job, data)
+
+            self._jobs[job_id] = job
+            self._evict_finished_jobs()
+
+        return job_id
+
+    def _submit_tasks(self, job, data):
+        """
+        Submete as análises do job, recriando o pool se ele estiver quebrado
+
+        Um processo de trabalho que morre (falta de memória, sinal) deixa o
+        pool inutilizável (`BrokenProcessPool`) para todas as submissões
+        seguintes; o pool é descartado e recriado uma vez.
+        """
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                for analysis_name in job.analyses:
+                    job.futures[analysis_name] = executor.submit(_run_analysis, data, analysis_name)
+                return
+            except BrokenExecutor:
+                self._discard_executor()
+                if attempt:
+                    raise
+
+    def _discard_executor(self):
+        """Descarta o pool atual (o próximo uso cria um novo)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _evict_finished_jobs(self):
+        """Remove os jobs concluídos mais antigos além do limite do cache"""
+        excess = len(self._jobs) - self.max_cached_jobs
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].state != 'running':
+                del self._jobs[job_id]
+                excess -= 1
+
+    def status(self, job_id):
+        """Retorna estado, progresso, resultados e erros de um job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        state = job.state
+        return {
+            'job_id': job_id,
+            'state': state,
+            'progress': job.progress,
+            'results': job.results() if state != 'running' else {},
+            'errors': job.errors()
+        }
+
+    def wait(self, job_id, timeout=None, poll_interval=0.2, on_progress=None):
+        """Aguarda o término de um job, notificando o progresso opcionalmente"""
+        start = time.time()
+        while True:
+            status = self.status(job_id)
+            if status is None:
+                return None
+            if on_progress is not None:
+                on_progress(status['progress'])
+            if status['state'] != 'running':
+                return status
+            if timeout is not None and time.time() - start > timeout:
+                return status
+            time.sleep(poll_interval)
+
+    def shutdown(self):
+        """Encerra o pool de processos"""
+        with self._lock:
+            self._discard_executor()
+
+
+# Instância compartilhada por todas as sessões do processo
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Retorna o executor de análises compartilhado do processo"""
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = AnalysisJobRunner()
+        return _job_runner
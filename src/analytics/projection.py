@@ -0,0 +1,376 @@
+"""
+Projeção populacional pelo método das componentes demográficas
+
+Cada localidade é representada por coortes de idade simples (0 a
+PROJECTION_MAX_AGE, o último grupo aberto) × sexo. A cada ano as coortes
+sobrevivem (mortalidade por idade), envelhecem um ano, recebem os
+nascimentos (fecundidade por idade das mulheres) e o saldo migratório
+(distribuído por um perfil etário). Todas as localidades avançam juntas
+como um tensor localidades × sexo × idade; o único laço é o dos anos.
+
+    projection = CohortProjection.from_panel(df, projection_rates())
+    result = projection.run(horizon=20)
+    result.to_frame()        # id × ano: população, nascimentos, óbitos, migração
+
+As taxas brutas (natalidade, mortalidade, migração) vêm da resposta de
+/projecoes/populacao arquivada (`process_projections_data`); as curvas por
+idade são padrões fixos escalados para reproduzir essas taxas no ano base.
+Sem dados por idade, a estrutura inicial de cada localidade é a pirâmide
+de referência do Brasil aplicada à sua população total.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config.data_config import (
+    PROJECTION_HORIZON, PROJECTION_MAX_AGE, PROJECTION_MAX_WORKERS, PROJECTION_DEFAULT_RATES
+)
+from src.data.hierarchy import BRASIL_CODE
+from src.data.localidades import get_localidades
+from src.monitoring.instrumentation import echo, span, worker_task
+
+SEXES = ('M', 'F')
+MALE, FEMALE = 0, 1
+SEX_RATIO_AT_BIRTH = 1.05  # meninos por menina
+RATE_COLUMNS = ['taxa_natalidade', 'taxa_mortalidade', 'taxa_migracao']
+
+# Pirâmide de referência (aproximação do Censo 2022, milhares): grupos de 5 anos, último 90+
+REFERENCE_PYRAMID = [
+    (6400, 6200), (6600, 6400), (6900, 6600), (7200, 7000), (7700, 7600), (7600, 7700), (7600, 7900),
+    (7900, 8300), (7700, 8100), (6600, 7100), (6100, 6700), (5500, 6100), (4700, 5400), (3700, 4400),
+    (2600, 3300), (1600, 2200), (900, 1400), (400, 800), (200, 400)
+]
+
+# Mortalidade de Gompertz-Makeham (risco anual = c + a·e^(b·idade)) com excesso no 1º ano
+MORTALITY_PARAMETERS = {
+    'M': {'a': 0.00009, 'b': 0.088, 'c': 0.0008, 'infantil': 0.013},
+    'F': {'a': 0.00004, 'b': 0.092, 'c': 0.0004, 'infantil': 0.011}
+}
+FERTILITY_AGES = (15, 49)
+FERTILITY_PEAK, FERTILITY_SPREAD = 27.0, 6.5
+MIGRATION_PEAK, MIGRATION_SPREAD = 24.0, 9.0
+
+
+def _ages(max_age):
+    return np.arange(max_age + 1, dtype=float)
+
+
+def reference_structure(max_age=PROJECTION_MAX_AGE):
+    """Participação de cada sexo × idade na população (2 × idades, soma 1)"""
+    groups = np.array(REFERENCE_PYRAMID, dtype=float).T
+    last_group = 5 * (len(REFERENCE_PYRAMID) - 1)
+    structure = np.zeros((2, max_age + 1))
+    for sex in (MALE, FEMALE):
+        single = np.repeat(groups[sex, :-1] / 5, 5)[:min(last_group, max_age + 1)]
+        structure[sex, :len(single)] = single
+        # Grupo aberto distribuído com queda geométrica até a idade máxima
+        if max_age >= last_group:
+            decay = 0.8 ** np.arange(max_age - last_group + 1)
+            structure[sex, last_group:] = groups[sex, -1] * decay / decay.sum()
+        else:
+            structure[sex, -1] += groups[sex, -1]
+    return structure / structure.sum()
+
+
+def mortality_hazards(max_age=PROJECTION_MAX_AGE):
+    """Risco anual de morte por sexo × idade (antes da calibração por localidade)"""
+    ages = _ages(max_age)
+    hazards = np.empty((2, max_age + 1))
+    for sex, name in enumerate(SEXES):
+        parameters = MORTALITY_PARAMETERS[name]
+        hazards[sex] = parameters['c'] + parameters['a'] * np.exp(parameters['b'] * ages)
+        hazards[sex, 0] += parameters['infantil']
+    return hazards
+
+
+def fertility_schedule(max_age=PROJECTION_MAX_AGE):
+    """Fecundidade por idade da mãe normalizada para somar 1 (a escala é a TFT)"""
+    ages = _ages(max_age)
+    schedule = np.exp(-0.5 * ((ages - FERTILITY_PEAK) / FERTILITY_SPREAD) ** 2)
+    schedule[(ages < FERTILITY_AGES[0]) | (ages > FERTILITY_AGES[1])] = 0.0
+    return schedule / schedule.sum()
+
+
+def migration_profile(max_age=PROJECTION_MAX_AGE):
+    """Distribuição do saldo migratório por sexo × idade (concentrada em adultos jovens, soma 1)"""
+    ages = _ages(max_age)
+    adults = np.exp(-0.5 * ((ages - MIGRATION_PEAK) / MIGRATION_SPREAD) ** 2)
+    children = 0.3 * np.exp(-ages / 5.0)  # crianças migram com os pais
+    profile = np.vstack([adults + children, adults + children])
+    return profile / profile.sum()
+
+
+def projection_rates(archive=None):
+    """
+    Taxas brutas das respostas de projeções arquivadas (a mais recente de cada localidade)
+
+    Returns:
+        pd.DataFrame: taxas indexadas pelo código (1 = Brasil); as taxas
+            padrão da configuração se nada tiver sido arquivado
+    """
+    from src.data.collect_ibge_data import process_projections_data
+    from src.data.raw_archive import get_raw_archive
+    from src.data.replay import payload_kind
+
+    archive = archive or get_raw_archive()
+    records = {}
+    for entry in archive.entries():
+        if payload_kind(entry['endpoint'], None) not in (None, 'projecoes'):
+            continue
+        payload = archive.get(entry['hash'])
+        if payload_kind(entry['endpoint'], payload) == 'projecoes':
+            for record in process_projections_data(payload) or []:
+                records[record['id']] = record
+
+    if not records:
+        echo("⚠️ Nenhuma projeção arquivada: usando as taxas padrão")
+        return pd.DataFrame([PROJECTION_DEFAULT_RATES], index=pd.Index([BRASIL_CODE], name='id'))
+    return pd.DataFrame(list(records.values())).set_index('id')[RATE_COLUMNS]
+
+
+def rates_for(codes, rates=None):
+    """
+    Taxas de cada localidade: as próprias, senão as da UF, senão as do Brasil
+
+    Returns:
+        np.ndarray: localidades × (natalidade, mortalidade, migração)
+    """
+    codes = np.asarray(codes, dtype='int64')
+    table = rates if rates is not None else pd.DataFrame(
+        [PROJECTION_DEFAULT_RATES], index=pd.Index([BRASIL_CODE], name='id')
+    )
+    table = table[RATE_COLUMNS].astype(float)
+    fallback = table.loc[BRASIL_CODE] if BRASIL_CODE in table.index else pd.Series(PROJECTION_DEFAULT_RATES)
+
+    ufs = np.where(codes < 100, codes, codes // 100000)
+    values = table.reindex(codes).to_numpy(copy=True)
+    missing = np.isnan(values).any(axis=1)
+    values[missing] = table.reindex(ufs[missing]).to_numpy()
+    missing = np.isnan(values).any(axis=1)
+    values[missing] = fallback[RATE_COLUMNS].to_numpy(dtype=float)
+    return values
+
+
+def project_cohorts(structure, tfr, mortality_scale, migrants, horizon,
+                    fertility_factor=1.0, mortality_factor=1.0, migration_factor=1.0):
+    """
+    Avança as coortes de todas as localidades ano a ano
+
+    Args:
+        structure (np.ndarray): população inicial, localidades × sexo × idade
+        tfr (np.ndarray): taxa de fecundidade total de cada localidade
+        mortality_scale (np.ndarray): multiplicador do risco de morte de referência
+        migrants (np.ndarray): saldo migratório anual de cada localidade
+        horizon (int): anos projetados
+        *_factor (float): multiplicadores de cenário sobre cada componente
+
+    Returns:
+        dict: totals (anos+1 × localidades), births/deaths/migration (anos × localidades), structure final
+    """
+    n_locations, _, n_ages = structure.shape
+    max_age = n_ages - 1
+    survival = np.exp(-(mortality_scale * mortality_factor)[:, None, None] * mortality_hazards(max_age)[None])
+    fertility = (tfr * fertility_factor)[:, None] * fertility_schedule(max_age)[None]
+    migration = (migrants * migration_factor)[:, None, None] * migration_profile(max_age)[None]
+    newborn_shares = np.array([SEX_RATIO_AT_BIRTH, 1.0]) / (1 + SEX_RATIO_AT_BIRTH)
+
+    population = structure.astype(float).copy()
+    totals = np.empty((horizon + 1, n_locations))
+    births = np.empty((horizon, n_locations))
+    deaths = np.empty((horizon, n_locations))
+    applied_migration = np.empty((horizon, n_locations))
+    totals[0] = population.sum(axis=(1, 2))
+
+    for year in range(horizon):
+        births[year] = (population[:, FEMALE, :] * fertility).sum(axis=1)
+        survivors = population * survival
+
+        following = np.empty_like(population)
+        following[:, :, 1:] = survivors[:, :, :-1]
+        following[:, :, -1] += survivors[:, :, -1]  # grupo aberto
+        newborns = births[year][:, None] * newborn_shares[None, :]
+        following[:, :, 0] = newborns * survival[:, :, 0]
+        deaths[year] = totals[year] - survivors.sum(axis=(1, 2)) + (newborns - following[:, :, 0]).sum(axis=1)
+
+        before_migration = following.sum(axis=(1, 2))
+        following += migration
+        np.maximum(following, 0.0, out=following)  # emigração não esvazia além do que existe
+        population = following
+        totals[year + 1] = population.sum(axis=(1, 2))
+        applied_migration[year] = totals[year + 1] - before_migration
+
+    return {
+        'totals': totals,
+        'births': births,
+        'deaths': deaths,
+        'migration': applied_migration,
+        'structure': population
+    }
+
+
+@worker_task
+def _project_shard(arrays, horizon, factors):
+    """Projeção de um grupo de localidades (função de topo para ser serializável)"""
+    return project_cohorts(*arrays, horizon, *factors)
+
+
+class ProjectionResult:
+    """Resultado de uma projeção: totais e componentes por localidade e ano"""
+
+    def __init__(self, codes, base_year, components):
+        self.codes = codes
+        self.base_year = base_year
+        self.totals = components['totals']
+        self.births = components['births']
+        self.deaths = components['deaths']
+        self.migration = components['migration']
+        self.structure = components['structure']
+
+    def __repr__(self):
+        return (f"ProjectionResult(localidades={len(self.codes)}, "
+                f"anos={self.base_year}-{self.base_year + self.horizon})")
+
+    @property
+    def horizon(self):
+        return self.totals.shape[0] - 1
+
+    @property
+    def years(self):
+        return np.arange(self.base_year, self.base_year + self.horizon + 1)
+
+    def to_frame(self):
+        """Formato longo (id, ano): população projetada e componentes do ano anterior"""
+        n_locations = len(self.codes)
+
+        def with_base_year(components):
+            return np.vstack([np.full((1, n_locations), np.nan), components]).ravel()
+
+        return pd.DataFrame({
+            'id': np.tile(self.codes, self.horizon + 1),
+            'ano': np.repeat(self.years, n_locations),
+            'populacao_projetada': self.totals.ravel(),
+            'nascimentos': with_base_year(self.births),
+            'obitos': with_base_year(self.deaths),
+            'migracao_liquida': with_base_year(self.migration)
+        })
+
+    def pyramid(self, codes=None):
+        """Pirâmide etária do último ano (idade × sexo), somada nas localidades pedidas"""
+        selected = np.isin(self.codes, codes) if codes is not None else slice(None)
+        structure = self.structure[selected].sum(axis=0)
+        return pd.DataFrame(structure.T, columns=list(SEXES), index=pd.Index(range(structure.shape[1]), name='idade'))
+
+
+def panel_codes(df):
+    """
+    Códigos IBGE das linhas do painel
+
+    Usa a coluna `id` quando existe; códigos ausentes (ou a coluna inteira,
+    em painéis só com estado) são resolvidos pela sigla e depois pelo nome.
+
+    Returns:
+        pd.Series: códigos (Int32, nulo quando não resolvidos), mesmo índice de `df`
+    """
+    codes = df['id'].astype('Int32') if 'id' in df.columns else pd.Series(pd.NA, index=df.index, dtype='Int32')
+    if codes.notna().all():
+        return codes
+
+    localidades = get_localidades()
+    if 'sigla' in df.columns:
+        codes = codes.fillna(localidades.codes_for_siglas(df['sigla']))
+    if 'nome' in df.columns and codes.isna().any():
+        codes = codes.fillna(localidades.codes_for_names(df['nome']))
+    return codes
+
+
+class CohortProjection:
+    """Insumos calibrados de uma projeção (estrutura inicial e níveis das componentes)"""
+
+    def __init__(self, codes, base_year, structure, rates):
+        """
+        Args:
+            codes (np.ndarray): código de cada localidade
+            base_year (int): ano da população inicial
+            structure (np.ndarray): localidades × sexo × idade
+            rates (np.ndarray): localidades × (natalidade, mortalidade, migração) no ano base
+        """
+        self.codes = np.asarray(codes, dtype='int64')
+        self.base_year = int(base_year)
+        self.structure = np.asarray(structure, dtype=float)
+        self.rates = np.asarray(rates, dtype=float)
+
+        # Calibração: curvas de referência escaladas para reproduzir as taxas brutas no ano base
+        max_age = self.structure.shape[2] - 1
+        population = self.structure.sum(axis=(1, 2))
+        mothers = self.structure[:, FEMALE, :] @ fertility_schedule(max_age)
+        expected_deaths = (self.structure * mortality_hazards(max_age)[None]).sum(axis=(1, 2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.tfr = np.nan_to_num(self.rates[:, 0] * population / mothers)
+            self.mortality_scale = np.nan_to_num(self.rates[:, 1] * population / expected_deaths)
+        self.migrants = self.rates[:, 2] * population
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __repr__(self):
+        return f"CohortProjection(localidades={len(self)}, ano_base={self.base_year})"
+
+    @classmethod
+    def from_panel(cls, df, rates=None, year=None, max_age=PROJECTION_MAX_AGE):
+        """
+        Insumos a partir do painel (população total por localidade em um ano)
+
+        Args:
+            df (pd.DataFrame): painel com ano, populacao e id (ou sigla/nome, ver `panel_codes`)
+            rates (pd.DataFrame): taxas por código (ver `projection_rates`)
+            year (int): ano base (padrão: o mais recente)
+        """
+        year = int(df['ano'].max()) if year is None else int(year)
+        panel = df[df['ano'] == year]
+        codes = panel_codes(panel)
+        if codes.isna().all():
+            raise ValueError("Painel sem códigos IBGE (id) nem sigla/nome reconhecíveis")
+        population = panel['populacao'].groupby(codes.rename('id'), sort=True).sum()
+        structure = population.to_numpy(dtype=float)[:, None, None] * reference_structure(max_age)[None]
+        return cls(population.index.to_numpy(), year, structure, rates_for(population.index, rates))
+
+    def run(self, horizon=PROJECTION_HORIZON, fertility_factor=1.0, mortality_factor=1.0,
+            migration_factor=1.0, max_workers=1):
+        """
+        Projeta todas as localidades
+
+        Args:
+            horizon (int): anos projetados a partir do ano base
+            fertility_factor, mortality_factor, migration_factor (float): multiplicadores de cenário
+            max_workers (int): processos, cada um com um bloco de localidades (limitado ao número de CPUs)
+
+        Returns:
+            ProjectionResult
+        """
+        factors = (fertility_factor, mortality_factor, migration_factor)
+        inputs = (self.structure, self.tfr, self.mortality_scale, self.migrants)
+        workers = min(max_workers, len(self), os.cpu_count() or 1)
+        with span('projection.run', locations=len(self), horizon=horizon, workers=workers):
+            if workers <= 1:
+                components = project_cohorts(*inputs, horizon, *factors)
+            else:
+                shards = np.array_split(np.arange(len(self)), workers)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    parts = list(executor.map(
+                        _project_shard, [tuple(array[shard] for array in inputs) for shard in shards],
+                        [horizon] * workers, [factors] * workers
+                    ))
+                components = {
+                    name: np.concatenate([part[name] for part in parts], axis=0 if name == 'structure' else 1)
+                    for name in parts[0]
+                }
+        return ProjectionResult(self.codes, self.base_year, components)
+
+
+def run_projection(df, horizon=PROJECTION_HORIZON, rates=None, max_workers=PROJECTION_MAX_WORKERS, **factors):
+    """Atalho: insumos do painel + taxas arquivadas → projeção"""
+    rates = projection_rates() if rates is None else rates
+    return CohortProjection.from_panel(df, rates).run(horizon, max_workers=max_workers, **factors)
@@ -0,0 +1,301 @@
+"""
+Motor de reamostragem (bootstrap e permutação) para os testes do analisador
+
+Os testes paramétricos (ANOVA, Levene, Pearson) supõem normalidade, o que a
+própria `distribution_analysis` rejeita para a população por UF. Aqui os
+valores de p e os intervalos de confiança vêm da distribuição de milhares de
+réplicas, calculadas em lote como operações de matriz do NumPy (réplicas ×
+observações): não há laço Python por réplica.
+
+    engine = ResamplingEngine(n_replicates=4999, seed=42)
+    engine.permutation_anova(valores, grupos)    # {'statistic', 'p_value', ...}
+    engine.bootstrap_correlation(x, y)            # {'statistic', 'ci_lower', 'ci_upper', ...}
+
+As réplicas são divididas em blocos de tamanho fixo, cada um com a sua
+semente derivada (`SeedSequence.spawn`); com `max_workers > 1` os blocos são
+distribuídos entre processos. O resultado depende só da semente e do número
+de réplicas, não do número de processos.
+"""
+
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config.data_config import (
+    RESAMPLING_REPLICATES, RESAMPLING_SEED, RESAMPLING_CONFIDENCE, RESAMPLING_MAX_WORKERS,
+    RESAMPLING_BLOCK_SIZE, RESAMPLING_CHUNK_ELEMENTS
+)
+from src.monitoring.instrumentation import span, worker_task
+
+# Tolerância relativa na comparação com a estatística observada (empates numéricos)
+TIE_TOLERANCE = 1e-12
+
+
+def chunk_sizes(size, n_observations):
+    """Tamanhos de lote cuja matriz réplicas × observações cabe no limite de memória"""
+    step = max(1, RESAMPLING_CHUNK_ELEMENTS // max(n_observations, 1))
+    for start in range(0, size, step):
+        yield min(step, size - start)
+
+
+def permutation_indices(rng, size, n_observations):
+    """Matriz (size × n) de índices, cada linha uma permutação de 0..n-1"""
+    return rng.permuted(np.broadcast_to(np.arange(n_observations), (size, n_observations)), axis=1)
+
+
+def _group_sums(samples, codes, n_groups):
+    """Somas por grupo de cada linha de `samples` (réplicas × observações) com um único bincount"""
+    size = samples.shape[0]
+    offsets = codes[None, :] + n_groups * np.arange(size)[:, None]
+    sums = np.bincount(offsets.ravel(), weights=samples.ravel(), minlength=size * n_groups)
+    return sums.reshape(size, n_groups)
+
+
+def f_statistics(samples, codes, counts):
+    """
+    Estatística F da ANOVA de um fator para cada linha de `samples`
+
+    Args:
+        samples (np.ndarray): réplicas × observações
+        codes (np.ndarray): grupo (0..k-1) de cada observação
+        counts (np.ndarray): observações por grupo
+    """
+    n_groups = len(counts)
+    n_observations = samples.shape[1]
+    grand = samples.mean(axis=1)
+    ss_total = ((samples - grand[:, None]) ** 2).sum(axis=1)
+    sums = _group_sums(samples, codes, n_groups)
+    ss_between = (sums ** 2 / counts).sum(axis=1) - n_observations * grand ** 2
+    ss_within = np.maximum(ss_total - ss_between, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (ss_between / (n_groups - 1)) / (ss_within / (n_observations - n_groups))
+
+
+def correlations(xs, ys):
+    """Correlação de Pearson de cada linha de `xs` com a linha correspondente de `ys`"""
+    xc = xs - xs.mean(axis=1, keepdims=True)
+    yc = ys - ys.mean(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (xc * yc).sum(axis=1) / np.sqrt((xc ** 2).sum(axis=1) * (yc ** 2).sum(axis=1))
+
+
+def _permutation_f(rng, size, values, codes, counts):
+    # Permutar os valores com os rótulos fixos equivale a permutar os rótulos
+    return np.concatenate([
+        f_statistics(values[permutation_indices(rng, chunk, len(values))], codes, counts)
+        for chunk in chunk_sizes(size, len(values))
+    ])
+
+
+def _permutation_r(rng, size, x, y):
+    # x e y chegam padronizados: r = <x, y permutado> / n, um produto matriz-vetor por lote
+    return np.concatenate([
+        y[permutation_indices(rng, chunk, len(y))] @ x / len(x)
+        for chunk in chunk_sizes(size, len(x))
+    ])
+
+
+def _bootstrap_r(rng, size, x, y):
+    results = []
+    for chunk in chunk_sizes(size, len(x)):
+        index = rng.integers(0, len(x), size=(chunk, len(x)))
+        results.append(correlations(x[index], y[index]))
+    return np.concatenate(results)
+
+
+def _bootstrap_group_means(rng, size, values, codes, counts):
+    # Reamostragem estratificada: cada observação sorteia outra do próprio grupo
+    order = np.argsort(codes, kind='stable')
+    sorted_values, sorted_codes = values[order], codes[order]
+    sizes = counts.astype(np.int64)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    results = []
+    for chunk in chunk_sizes(size, len(values)):
+        draws = rng.random((chunk, len(values)))
+        index = starts[sorted_codes] + (draws * sizes[sorted_codes]).astype(np.int64)
+        results.append(_group_sums(sorted_values[index], sorted_codes, len(counts)) / counts)
+    return np.concatenate(results)
+
+
+# Geradores de réplicas: fn(rng, tamanho, *arrays) -> réplicas no eixo 0
+REPLICATE_FUNCTIONS = {
+    'permutation_f': _permutation_f,
+    'permutation_r': _permutation_r,
+    'bootstrap_r': _bootstrap_r,
+    'bootstrap_group_means': _bootstrap_group_means
+}
+
+
+def _replicate_function(kind):
+    """Gerador de réplicas e nome do fluxo aleatório (nome registrado ou função de topo de outro módulo)"""
+    if callable(kind):
+        return kind, f"{kind.__module__}.{kind.__qualname__}"
+    return REPLICATE_FUNCTIONS[kind], kind
+
+
+@worker_task
+def _run_block(kind, seed, size, arrays):
+    """Réplicas de um bloco (função de topo para ser serializável)"""
+    return _replicate_function(kind)[0](np.random.default_rng(seed), size, *arrays)
+
+
+def _encode_groups(groups):
+    """Códigos 0..k-1, rótulos e contagem de cada grupo"""
+    codes, labels = pd.factorize(pd.Series(groups), sort=True)
+    if (codes < 0).any():
+        raise ValueError("Grupos com valores ausentes")
+    return codes.astype(np.int64), labels, np.bincount(codes, minlength=len(labels)).astype(float)
+
+
+def _p_value(replicates, observed, two_sided=False):
+    """Valor de p da permutação: (1 + réplicas tão extremas quanto o observado) / (B + 1)"""
+    if not np.isfinite(observed):
+        # Estatística indefinida (ex.: variância zero): sem teste, nunca "significativo"
+        return np.nan
+    if two_sided:
+        replicates, observed = np.abs(replicates), abs(observed)
+    extreme = np.count_nonzero(replicates >= observed - TIE_TOLERANCE * abs(observed))
+    return (1 + extreme) / (len(replicates) + 1)
+
+
+class ResamplingEngine:
+    """Testes de permutação e intervalos bootstrap calculados em lote"""
+
+    def __init__(self, n_replicates=RESAMPLING_REPLICATES, seed=RESAMPLING_SEED,
+                 confidence=RESAMPLING_CONFIDENCE, max_workers=RESAMPLING_MAX_WORKERS):
+        """
+        Args:
+            n_replicates (int): réplicas por teste
+            seed (int): semente (mesma semente → mesmos resultados)
+            confidence (float): nível dos intervalos de confiança
+            max_workers (int): processos para os blocos de réplicas (1 = no processo atual)
+        """
+        if n_replicates < 1:
+            raise ValueError("n_replicates deve ser positivo")
+        self.n_replicates = int(n_replicates)
+        self.seed = seed
+        self.confidence = confidence
+        self.max_workers = max_workers
+
+    def replicates(self, kind, *arrays):
+        """
+        Gera as réplicas de uma estatística
+
+        Args:
+            kind: nome em REPLICATE_FUNCTIONS ou função de topo fn(rng, tamanho, *arrays)
+                (precisa ser importável nos processos de trabalho)
+            arrays: dados passados ao gerador (o primeiro define o número de observações)
+
+        Cada teste usa o seu próprio fluxo aleatório (semente + tipo), então
+        a ordem das chamadas não altera os resultados.
+        """
+        blocks = [RESAMPLING_BLOCK_SIZE] * (self.n_replicates // RESAMPLING_BLOCK_SIZE)
+        if self.n_replicates % RESAMPLING_BLOCK_SIZE:
+            blocks.append(self.n_replicates % RESAMPLING_BLOCK_SIZE)
+        _, name = _replicate_function(kind)
+        stream = zlib.crc32(name.encode('utf-8'))
+        seeds = np.random.SeedSequence([self.seed, stream]).spawn(len(blocks))
+
+        workers = min(self.max_workers, len(blocks), os.cpu_count() or 1)
+        with span('resampling.replicates', kind=name.rsplit('.', 1)[-1], replicates=self.n_replicates,
+                  observations=len(arrays[0]), workers=workers):
+            if workers <= 1:
+                parts = [_run_block(kind, seed, size, arrays) for seed, size in zip(seeds, blocks)]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    parts = list(executor.map(_run_block, [kind] * len(blocks), seeds, blocks,
+                                              [arrays] * len(blocks)))
+        return np.concatenate(parts)
+
+    def _interval(self, replicates):
+        alpha = (1 - self.confidence) / 2
+        lower, upper = np.nanquantile(replicates, [alpha, 1 - alpha], axis=0)
+        return lower, upper
+
+    def permutation_anova(self, values, groups):
+        """
+        ANOVA de um fator com valor de p por permutação
+
+        Returns:
+            dict: statistic (F observado), p_value, n_replicates
+        """
+        values = np.asarray(values, dtype=float)
+        codes, _, counts = _encode_groups(groups)
+        observed = f_statistics(values[None, :], codes, counts)[0]
+        if not np.isfinite(observed):
+            return {'statistic': observed, 'p_value': np.nan, 'n_replicates': self.n_replicates}
+        replicates = self.replicates('permutation_f', values, codes, counts)
+        return {'statistic': observed, 'p_value': _p_value(replicates, observed), 'n_replicates': self.n_replicates}
+
+    def permutation_levene(self, values, groups):
+        """
+        Homogeneidade de variâncias (Brown-Forsythe, centrado na mediana) por permutação
+
+        Como em `scipy.stats.levene`, a estatística é a ANOVA dos desvios
+        absolutos em relação à mediana de cada grupo; os desvios são
+        calculados uma vez e permutados entre os grupos.
+        """
+        values = np.asarray(values, dtype=float)
+        codes, _, _ = _encode_groups(groups)
+        medians = pd.Series(values).groupby(codes).transform('median').to_numpy()
+        return self.permutation_anova(np.abs(values - medians), codes)
+
+    def permutation_correlation(self, x, y):
+        """
+        Correlação de Pearson com valor de p bilateral por permutação
+
+        Returns:
+            dict: statistic (r observado), p_value, n_replicates
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        observed = correlations(x[None, :], y[None, :])[0]
+        if not np.isfinite(observed):
+            return {'statistic': observed, 'p_value': np.nan, 'n_replicates': self.n_replicates}
+        xz = (x - x.mean()) / x.std()
+        yz = (y - y.mean()) / y.std()
+        replicates = self.replicates('permutation_r', xz, yz)
+        return {
+            'statistic': observed,
+            'p_value': _p_value(replicates, observed, two_sided=True),
+            'n_replicates': self.n_replicates
+        }
+
+    def bootstrap_correlation(self, x, y):
+        """
+        Intervalo de confiança bootstrap (percentil) da correlação de Pearson
+
+        Returns:
+            dict: statistic, ci_lower, ci_upper, std_error, confidence
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        replicates = self.replicates('bootstrap_r', x, y)
+        lower, upper = self._interval(replicates)
+        return {
+            'statistic': correlations(x[None, :], y[None, :])[0],
+            'ci_lower': lower,
+            'ci_upper': upper,
+            'std_error': np.nanstd(replicates, ddof=1),
+            'confidence': self.confidence
+        }
+
+    def bootstrap_group_means(self, values, groups):
+        """
+        Intervalos bootstrap (estratificado por grupo) da média de cada grupo
+
+        Returns:
+            pd.DataFrame: média, ic_inferior e ic_superior, indexado pelo grupo
+        """
+        values = np.asarray(values, dtype=float)
+        codes, labels, counts = _encode_groups(groups)
+        replicates = self.replicates('bootstrap_group_means', values, codes, counts)
+        lower, upper = self._interval(replicates)
+        means = np.bincount(codes, weights=values, minlength=len(counts)) / counts
+        return pd.DataFrame(
+            {'media': means, 'ic_inferior': lower, 'ic_superior': upper},
+            index=pd.Index(labels, name=getattr(groups, 'name', None))
+        )
@@ -0,0 +1,402 @@
+"""
+Varredura de cenários de projeção com cache de resultados
+
+Um cenário é um conjunto de premissas sobre a projeção por coortes
+(multiplicadores de fecundidade, mortalidade e migração e o horizonte). A
+grade de parâmetros vira a lista de cenários distintos e cada um é
+projetado para todas as localidades:
+
+    runner = ScenarioRunner(df)
+    sweep = runner.submit({'migration_factor': [0, 1, 2], 'fertility_factor': [0.8, 1.0], 'horizon': [10, 20]})
+    sweep.wait()
+    sweep.summary()                   # um cenário por linha: premissas e população final
+    runner.read(sweep.scenario_ids)   # id × ano × cenário
+
+Trabalho repetido é feito uma única vez:
+    - combinações repetidas da grade são o mesmo cenário;
+    - a calibração (estrutura inicial e níveis das componentes) é calculada
+      uma vez e enviada uma vez a cada processo (inicializador do pool);
+    - cenários que só diferem no horizonte compartilham a projeção mais
+      longa (os anos iniciais são idênticos);
+    - cenários já gravados para os mesmos dados e taxas não são recalculados.
+
+Os resultados são gravados em lotes de SCENARIO_WRITE_BATCH cenários (uma
+versão do catálogo por lote, não por cenário), cada cenário como uma fonte
+do conjunto particionado (data/processed/projection_scenarios), com as
+premissas em _cenarios.json (lock de arquivo: várias varreduras podem
+gravar no mesmo conjunto). O progresso (`sweep.completed`, `on_result`)
+avança a cada resultado; só a gravação espera o lote. `sweep.cancel()`
+interrompe a varredura: grupos ainda não iniciados são descartados; o que
+já foi calculado é gravado.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from config.data_config import (
+    PROCESSED_DATA_PATH, SCENARIO_DATASET, SCENARIO_MAX_WORKERS, SCENARIO_WRITE_BATCH, PROJECTION_HORIZON,
+    DATASET_LOCK_TIMEOUT, ENCODING, TIMESTAMP_FORMAT
+)
+from src.analytics.projection import CohortProjection, ProjectionResult, projection_rates, project_cohorts
+from src.data.dataset_store import PartitionedDataset, slugify
+from src.data.file_lock import file_lock
+from src.data.fingerprint import data_fingerprint
+from src.monitoring.instrumentation import echo, increment, span, worker_task
+
+MANIFEST_FILENAME = '_cenarios.json'
+MANIFEST_LOCK_FILENAME = '_cenarios.lock'
+FACTOR_PARAMETERS = ('fertility_factor', 'mortality_factor', 'migration_factor')
+DEFAULT_SCENARIO = {'fertility_factor': 1.0, 'mortality_factor': 1.0, 'migration_factor': 1.0,
+                    'horizon': PROJECTION_HORIZON}
+
+# Insumos calibrados de cada processo de trabalho (chave: impressão digital da calibração)
+_worker_projections = {}
+
+
+def _init_worker(key, projection):
+    _worker_projections[key] = projection
+
+
+@worker_task
+def _project_group(key, factors, horizon):
+    """Projeta um grupo de cenários com os mesmos multiplicadores (função de topo para ser serializável)"""
+    projection = _worker_projections[key]
+    components = project_cohorts(projection.structure, projection.tfr, projection.mortality_scale,
+                                 projection.migrants, horizon, *factors)
+    components.pop('structure')  # só os totais e componentes voltam ao processo principal
+    return components
+
+
+def normalize_scenario(parameters):
+    """Premissas completas e com tipos estáveis (a mesma combinação gera sempre a mesma chave)"""
+    unknown = set(parameters) - set(DEFAULT_SCENARIO)
+    if unknown:
+        raise ValueError(f"Parâmetros de cenário desconhecidos: {sorted(unknown)}. Use {list(DEFAULT_SCENARIO)}")
+    scenario = {**DEFAULT_SCENARIO, **parameters}
+    scenario = {
+        **{name: round(float(scenario[name]), 10) for name in FACTOR_PARAMETERS},
+        'horizon': int(scenario['horizon'])
+    }
+    if scenario['horizon'] < 1:
+        raise ValueError("O horizonte deve ser de pelo menos 1 ano")
+    return scenario
+
+
+def expand_grid(grid):
+    """
+    Cenários distintos de uma grade
+
+    Args:
+        grid (dict | list): parâmetro -> lista de valores (produto cartesiano)
+            ou lista de dicionários de premissas
+
+    Returns:
+        list: premissas normalizadas, sem repetições, na ordem da grade
+    """
+    if isinstance(grid, dict):
+        names = list(grid)
+        values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in names]
+        combinations = [dict(zip(names, combination)) for combination in itertools.product(*values)]
+    else:
+        combinations = list(grid)
+
+    unique = {}
+    for combination in combinations:
+        scenario = normalize_scenario(combination)
+        unique.setdefault(json.dumps(scenario, sort_keys=True), scenario)
+    return list(unique.values())
+
+
+class ScenarioSweep:
+    """Varredura em andamento: progresso, cancelamento e resultados por cenário"""
+
+    def __init__(self, scenarios, scenario_ids):
+        self.scenarios = dict(zip(scenario_ids, scenarios))
+        self.scenario_ids = list(scenario_ids)
+        self.completed = {}
+        self.cached = set()
+        self.errors = {}
+        self.created_at = time.time()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"ScenarioSweep(cenarios={len(self.scenario_ids)}, estado={self.state}, progresso={self.progress:.0%})"
+
+    @property
+    def progress(self):
+        """Fração de cenários concluídos (0.0 a 1.0)"""
+        if not self.scenario_ids:
+            return 1.0
+        return len(self.completed) / len(self.scenario_ids)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def state(self):
+        """'running', 'cancelled', 'failed' ou 'done'"""
+        if not self._finished.is_set():
+            return 'running'
+        if self.cancelled:
+            return 'cancelled'
+        return 'failed' if self.errors else 'done'
+
+    def cancel(self):
+        """
+        Interrompe a varredura: grupos ainda na fila são descartados e os que
+        estão em execução terminam sem ser gravados (resultados já calculados
+        e ainda no lote são gravados)
+
+        Returns:
+            int: grupos descartados antes de começar
+        """
+        self._cancelled.set()
+        with self._lock:
+            discarded = sum(1 for future in self._futures if future.cancel())
+        increment('scenarios.cancelled')
+        return discarded
+
+    def wait(self, timeout=None):
+        """Aguarda o fim (ou cancelamento) da varredura; retorna o estado"""
+        self._finished.wait(timeout)
+        return self.state
+
+    def summary(self):
+        """Premissas e resultado agregado de cada cenário concluído"""
+        rows = [
+            {'cenario': scenario_id, **self.scenarios[scenario_id], **self.completed[scenario_id],
+             'em_cache': scenario_id in self.cached}
+            for scenario_id in self.scenario_ids if scenario_id in self.completed
+        ]
+        return pd.DataFrame(rows)
+
+
+class ScenarioRunner:
+    """Executa grades de cenários sobre a mesma calibração e grava os resultados"""
+
+    def __init__(self, data, rates=None, max_workers=SCENARIO_MAX_WORKERS, base_dir=PROCESSED_DATA_PATH,
+                 nivel=None, executor_class=ProcessPoolExecutor, write_batch=SCENARIO_WRITE_BATCH):
+        """
+        Args:
+            data (pd.DataFrame): painel com id, ano e populacao (o ano mais recente é o ano base)
+            rates (pd.DataFrame): taxas por código (padrão: projeções arquivadas)
+            max_workers (int): processos (limitado ao número de CPUs e de grupos)
+            base_dir (str): diretório do conjunto de resultados
+            nivel (str): nível geográfico gravado nas partições (padrão: pelo tamanho dos códigos)
+            write_batch (int): cenários acumulados por gravação no conjunto particionado
+        """
+        rates = projection_rates() if rates is None else rates
+        self.projection = CohortProjection.from_panel(data, rates)
+        self.key = hashlib.sha1(
+            (data_fingerprint(data) + data_fingerprint(rates.reset_index())).encode('utf-8')
+        ).hexdigest()[:16]
+        self.nivel = nivel or ('UF' if self.projection.codes.max() < 100 else 'municipio')
+        self.max_workers = max_workers
+        self.executor_class = executor_class
+        self.write_batch = max(int(write_batch), 1)
+        self.store = PartitionedDataset(SCENARIO_DATASET, base_dir=base_dir)
+        self.manifest_path = os.path.join(self.store.root, MANIFEST_FILENAME)
+        self.manifest_lock_path = os.path.join(self.store.root, MANIFEST_LOCK_FILENAME)
+        self._manifest_lock = threading.Lock()
+
+    def scenario_id(self, scenario):
+        """Identificador do cenário para estes dados e taxas"""
+        text = self.key + json.dumps(scenario, sort_keys=True)
+        return f"cen-{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}"
+
+    def load_manifest(self):
+        """Cenários gravados: id -> premissas, resumo e data"""
+        try:
+            with open(self.manifest_path, 'r', encoding=ENCODING) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, entries):
+        """
+        Acrescenta cenários ao manifesto (arquivo temporário + rename)
+
+        O read-modify-write fica sob lock de arquivo: outras varreduras (em
+        outros processos) gravando no mesmo conjunto não perdem entradas.
+
+        Args:
+            entries (dict): id -> (premissas, resumo)
+        """
+        recorded_at = time.strftime(TIMESTAMP_FORMAT)
+        with self._manifest_lock, file_lock(self.manifest_lock_path, timeout=DATASET_LOCK_TIMEOUT):
+            manifest = self.load_manifest()
+            for scenario_id, (scenario, summary) in entries.items():
+                manifest[scenario_id] = {
+                    'premissas': scenario,
+                    'resumo': summary,
+                    'dados': self.key,
+                    'gravado_em': recorded_at
+                }
+            os.makedirs(self.store.root, exist_ok=True)
+            tmp_path = f"{self.manifest_path}.tmp{os.getpid()}"
+            with open(tmp_path, 'w', encoding=ENCODING) as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def _stored_ids(self):
+        """Cenários com manifesto e partições no catálogo atual"""
+        sources = {partition['fonte'] for partition in self.store.load_catalog()['partitions']}
+        return {scenario_id for scenario_id in self.load_manifest() if slugify(scenario_id) in sources}
+
+    def submit(self, grid, on_result=None, reuse_stored=True):
+        """
+        Inicia uma varredura em segundo plano
+
+        Args:
+            grid (dict | list): grade de parâmetros (ver `expand_grid`)
+            on_result (callable): chamado com (id, premissas, resumo) a cada cenário calculado
+                (a gravação é feita em lotes); pode chamar `sweep.cancel()` para parar cedo
+            reuse_stored (bool): não recalcular cenários já gravados
+
+        Returns:
+            ScenarioSweep
+        """
+        scenarios = expand_grid(grid)
+        ids = [self.scenario_id(scenario) for scenario in scenarios]
+        sweep = ScenarioSweep(scenarios, ids)
+
+        manifest = self.load_manifest() if reuse_stored else {}
+        stored = self._stored_ids() if reuse_stored else set()
+        for scenario_id in ids:
+            if scenario_id in stored:
+                sweep.completed[scenario_id] = manifest[scenario_id]['resumo']
+                sweep.cached.add(scenario_id)
+        increment('scenarios.cached', len(sweep.cached))
+
+        # Cenários que só diferem no horizonte: uma projeção (a mais longa) por grupo
+        groups = {}
+        for scenario_id, scenario in zip(ids, scenarios):
+            if scenario_id not in sweep.cached:
+                factors = tuple(scenario[name] for name in FACTOR_PARAMETERS)
+                groups.setdefault(factors, []).append(scenario_id)
+
+        thread = threading.Thread(target=self._run, args=(sweep, groups, on_result), daemon=True)
+        thread.start()
+        return sweep
+
+    def run(self, grid, on_result=None, reuse_stored=True, timeout=None):
+        """Executa a varredura e aguarda o fim; retorna o resumo dos cenários"""
+        sweep = self.submit(grid, on_result, reuse_stored)
+        sweep.wait(timeout)
+        return sweep
+
+    def _run(self, sweep, groups, on_result):
+        """Distribui os grupos entre os processos e grava cada resultado assim que chega"""
+        workers = min(self.max_workers, len(groups), os.cpu_count() or 1)
+        executor_class = self.executor_class if workers > 1 else ThreadPoolExecutor
+        try:
+            with span('scenarios.sweep', scenarios=len(sweep.scenario_ids), groups=len(groups),
+                      cached=len(sweep.cached), workers=workers):
+                if not groups or sweep.cancelled:
+                    return
+                with executor_class(max_workers=max(workers, 1), initializer=_init_worker,
+                                    initargs=(self.key, self.projection)) as executor:
+                    futures = {}
+                    with sweep._lock:
+                        for factors, scenario_ids in groups.items():
+                            horizon = max(sweep.scenarios[scenario_id]['horizon'] for scenario_id in scenario_ids)
+                            future = executor.submit(_project_group, self.key, factors, horizon)
+                            futures[future] = scenario_ids
+                            sweep._futures.append(future)
+
+                    pending = []
+                    for future in as_completed(futures):
+                        if sweep.cancelled:
+                            break
+                        if future.cancelled():
+                            continue
+                        try:
+                            components = future.result()
+                        except Exception as e:
+                            for scenario_id in futures[future]:
+                                sweep.errors[scenario_id] = str(e)
+                            echo(f"❌ Falha no grupo de cenários {futures[future]}: {e}")
+                            continue
+                        for scenario_id in futures[future]:
+                            pending.append(self._result(sweep, scenario_id, components))
+                            self._complete(sweep, pending[-1], on_result)
+                        if len(pending) >= self.write_batch:
+                            self._flush(sweep, pending)
+                    if sweep.cancelled:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    self._flush(sweep, pending)
+        finally:
+            sweep._finished.set()
+            echo(f"🧮 Varredura: {len(sweep.completed)}/{len(sweep.scenario_ids)} cenário(s) "
+                 f"({len(sweep.cached)} em cache){' - cancelada' if sweep.cancelled else ''}")
+
+    def _result(self, sweep, scenario_id, components):
+        """Recorta o horizonte do cenário; retorna (id, linhas, resumo)"""
+        horizon = sweep.scenarios[scenario_id]['horizon']
+        result = ProjectionResult(self.projection.codes, self.projection.base_year, {
+            'totals': components['totals'][:horizon + 1],
+            'births': components['births'][:horizon],
+            'deaths': components['deaths'][:horizon],
+            'migration': components['migration'][:horizon],
+            'structure': None
+        })
+        frame = result.to_frame()
+        # Pessoas inteiras: formatar floats com 17 dígitos dominava a gravação em CSV
+        counts = ['populacao_projetada', 'nascimentos', 'obitos', 'migracao_liquida']
+        frame[counts] = frame[counts].round().astype('Int64')
+        frame['fonte'] = scenario_id  # uma fonte por cenário (exposta como 'cenario' em `read`)
+
+        initial, final = result.totals[0].sum(), result.totals[-1].sum()
+        summary = {
+            'ano_final': int(result.years[-1]),
+            'populacao_final': float(final),
+            'crescimento_percentual': float((final / initial - 1) * 100)
+        }
+        return scenario_id, frame, summary
+
+    def _complete(self, sweep, result, on_result):
+        """Marca o cenário como concluído assim que o resultado chega (a gravação é em lote)"""
+        scenario_id, _, summary = result
+        sweep.completed[scenario_id] = summary
+        increment('scenarios.completed')
+        if on_result is not None:
+            on_result(scenario_id, sweep.scenarios[scenario_id], summary)
+
+    def _flush(self, sweep, pending):
+        """Grava o lote em uma única escrita (uma versão do catálogo) e depois o manifesto"""
+        if not pending:
+            return
+        batch, pending[:] = list(pending), []
+        try:
+            self.store.write(pd.concat([frame for _, frame, _ in batch], ignore_index=True), nivel=self.nivel)
+            self._record({
+                scenario_id: (sweep.scenarios[scenario_id], summary) for scenario_id, _, summary in batch
+            })
+        except (OSError, TimeoutError) as e:
+            # Sem gravação o cenário não fica disponível em `read`: volta como erro
+            for scenario_id, _, _ in batch:
+                sweep.completed.pop(scenario_id, None)
+                sweep.errors[scenario_id] = str(e)
+            echo(f"❌ Falha ao gravar {len(batch)} cenário(s): {e}")
+
+    def read(self, scenario_ids=None, years=None, columns=None):
+        """Resultados gravados (id × ano × cenário), com poda por cenário e ano"""
+        filters = {'nivel': self.nivel}
+        if scenario_ids is not None:
+            filters['fonte'] = list(scenario_ids)
+        if years is not None:
+            filters['ano'] = list(years)
+        if columns is not None:
+            columns = ['fonte' if column == 'cenario' else column for column in columns]
+        return self.store.read(columns=columns, filters=filters).rename(columns={'fonte': 'cenario'})
@@ -0,0 +1,357 @@
+"""
+Autocorrelação espacial: Moran global e local (LISA) e Getis-Ord Gi*
+
+As vizinhanças vêm de tabelas de adjacência (pares de códigos IBGE com
+fronteira comum) e viram matrizes esparsas CSR; as estatísticas são
+produtos matriz esparsa × vetor. A inferência é por permutação, com as
+réplicas geradas em lote pelo `ResamplingEngine`:
+
+    weights = weights_for(df['id'], level='UF')
+    moran_global(df['populacao'], weights)      # {'moran_i', 'p_value', ...}
+    moran_local(df['populacao'], weights)       # uma linha por localidade, com o cluster
+    getis_ord(df['populacao'], weights)         # z de Gi* e hotspots
+
+A tabela das UFs acompanha o projeto (data/external/adjacencia_uf.csv). A
+dos municípios (mesmo formato: origem,destino) é gerada a partir da malha
+municipal do IBGE e gravada em data/external/adjacencia_municipios.csv.
+
+Nos testes locais a permutação é condicional: o valor da própria
+localidade fica fixo e os vizinhos são sorteados entre as demais. Como no
+PySAL, o mesmo sorteio de vizinhos é usado para todas as localidades em uma
+réplica, o que permite calcular todas de uma vez.
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.stats import norm
+
+from config.data_config import (
+    ADJACENCY_UF_FILE, ADJACENCY_MUNICIPIOS_FILE, SPATIAL_PERMUTATIONS, SPATIAL_SIGNIFICANCE,
+    RESAMPLING_CHUNK_ELEMENTS, ENCODING
+)
+from src.analytics.resampling import ResamplingEngine, chunk_sizes, permutation_indices
+from src.monitoring.instrumentation import echo, span
+
+ADJACENCY_FILES = {
+    'UF': ADJACENCY_UF_FILE,
+    'municipio': ADJACENCY_MUNICIPIOS_FILE
+}
+
+# Quadrantes do diagrama de Moran (valor × média dos vizinhos, padronizados)
+CLUSTER_LABELS = {1: 'Alto-Alto', 2: 'Baixo-Alto', 3: 'Baixo-Baixo', 4: 'Alto-Baixo'}
+NOT_SIGNIFICANT = 'Não significativo'
+NO_NEIGHBORS = 'Sem vizinhos'
+
+
+@lru_cache(maxsize=None)
+def _read_adjacency(path):
+    return pd.read_csv(path, dtype={'origem': 'int64', 'destino': 'int64'}, encoding=ENCODING)
+
+
+def load_adjacency(level='UF'):
+    """
+    Tabela de adjacência de um nível ('UF' ou 'municipio')
+
+    Returns:
+        pd.DataFrame: pares (origem, destino) de códigos IBGE vizinhos
+    """
+    if level not in ADJACENCY_FILES:
+        raise ValueError(f"Nível sem tabela de adjacência: {level}. Use um de {list(ADJACENCY_FILES)}")
+    path = ADJACENCY_FILES[level]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Tabela de adjacência de '{level}' não encontrada em {path}")
+    return _read_adjacency(path)
+
+
+class SpatialWeights:
+    """Matriz de vizinhança binária e simétrica (CSR) alinhada a uma lista de códigos"""
+
+    def __init__(self, codes, matrix):
+        """
+        Args:
+            codes (np.ndarray): código IBGE de cada linha/coluna
+            matrix (sparse.csr_matrix): 1 onde as localidades são vizinhas
+        """
+        self.codes = np.asarray(codes, dtype='int64')
+        self.matrix = sparse.csr_matrix(matrix, dtype='float64')
+        self.cardinalities = np.diff(self.matrix.indptr)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __repr__(self):
+        return (f"SpatialWeights(n={len(self)}, vizinhos médios={self.cardinalities.mean():.2f}, "
+                f"ilhas={len(self.islands)})")
+
+    @classmethod
+    def from_pairs(cls, pairs, codes=None):
+        """
+        Monta a matriz a partir de pares de vizinhos
+
+        Args:
+            pairs (pd.DataFrame): colunas origem e destino (cada par em qualquer sentido)
+            codes: ordem das localidades (padrão: todos os códigos da tabela, ordenados).
+                Pares com códigos fora da lista são ignorados; códigos sem pares ficam sem vizinhos.
+        """
+        origins = pairs['origem'].to_numpy(dtype='int64')
+        destinations = pairs['destino'].to_numpy(dtype='int64')
+        if codes is None:
+            codes = np.unique(np.concatenate([origins, destinations]))
+        codes = np.asarray(codes, dtype='int64')
+        if len(np.unique(codes)) != len(codes):
+            raise ValueError("Códigos repetidos na lista de localidades")
+
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+
+        def positions(values):
+            found = np.clip(np.searchsorted(sorted_codes, values), 0, max(len(codes) - 1, 0))
+            known = (sorted_codes[found] == values) if len(codes) else np.zeros(len(values), bool)
+            return order[found], known
+
+        rows, known_rows = positions(origins)
+        cols, known_cols = positions(destinations)
+        keep = known_rows & known_cols & (rows != cols)
+        rows, cols = rows[keep], cols[keep]
+
+        # Simétrica e binária, mesmo que a tabela traga os dois sentidos do par
+        matrix = sparse.coo_matrix(
+            (np.ones(2 * len(rows)), (np.r_[rows, cols], np.r_[cols, rows])), shape=(len(codes), len(codes))
+        ).tocsr()
+        matrix.data[:] = 1.0
+        return cls(codes, matrix)
+
+    @property
+    def islands(self):
+        """Códigos sem nenhum vizinho"""
+        return self.codes[self.cardinalities == 0]
+
+    def row_standardized(self):
+        """W com linhas somando 1 (linhas das ilhas ficam zeradas)"""
+        with np.errstate(divide='ignore'):
+            scale = np.where(self.cardinalities > 0, 1.0 / self.cardinalities, 0.0)
+        return sparse.diags(scale) @ self.matrix
+
+    def padded(self, matrix=None):
+        """
+        Pesos dos vizinhos de cada linha em uma matriz densa n × (máximo de vizinhos)
+
+        A ordem dos vizinhos não importa para a permutação condicional, só os pesos.
+        """
+        matrix = self.matrix if matrix is None else sparse.csr_matrix(matrix)
+        counts = np.diff(matrix.indptr)
+        padded = np.zeros((matrix.shape[0], int(counts.max()) if len(counts) else 0))
+        rows = np.repeat(np.arange(matrix.shape[0]), counts)
+        slots = np.arange(matrix.nnz) - matrix.indptr[rows]
+        padded[rows, slots] = matrix.data
+        return padded
+
+
+def weights_for(codes, level='UF'):
+    """Matriz de vizinhança alinhada aos códigos informados (na mesma ordem)"""
+    weights = SpatialWeights.from_pairs(load_adjacency(level), np.asarray(codes))
+    if len(weights.islands):
+        echo(f"⚠️ {len(weights.islands)} localidade(s) sem vizinhos na tabela de '{level}'")
+    return weights
+
+
+def _permutation_moran(rng, size, z, weights):
+    # I de cada réplica: z' W z / z' z (com W padronizada, S0 = número de linhas com vizinhos)
+    s0 = weights.sum()
+    scale = len(z) / s0 / (z @ z)
+    results = []
+    for chunk in chunk_sizes(size, len(z)):
+        samples = z[permutation_indices(rng, chunk, len(z))]
+        lags = (weights @ samples.T).T
+        results.append(scale * (samples * lags).sum(axis=1))
+    return np.concatenate(results)
+
+
+def _conditional_lags(rng, size, values, padded):
+    """
+    Soma ponderada de vizinhos sorteados entre as demais localidades (réplicas × localidades)
+
+    Em cada réplica sorteia-se, sem reposição, uma sequência de n-1 posições;
+    a localidade i usa as primeiras k_i, deslocadas para pular a própria i.
+    """
+    n_observations, max_neighbors = padded.shape
+    results = []
+    for chunk in chunk_sizes(size, n_observations):
+        lags = np.zeros((chunk, n_observations))
+        if max_neighbors:
+            draws = permutation_indices(rng, chunk, n_observations - 1)[:, :max_neighbors]
+            step = max(1, RESAMPLING_CHUNK_ELEMENTS // (chunk * max_neighbors))
+            for start in range(0, n_observations, step):
+                rows = np.arange(start, min(start + step, n_observations))
+                index = draws[None, :, :] + (draws[None, :, :] >= rows[:, None, None])
+                lags[:, rows] = np.einsum('rck,rk->cr', values[index], padded[rows])
+        results.append(lags)
+    return np.concatenate(results)
+
+
+def _folded_p_values(replicates, observed):
+    """Valor de p por localidade na direção do valor observado (como no PySAL)"""
+    larger = (replicates >= observed[None, :]).sum(axis=0)
+    n_replicates = replicates.shape[0]
+    larger = np.minimum(larger, n_replicates - larger)
+    return (larger + 1) / (n_replicates + 1)
+
+
+def _standardize(values):
+    values = np.asarray(values, dtype=float)
+    std = values.std()
+    if not np.isfinite(std) or std == 0:
+        raise ValueError("Valores constantes: autocorrelação espacial indefinida")
+    return (values - values.mean()) / std
+
+
+def moran_global(values, weights, engine=None):
+    """
+    I de Moran global com valor de p por permutação
+
+    Args:
+        values: valor de cada localidade, na ordem de `weights.codes`
+        weights (SpatialWeights): vizinhança
+        engine (ResamplingEngine): réplicas (padrão: SPATIAL_PERMUTATIONS)
+
+    Returns:
+        dict: moran_i, expected_i, p_value (bilateral), z_sim, n_permutations
+    """
+    engine = engine or ResamplingEngine(n_replicates=SPATIAL_PERMUTATIONS)
+    z = _standardize(values)
+    standardized = weights.row_standardized()
+    with span('spatial.moran_global', locations=len(z)):
+        observed = len(z) / standardized.sum() * (z @ (standardized @ z)) / (z @ z)
+        replicates = engine.replicates(_permutation_moran, z, standardized)
+
+    expected = -1.0 / (len(z) - 1)
+    extreme = np.count_nonzero(np.abs(replicates - expected) >= abs(observed - expected))
+    return {
+        'moran_i': observed,
+        'expected_i': expected,
+        'p_value': (1 + extreme) / (len(replicates) + 1),
+        'z_sim': (observed - replicates.mean()) / replicates.std(),
+        'n_permutations': len(replicates)
+    }
+
+
+def moran_local(values, weights, engine=None, significance=SPATIAL_SIGNIFICANCE):
+    """
+    I de Moran local (LISA) com permutação condicional
+
+    Returns:
+        pd.DataFrame: por código, valor, z, lag (média padronizada dos vizinhos),
+            moran_local, p_valor, quadrante e cluster ('Alto-Alto', ..., 'Não significativo')
+    """
+    engine = engine or ResamplingEngine(n_replicates=SPATIAL_PERMUTATIONS)
+    z = _standardize(values)
+    standardized = weights.row_standardized()
+    with span('spatial.moran_local', locations=len(z)):
+        lag = standardized @ z
+        observed = z * lag
+        simulated = engine.replicates(_conditional_lags, z, weights.padded(standardized)) * z[None, :]
+        p_values = _folded_p_values(simulated, observed)
+
+    quadrant = np.select(
+        [(z > 0) & (lag > 0), (z <= 0) & (lag > 0), (z <= 0) & (lag <= 0)], [1, 2, 3], default=4
+    )
+    islands = weights.cardinalities == 0
+    p_values = np.where(islands, np.nan, p_values)
+    cluster = np.where(p_values < significance, pd.Series(quadrant).map(CLUSTER_LABELS), NOT_SIGNIFICANT)
+    cluster = np.where(islands, NO_NEIGHBORS, cluster)
+
+    return pd.DataFrame({
+        'valor': np.asarray(values, dtype=float),
+        'z': z,
+        'lag': lag,
+        'moran_local': observed,
+        'p_valor': p_values,
+        'quadrante': quadrant,
+        'cluster': cluster
+    }, index=pd.Index(weights.codes, name='id'))
+
+
+def getis_ord(values, weights, engine=None, significance=SPATIAL_SIGNIFICANCE):
+    """
+    Gi* de Getis-Ord (vizinhança binária incluindo a própria localidade)
+
+    O z de Gi* tem valor de p pela normal; `gi_p_valor_permutacao` usa a
+    permutação condicional (o próprio valor fixo, vizinhos sorteados).
+
+    Returns:
+        pd.DataFrame: por código, valor, gi_z, gi_p_valor, gi_p_valor_permutacao e
+            hotspot ('Hotspot', 'Coldspot' ou 'Não significativo')
+    """
+    engine = engine or ResamplingEngine(n_replicates=SPATIAL_PERMUTATIONS)
+    x = np.asarray(values, dtype=float)
+    n_observations = len(x)
+    mean = x.mean()
+    std = np.sqrt((x ** 2).mean() - mean ** 2)
+    with span('spatial.getis_ord', locations=n_observations):
+        neighbor_sums = weights.matrix @ x
+        w_sum = weights.cardinalities + 1.0  # pesos binários: soma = soma dos quadrados
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gi_z = (x + neighbor_sums - mean * w_sum) / (
+                std * np.sqrt((n_observations * w_sum - w_sum ** 2) / (n_observations - 1))
+            )
+        simulated = engine.replicates(_conditional_lags, x, weights.padded())
+        p_permutation = _folded_p_values(simulated, neighbor_sums)
+
+    islands = weights.cardinalities == 0
+    p_permutation = np.where(islands, np.nan, p_permutation)
+    significant = p_permutation < significance
+    classification = np.where(significant & (gi_z > 0), 'Hotspot',
+                              np.where(significant & (gi_z < 0), 'Coldspot', NOT_SIGNIFICANT))
+
+    return pd.DataFrame({
+        'valor': x,
+        'gi_z': gi_z,
+        'gi_p_valor': 2 * norm.sf(np.abs(gi_z)),
+        'gi_p_valor_permutacao': p_permutation,
+        'hotspot': classification
+    }, index=pd.Index(weights.codes, name='id'))
+
+
+def detect_level(codes):
+    """'UF' para códigos de 2 dígitos, 'municipio' para os de 7"""
+    return 'UF' if np.max(np.asarray(codes)) < 100 else 'municipio'
+
+
+def spatial_analysis(df, value='populacao', year=None, level=None, engine=None):
+    """
+    Moran global, LISA e Gi* de um ano do painel
+
+    Args:
+        df (pd.DataFrame): painel com id, ano e a coluna de valor
+        value (str): coluna analisada
+        year (int): ano (padrão: o mais recente)
+        level (str): 'UF' ou 'municipio' (padrão: pelo tamanho dos códigos)
+        engine (ResamplingEngine): réplicas das permutações
+
+    Returns:
+        dict: year, level, global, local (LISA + Gi*, com nome/sigla se houver), weights
+    """
+    year = int(df['ano'].max()) if year is None else year
+    snapshot = df[df['ano'] == year].groupby('id', sort=True)[value].sum()
+    level = level or detect_level(snapshot.index)
+    weights = weights_for(snapshot.index, level)
+
+    local = moran_local(snapshot, weights, engine).join(
+        getis_ord(snapshot, weights, engine).drop(columns='valor')
+    )
+    attributes = [column for column in ('nome', 'sigla') if column in df.columns]
+    if attributes:
+        names = df.drop_duplicates('id').set_index('id')[attributes]
+        local = names.reindex(local.index).join(local)
+
+    return {
+        'year': year,
+        'level': level,
+        'global': moran_global(snapshot, weights, engine),
+        'local': local,
+        'weights': weights
+    }
@@ -14,21 +14,60 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import warnings
+from src.analytics.figure_cache import get_figure_cache
+from src.analytics.derived_metrics import get_derived_metrics
+from src.analytics.projection import CohortProjection, projection_rates
+from src.analytics.resampling import ResamplingEngine
+from src.analytics.scenarios import ScenarioRunner
+from src.analytics.spatial import spatial_analysis
+from config.data_config import PROJECTION_HORIZON
+from src.data.fingerprint import data_fingerprint
+from src.monitoring.instrumentation import echo, timed
 warnings.filterwarnings('ignore')
 
 class PopulationAnalyzer:
     """Analisador estatístico avançado para dados populacionais"""
     
-    def __init__(self, data):
+    def __init__(self, data, resampling=None):
         """
         Inicializa o analisador com dados populacionais
         
         Args:
             data (pd.DataFrame): DataFrame com dados populacionais
+            resampling (ResamplingEngine): motor dos testes por reamostragem (padrão: semente fixa da configuração)
         """
         self.data = data
+        self.resampling = resampling or ResamplingEngine()
         self.results = {}
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """Impressão digital dos dados analisados (usada como chave de cache)"""
+        if self._fingerprint is None:
+            self._fingerprint = data_fingerprint(self.data)
+        return self._fingerprint
+
+    def render_figure(self, figure_type='analysis', fmt='png'):
+        """
+        Retorna a figura renderizada em bytes, usando o cache compartilhado
+
+        Args:
+            figure_type (str): 'analysis' (painel 2x2) ou 'distribution'
+            fmt (str): 'png' ou 'svg'
+        """
+        builders = {
+            'analysis': self.plot_analysis,
+            'distribution': self._build_distribution_figure
+        }
+        if figure_type not in builders:
+            raise ValueError(f"Tipo de figura desconhecido: {figure_type}")
+
+        return get_figure_cache().get_or_render(
+            self.fingerprint, figure_type, builders[figure_type], fmt=fmt
+        )
         
+    @timed('analysis.basic_statistics')
     def basic_statistics(self):
         """Calcula estatísticas básicas da população"""
         stats_dict = {
@@ -48,6 +87,7 @@ class PopulationAnalyzer:
         self.results['basic_stats'] = stats_dict
         return stats_dict
     
+    @timed('analysis.distribution_analysis')
     def distribution_analysis(self):
         """Análise de distribuição da população"""
         population = self.data['populacao']
@@ -55,6 +95,20 @@ class PopulationAnalyzer:
         # Teste de normalidade (Shapiro-Wilk)
         shapiro_stat, shapiro_p = shapiro(population)
         
+        distribution_results = {
+            'shapiro_statistic': shapiro_stat,
+            'shapiro_p_value': shapiro_p,
+            'is_normal': shapiro_p > 0.05,
+            'figure_png': self.render_figure('distribution')
+        }
+        
+        self.results['distribution'] = distribution_results
+        return distribution_results
+    
+    def _build_distribution_figure(self):
+        """Constrói a figura de histograma e Q-Q plot da população"""
+        population = self.data['populacao']
+        
         # Histograma e densidade
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
         
@@ -69,17 +123,9 @@ class PopulationAnalyzer:
         ax2.set_title('Q-Q Plot - Teste de Normalidade')
         
         plt.tight_layout()
-        
-        distribution_results = {
-            'shapiro_statistic': shapiro_stat,
-            'shapiro_p_value': shapiro_p,
-            'is_normal': shapiro_p > 0.05,
-            'figure': fig
-        }
-        
-        self.results['distribution'] = distribution_results
-        return distribution_results
+        return fig
     
+    @timed('analysis.regional_analysis')
     def regional_analysis(self):
         """Análise comparativa entre anos (já que não temos região)"""
         # Criar análise por ano em vez de região
@@ -96,18 +142,27 @@ class PopulationAnalyzer:
         # Teste de homogeneidade de variâncias (Levene)
         levene_stat, levene_p = levene(*year_groups)
         
+        # Mesmos testes por permutação (a população não é normal) e IC bootstrap das médias
+        anova_perm = self.resampling.permutation_anova(self.data['populacao'], self.data['ano'])
+        levene_perm = self.resampling.permutation_levene(self.data['populacao'], self.data['ano'])
+        
         regional_results = {
             'yearly_stats': yearly_stats,
             'anova_f_statistic': f_stat,
             'anova_p_value': p_value,
+            'anova_permutation_p_value': anova_perm['p_value'],
             'levene_statistic': levene_stat,
             'levene_p_value': levene_p,
-            'significant_differences': p_value < 0.05
+            'levene_permutation_p_value': levene_perm['p_value'],
+            'yearly_mean_ci': self.resampling.bootstrap_group_means(self.data['populacao'], self.data['ano']),
+            'n_replicates': self.resampling.n_replicates,
+            'significant_differences': anova_perm['p_value'] < 0.05
         }
         
         self.results['regional'] = regional_results
         return regional_results
     
+    @timed('analysis.correlation_analysis')
     def correlation_analysis(self):
         """Análise de correlações"""
         # Criar variáveis numéricas para correlação
@@ -119,16 +174,69 @@ class PopulationAnalyzer:
         # Correlação entre população e ano
         pop_year_corr, pop_year_p = pearsonr(df_corr['populacao'], df_corr['ano'])
         
+        # Valor de p por permutação e IC bootstrap da correlação
+        permutation = self.resampling.permutation_correlation(df_corr['populacao'], df_corr['ano'])
+        bootstrap = self.resampling.bootstrap_correlation(df_corr['populacao'], df_corr['ano'])
+        
         correlation_results = {
             'correlation_matrix': correlation_matrix,
             'population_year_correlation': pop_year_corr,
             'population_year_p_value': pop_year_p,
-            'significant_correlation': pop_year_p < 0.05
+            'population_year_permutation_p_value': permutation['p_value'],
+            'population_year_ci': (bootstrap['ci_lower'], bootstrap['ci_upper']),
+            'n_replicates': self.resampling.n_replicates,
+            'significant_correlation': permutation['p_value'] < 0.05
         }
         
         self.results['correlation'] = correlation_results
         return correlation_results
     
+    @timed('analysis.growth_analysis')
+    def growth_analysis(self, cagr_windows=(1, 3, 5), horizon=5):
+        """Crescimento anual, CAGR, rankings e projeção para todos os locais"""
+        derived = get_derived_metrics(self.data, cagr_windows)
+        latest_year = int(derived.years[-1])
+        latest = derived.for_year(latest_year)
+        
+        # Crescimento nacional no período observado
+        national = derived.to_frame().groupby('ano')['populacao'].sum()
+        span = national.index[-1] - national.index[0]
+        national_cagr = ((national.iloc[-1] / national.iloc[0]) ** (1 / span) - 1) * 100 if span > 0 else 0.0
+        
+        growth_results = {
+            'metrics': derived.to_frame(),
+            'latest_year': latest_year,
+            'fastest_growing': latest.nlargest(5, 'crescimento_percentual'),
+            'largest_rank_gains': latest[latest['variacao_ranking'] > 0].nlargest(5, 'variacao_ranking'),
+            'national_cagr': national_cagr,
+            'projection': derived.projection(horizon)
+        }
+        
+        self.results['growth'] = growth_results
+        return growth_results
+    
+    @timed('analysis.spatial_analysis')
+    def spatial_analysis(self, year=None, level=None):
+        """Autocorrelação espacial da população (Moran global/local e hotspots Gi*)"""
+        spatial = spatial_analysis(self.data, 'populacao', year, level)
+        local = spatial['local']
+        
+        spatial_results = {
+            'year': spatial['year'],
+            'level': spatial['level'],
+            'moran_i': spatial['global']['moran_i'],
+            'moran_p_value': spatial['global']['p_value'],
+            'significant_autocorrelation': spatial['global']['p_value'] < 0.05,
+            'local': local,
+            'clusters': local['cluster'].value_counts(),
+            'hotspots': local[local['hotspot'] == 'Hotspot'],
+            'coldspots': local[local['hotspot'] == 'Coldspot']
+        }
+        
+        self.results['spatial'] = spatial_results
+        return spatial_results
+    
+    @timed('analysis.outlier_detection')
     def outlier_detection(self):
         """Detecção de outliers usando IQR e Z-score"""
         population = self.data['populacao']
@@ -160,6 +268,7 @@ class PopulationAnalyzer:
         self.results['outliers'] = outlier_results
         return outlier_results
     
+    @timed('analysis.predictive_modeling')
     def predictive_modeling(self):
         """Modelos preditivos para população"""
         # Preparar dados
@@ -213,6 +322,53 @@ class PopulationAnalyzer:
         self.results['predictive'] = model_results
         return model_results
     
+    @timed('analysis.cohort_projection')
+    def cohort_projection(self, horizon=PROJECTION_HORIZON, rates=None, **factors):
+        """
+        Projeção por componentes demográficos (coortes idade × sexo) de todos os locais
+        
+        Args:
+            horizon (int): anos projetados a partir do último ano dos dados
+            rates (pd.DataFrame): taxas por código (padrão: projeções arquivadas da API)
+            factors: multiplicadores de cenário (fertility_factor, mortality_factor, migration_factor)
+        """
+        rates = projection_rates() if rates is None else rates
+        result = CohortProjection.from_panel(self.data, rates).run(horizon, **factors)
+        projection = result.to_frame()
+        national = projection.groupby('ano')[
+            ['populacao_projetada', 'nascimentos', 'obitos', 'migracao_liquida']
+        ].sum(min_count=1)
+        
+        initial, final = national['populacao_projetada'].iloc[[0, -1]]
+        projection_results = {
+            'projection': projection,
+            'national': national,
+            'base_year': result.base_year,
+            'final_year': int(result.years[-1]),
+            'final_population': final,
+            'growth_percent': (final / initial - 1) * 100,
+            'pyramid': result.pyramid()
+        }
+        
+        self.results['cohort_projection'] = projection_results
+        return projection_results
+    
+    def scenario_sweep(self, grid, rates=None, on_result=None, **runner_options):
+        """
+        Inicia uma varredura de cenários de projeção em segundo plano
+        
+        Args:
+            grid (dict | list): premissas (fertility_factor, mortality_factor, migration_factor, horizon)
+            rates (pd.DataFrame): taxas por código (padrão: projeções arquivadas da API)
+            on_result (callable): chamado a cada cenário gravado
+            runner_options: opções do `ScenarioRunner` (max_workers, base_dir, ...)
+        
+        Returns:
+            ScenarioSweep: progresso, cancel(), wait() e summary()
+        """
+        return ScenarioRunner(self.data, rates, **runner_options).submit(grid, on_result)
+    
+    @timed('analysis.generate_report')
     def generate_report(self):
         """Gera relatório completo das análises"""
         # Executar todas as análises
@@ -221,7 +377,20 @@ class PopulationAnalyzer:
         self.regional_analysis()
         self.correlation_analysis()
         self.outlier_detection()
+        self.growth_analysis()
         self.predictive_modeling()
+        # Análises que dependem de códigos IBGE/adjacência: puladas (com o motivo) se faltarem
+        skipped = {}
+        try:
+            self.cohort_projection()
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            skipped['cohort_projection'] = f"{type(e).__name__}: {e}"
+            echo(f"⚠️ Projeção por componentes não executada: {e}")
+        try:
+            self.spatial_analysis()
+        except (FileNotFoundError, KeyError, ValueError) as e:
+            skipped['spatial'] = f"{type(e).__name__}: {e}"
+            echo(f"⚠️ Análise espacial não executada: {e}")
         
         # Criar relatório
         report = {
@@ -237,27 +406,50 @@ class PopulationAnalyzer:
             },
             'regional_analysis': {
                 'significant_differences': self.results['regional']['significant_differences'],
-                'anova_p_value': self.results['regional']['anova_p_value']
+                'anova_p_value': self.results['regional']['anova_p_value'],
+                'anova_permutation_p_value': self.results['regional']['anova_permutation_p_value']
             },
             'correlation': {
                 'population_year_correlation': self.results['correlation']['population_year_correlation'],
+                'population_year_ci': self.results['correlation']['population_year_ci'],
+                'permutation_p_value': self.results['correlation']['population_year_permutation_p_value'],
                 'significant_correlation': self.results['correlation']['significant_correlation']
             },
             'outliers': {
                 'total_outliers_iqr': self.results['outliers']['total_outliers_iqr'],
                 'total_outliers_zscore': self.results['outliers']['total_outliers_zscore']
             },
+            'growth': {
+                'national_cagr': self.results['growth']['national_cagr'],
+                'fastest_growing': self.results['growth']['fastest_growing']['nome'].tolist()
+            },
             'predictive_models': {
                 'best_model': self.results['predictive']['best_model'],
                 'random_forest_r2': self.results['predictive']['random_forest']['r2_score'],
                 'linear_regression_r2': self.results['predictive']['linear_regression']['r2_score']
             }
         }
+        if 'cohort_projection' not in skipped:
+            report['cohort_projection'] = {
+                'final_year': self.results['cohort_projection']['final_year'],
+                'final_population': self.results['cohort_projection']['final_population'],
+                'growth_percent': self.results['cohort_projection']['growth_percent']
+            }
+        if 'spatial' not in skipped:
+            spatial = self.results['spatial']
+            report['spatial'] = {
+                'moran_i': spatial['moran_i'],
+                'moran_p_value': spatial['moran_p_value'],
+                'significant_autocorrelation': spatial['significant_autocorrelation'],
+                'hotspots': list(spatial['hotspots'].get('nome', spatial['hotspots'].index))
+            }
+        if skipped:
+            report['skipped'] = skipped
         
         return report
     
     def plot_analysis(self):
-        """Cria visualizações das análises"""
+        """Cria visualizações das análises (quem chama deve fechar a figura)"""
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         
         # 1. Boxplot por ano
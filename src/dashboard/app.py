@@ -13,6 +13,15 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from config.data_config import ANALYSIS_POLL_INTERVAL, CLEANED_DATASET, TIMESTAMP_FORMAT
+from src.data.shared_store import build_shared_dataset
+from src.data.dataset_store import PartitionedDataset, load_latest_flat_csv
+from src.data.schema import apply_schema
+from src.data.panel import build_historical_panel
+from src.data.localidades import get_localidades
+from src.analytics.insights import build_insights, load_latest_insights
+from src.analytics.derived_metrics import get_derived_metrics
+
 # Importar o novo sistema de APIs
 try:
     from src.data.api_client import get_data_with_fallback, get_available_years
@@ -24,6 +33,7 @@ except ImportError as e:
 # Importar análises estatísticas da Fase 6
 try:
     from src.analytics.statistical_analysis import PopulationAnalyzer
+    from src.analytics.job_runner import get_job_runner
     ANALYTICS_AVAILABLE = True
 except ImportError as e:
     ANALYTICS_AVAILABLE = False
@@ -57,7 +67,6 @@ def get_data_path():
     return None
 
 # Carregar dados
-@st.cache_data
 def load_data():
     """Carrega dados com sistema de APIs e fallback"""
     try:
@@ -67,39 +76,19 @@ def load_data():
             
         # Tentar usar API se disponível
         if API_AVAILABLE:
-            # Carregar dados básicos dos estados
-            files = [f for f in os.listdir(data_path) if f.startswith("cleaned_population") and f.endswith(".csv")]
+            # Carregar dados básicos dos estados (versão atual pelo catálogo, só as colunas usadas)
+            df_base = PartitionedDataset(CLEANED_DATASET, base_dir=data_path).read(
+                columns=['id', 'sigla', 'nome', 'regiao']
+            )
+            if df_base.empty:
+                df_base = load_latest_flat_csv(data_path, "cleaned_population")
             
-            if files:
-                latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(data_path, x)))
-                file_path = os.path.join(data_path, latest_file)
-                df_base = pd.read_csv(file_path)
-                
-                # Criar DataFrame com dados históricos
-                historical_df = []
-                
-                for ano in range(2020, 2026):
-                    # Tentar API para cada ano
-                    api_data = get_data_with_fallback(ano)
-                    
-                    if api_data:
-                        # Usar dados da API
-                        for item in api_data:
-                            estado_data = df_base[df_base['nome'] == item['nome']].iloc[0].copy()
-                            estado_data['ano'] = ano
-                            estado_data['populacao'] = item['populacao']
-                            estado_data['fonte'] = item['fonte']
-                            historical_df.append(estado_data)
-                    else:
-                        # Usar dados estáticos
-                        for estado in df_base['nome'].unique():
-                            estado_data = df_base[df_base['nome'] == estado].iloc[0].copy()
-                            estado_data['ano'] = ano
-                            estado_data['populacao'] = get_static_population(estado, ano)
-                            estado_data['fonte'] = 'Dados Estáticos'
-                            historical_df.append(estado_data)
+            if df_base is not None and not df_base.empty:
+                df_base = df_base.drop_duplicates('nome', keep='last')
                 
-                return pd.DataFrame(historical_df)
+                # Criar DataFrame com dados históricos (API por ano, estáticos como fallback)
+                yearly_records = {ano: get_data_with_fallback(ano) for ano in range(2020, 2026)}
+                return apply_schema(build_historical_panel(df_base, yearly_records, get_static_population))
         
         # Fallback para dados estáticos originais
         return load_static_data()
@@ -140,7 +129,9 @@ def get_static_population(estado, ano):
         "Roraima": {2020: 605761, 2021: 612783, 2022: 619805, 2023: 626827, 2024: 633849, 2025: 640871}
     }
     
-    return static_data.get(estado, {}).get(ano, 0)
+    # Aceita código, sigla ou nome (com ou sem acentos): chave canônica pela dimensão de localidades
+    uf = get_localidades().lookup(estado)
+    return static_data.get(uf['nome'] if uf else estado, {}).get(ano, 0)
 
 def load_static_data():
     """Carrega dados estáticos (função original)"""
@@ -185,42 +176,137 @@ def load_static_data():
                 estado_data['ano'] = ano
                 estado_data['populacao'] = get_static_population(estado['nome'], ano)
                 estado_data['fonte'] = 'Dados Estáticos'
-                estado_data['data_coleta'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                estado_data['data_limpeza'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                estado_data['data_coleta'] = datetime.now().strftime(TIMESTAMP_FORMAT)
+                estado_data['data_limpeza'] = datetime.now().strftime(TIMESTAMP_FORMAT)
                 estado_data['versao_dados'] = '1.0'
                 historical_df.append(estado_data)
         
-        return pd.DataFrame(historical_df)
+        return apply_schema(pd.DataFrame(historical_df))
         
     except Exception as e:
         st.error(f"❌ Erro ao carregar dados estáticos: {e}")
         return None
 
+# Dados compartilhados por todas as sessões do processo (sem cópia por sessão)
+@st.cache_resource
+def load_shared_dataset():
+    """Carrega os dados uma única vez e publica como arrays somente leitura"""
+    df = load_data()
+    if df is None:
+        return None
+    return build_shared_dataset(df)
+
+# Métricas derivadas (crescimento, CAGR, rankings) materializadas uma vez por versão dos dados
+@st.cache_resource
+def load_derived_metrics(_dataset, data_version):
+    """Materializa as métricas derivadas do painel compartilhado"""
+    return get_derived_metrics(_dataset.frame())
+
 # Carregar insights
 @st.cache_data
-def load_insights():
-    """Carrega os insights salvos"""
+def load_insights(_dataset, data_version):
+    """Carrega os insights publicados pelo pipeline (somente leitura)"""
     try:
-        data_path = get_data_path()
-        if data_path is None:
-            return None
-            
-        insights_file = os.path.join(data_path, "insights_analise.json")
-        if os.path.exists(insights_file):
-            with open(insights_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
-    except:
+        artifact = load_latest_insights()
+        if artifact is None:
+            # Sem artefato publicado: calcula em memória, sem gravar na saída do pipeline
+            artifact = build_insights(_dataset.frame())
+        return artifact['insights']
+    except Exception as e:
+        st.warning(f"⚠️ Não foi possível carregar os insights: {e}")
         return None
 
+# Resultados das análises estatísticas
+def render_analysis_results(results):
+    """Exibe os resultados de um job de análises estatísticas concluído"""
+    basic_stats = results['basic_statistics']
+    regional_analysis = results['regional_analysis']
+    correlation_analysis = results['correlation_analysis']
+    outlier_analysis = results['outlier_detection']
+    
+    # Exibir resultados
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("📈 Estatísticas Básicas")
+        st.metric("População Total", f"{basic_stats['total_population']:,}")
+        st.metric("Média", f"{basic_stats['mean_population']:,.0f}")
+        st.metric("Mediana", f"{basic_stats['median_population']:,.0f}")
+        st.metric("Desvio Padrão", f"{basic_stats['std_population']:,.0f}")
+    
+    with col2:
+        st.subheader("🔍 Análise Regional")
+        st.metric("Diferenças Significativas", 
+                "✅ Sim" if regional_analysis['significant_differences'] else "❌ Não")
+        st.metric("P-valor ANOVA (permutação)", f"{regional_analysis['anova_permutation_p_value']:.4f}",
+                  help=f"Paramétrico: {regional_analysis['anova_p_value']:.4f}")
+        ci_lower, ci_upper = correlation_analysis['population_year_ci']
+        st.metric("Correlação Pop-Ano", f"{correlation_analysis['population_year_correlation']:.3f}",
+                  help=f"IC 95% bootstrap: [{ci_lower:.3f}, {ci_upper:.3f}]")
+        st.metric("Outliers Detectados", outlier_analysis['total_outliers_iqr'])
+    
+    # Gráficos avançados
+    st.subheader("📊 Visualizações Avançadas")
+    # Figura renderizada pelo job e servida como bytes
+    st.image(results['plot_analysis'], use_container_width=True)
+    
+    # Relatório detalhado
+    with st.expander("📋 Relatório Detalhado"):
+        st.write("### Estatísticas por Ano")
+        st.dataframe(regional_analysis['yearly_stats'])
+    
+        st.write(f"### Média por Ano (IC 95% bootstrap, {regional_analysis['n_replicates']:,} réplicas)")
+        st.dataframe(regional_analysis['yearly_mean_ci'])
+    
+        st.write("### Matriz de Correlação")
+        st.dataframe(correlation_analysis['correlation_matrix'])
+    
+        if outlier_analysis['total_outliers_iqr'] > 0:
+            st.write("### Outliers Detectados")
+            st.dataframe(outlier_analysis['iqr_outliers'][['nome', 'populacao', 'ano']])
+    
+    st.success("✅ Análises estatísticas concluídas!")
+
+# Progresso ou resultados do job de análises da sessão
+def show_analysis_job():
+    """Exibe o progresso ou os resultados do job de análises da sessão"""
+    job_id = st.session_state.get('analysis_job_id')
+    status = get_job_runner().status(job_id)
+    if status is None:
+        # Job descartado do cache do executor (ou processo reiniciado)
+        st.session_state.pop('analysis_job_id', None)
+        st.rerun()
+    
+    if status['state'] == 'running':
+        st.progress(status['progress'], text="Executando análises estatísticas...")
+        return
+    
+    if st.session_state.get('analysis_job_polling'):
+        st.session_state['analysis_job_polling'] = False
+        st.rerun()
+    
+    if status['state'] == 'failed':
+        st.error(f"❌ Erro ao executar análises: {status['errors']}")
+        return
+    
+    try:
+        render_analysis_results(status['results'])
+    except Exception as e:
+        st.error(f"❌ Erro ao exibir análises: {e}")
+
+# Enquanto o job roda, o painel é reexecutado sozinho a cada ANALYSIS_POLL_INTERVAL
+# segundos (sem bloquear o script); ao terminar, uma reexecução completa desliga o polling
+poll_analysis_job = st.fragment(run_every=ANALYSIS_POLL_INTERVAL)(show_analysis_job)
+
 # Título principal
 st.title("Dashboard de Análise Populacional")
 st.markdown("### Análise da População por Estado do Brasil")
 st.markdown("---")
 
 # Carregar dados
-df = load_data()
-insights = load_insights()
+dataset = load_shared_dataset()
+df = dataset.frame() if dataset is not None else None
+insights = load_insights(dataset, dataset.fingerprint) if dataset is not None else None
 
 if df is not None:
     # Sidebar com filtros
@@ -270,15 +356,11 @@ if df is not None:
         st.sidebar.warning("⚠️ API não disponível")
         st.sidebar.info("📊 Dados históricos simulados")
     
-    # Aplicar filtros
-    filtered_df = df.copy()
-    
-    # Filtrar por ano
-    filtered_df = filtered_df[filtered_df['ano'] == selected_year]
-    
-    # Filtrar por região
-    if selected_region != 'Todas':
-        filtered_df = filtered_df[filtered_df['regiao'] == selected_region]
+    # Aplicar filtros (fatia contígua dos dados compartilhados, sem cópia)
+    filtered_df = dataset.frame(
+        ano=selected_year,
+        regiao=None if selected_region == 'Todas' else selected_region
+    )
     
     # Informação do ano
     st.info(f"📅 **Dados de referência: {selected_year}** (Fonte: IBGE)")
@@ -322,7 +404,7 @@ if df is not None:
     
     with col2:
         st.subheader("🥧 Distribuição por Região")
-        region_pop = filtered_df.groupby('regiao')['populacao'].sum()
+        region_pop = filtered_df.groupby('regiao', observed=True)['populacao'].sum()
         fig_pie = px.pie(
             values=region_pop.values,
             names=region_pop.index,
@@ -335,7 +417,7 @@ if df is not None:
     st.subheader("📈 Evolução Populacional (2020-2025)")
     
     # Dados para o gráfico de linha
-    evolution_data = df.groupby(['ano', 'regiao'])['populacao'].sum().reset_index()
+    evolution_data = df.groupby(['ano', 'regiao'], observed=True)['populacao'].sum().reset_index()
     
     fig_evolution = px.line(
         evolution_data,
@@ -348,6 +430,48 @@ if df is not None:
     fig_evolution.update_layout(height=400)
     st.plotly_chart(fig_evolution, use_container_width=True)
     
+    # Crescimento e projeção (métricas pré-calculadas para todos os locais)
+    st.subheader("🚀 Crescimento e Projeção")
+    derived = load_derived_metrics(dataset, dataset.fingerprint)
+    year_metrics = derived.for_year(selected_year)
+    projection = derived.projection(horizon=5)
+    if selected_region != 'Todas':
+        year_metrics = year_metrics[year_metrics['regiao'] == selected_region]
+        projection = projection[projection['regiao'] == selected_region]
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write(f"**Maior crescimento em {selected_year}**")
+        growth_columns = ['nome', 'crescimento_percentual', 'cagr_3a', 'participacao_nacional', 'variacao_ranking']
+        st.dataframe(
+            year_metrics.nlargest(10, 'crescimento_percentual')[growth_columns].round(3),
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    with col2:
+        projection_data = pd.concat([
+            evolution_data.assign(tipo='Observado'),
+            projection.groupby(['ano', 'regiao'], observed=True)['populacao_projetada'].sum()
+            .reset_index()
+            .rename(columns={'populacao_projetada': 'populacao'})
+            .assign(tipo='Projetado (CAGR)')
+        ])
+        if selected_region != 'Todas':
+            projection_data = projection_data[projection_data['regiao'] == selected_region]
+        fig_projection = px.line(
+            projection_data,
+            x='ano',
+            y='populacao',
+            color='regiao',
+            line_dash='tipo',
+            title="Projeção por Região",
+            labels={'populacao': 'População Total', 'ano': 'Ano'}
+        )
+        fig_projection.update_layout(height=400)
+        st.plotly_chart(fig_projection, use_container_width=True)
+    
     # Tabela de dados
     st.subheader("📋 Dados Detalhados")
     st.dataframe(
@@ -367,64 +491,34 @@ if df is not None:
         with col2:
             st.info(f"**Região com mais estados:** {insights['regiao_mais_estados']}")
             st.info(f"**Total de estados:** {insights['total_estados']}")
+        
+        if insights.get('maior_crescimento_percentual'):
+            fastest = insights['maior_crescimento_percentual'][0]
+            st.info(
+                f"**Maior crescimento ({insights['ano_referencia']}):** {fastest['nome']} "
+                f"(+{fastest['crescimento_percentual']:.2f}%)"
+            )
     
     # Seção de Análises Estatísticas Avançadas (Fase 6)
     if ANALYTICS_AVAILABLE:
         st.markdown("---")
         st.header("📊 Análises Estatísticas Avançadas")
         
-        # Botão para executar análises
+        # Botão para executar análises (o job roda no executor compartilhado; mesmos dados = mesma computação)
         if st.button("🔬 Executar Análises Estatísticas"):
-            with st.spinner("Executando análises estatísticas..."):
-                try:
-                    # Criar analisador
-                    analyzer = PopulationAnalyzer(df)
-                    
-                    # Executar análises
-                    basic_stats = analyzer.basic_statistics()
-                    regional_analysis = analyzer.regional_analysis()
-                    correlation_analysis = analyzer.correlation_analysis()
-                    outlier_analysis = analyzer.outlier_detection()
-                    
-                    # Exibir resultados
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.subheader("📈 Estatísticas Básicas")
-                        st.metric("População Total", f"{basic_stats['total_population']:,}")
-                        st.metric("Média", f"{basic_stats['mean_population']:,.0f}")
-                        st.metric("Mediana", f"{basic_stats['median_population']:,.0f}")
-                        st.metric("Desvio Padrão", f"{basic_stats['std_population']:,.0f}")
-                    
-                    with col2:
-                        st.subheader("🔍 Análise Regional")
-                        st.metric("Diferenças Significativas", 
-                                "✅ Sim" if regional_analysis['significant_differences'] else "❌ Não")
-                        st.metric("P-valor ANOVA", f"{regional_analysis['anova_p_value']:.4f}")
-                        st.metric("Correlação Pop-Ano", f"{correlation_analysis['population_year_correlation']:.3f}")
-                        st.metric("Outliers Detectados", outlier_analysis['total_outliers_iqr'])
-                    
-                    # Gráficos avançados
-                    st.subheader("📊 Visualizações Avançadas")
-                    fig = analyzer.plot_analysis()
-                    st.pyplot(fig)
-                    
-                    # Relatório detalhado
-                    with st.expander("📋 Relatório Detalhado"):
-                        st.write("### Estatísticas por Ano")
-                        st.dataframe(regional_analysis['yearly_stats'])
-                        
-                        st.write("### Matriz de Correlação")
-                        st.dataframe(correlation_analysis['correlation_matrix'])
-                        
-                        if outlier_analysis['total_outliers_iqr'] > 0:
-                            st.write("### Outliers Detectados")
-                            st.dataframe(outlier_analysis['iqr_outliers'][['nome', 'populacao', 'ano']])
-                    
-                    st.success("✅ Análises estatísticas concluídas!")
-                    
-                except Exception as e:
-                    st.error(f"❌ Erro ao executar análises: {e}")
+            try:
+                st.session_state['analysis_job_id'] = get_job_runner().submit(df)
+            except Exception as e:
+                st.error(f"❌ Erro ao executar análises: {e}")
+        
+        if st.session_state.get('analysis_job_id'):
+            job_status = get_job_runner().status(st.session_state['analysis_job_id'])
+            if job_status is not None and job_status['state'] == 'running':
+                st.session_state['analysis_job_polling'] = True
+                poll_analysis_job()
+            else:
+                st.session_state['analysis_job_polling'] = False
+                show_analysis_job()
     else:
         st.warning("⚠️ Módulo de análises estatísticas não disponível")
 
@@ -2,15 +2,31 @@ import requests
 import json
 import time
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 import pandas as pd
 import streamlit as st
 
+from config.data_config import (
+    IBGE_API_BASE_URL, TIMESTAMP_FORMAT, ENCODING, CACHE_LOCK_TIMEOUT, CACHE_TTL,
+    CACHE_STALE_WHILE_REVALIDATE, CACHE_STALE_MAX_AGE, CACHE_STALE_IF_ERROR, CACHE_REVALIDATE_WORKERS,
+    PROCESSED_DATASET
+)
+from src.data.schema import REGIOES, records_to_frame, frame_to_records, apply_schema
+from src.data.dataset_store import PartitionedDataset
+from src.data.file_lock import file_lock
+from src.data.localidades import get_localidades
+from src.monitoring.instrumentation import span, increment, echo
+
 class IBGEAPIClient:
     """Cliente para APIs do IBGE - Usando API de Localidades"""
     
+    _static_by_code = None
+    
     def __init__(self):
-        self.base_url = "https://servicodados.ibge.gov.br/api/v1"
+        self.base_url = f"{IBGE_API_BASE_URL}/v1"
         self.timeout = 30
         self.max_retries = 3
         
@@ -30,7 +46,7 @@ class IBGEAPIClient:
                     estado_id = estado.get('id', '')
                     
                     # Usar dados estáticos de população (mais confiáveis neste momento)
-                    populacao = self._get_static_population_for_state(estado_nome, year)
+                    populacao = self._get_static_population_for_state(estado_id, year)
                     
                     if populacao:
                         processed_data.append({
@@ -40,7 +56,7 @@ class IBGEAPIClient:
                             'populacao': populacao,
                             'ano': year,
                             'fonte': 'IBGE Localidades + Dados Estáticos',
-                            'data_coleta': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                            'data_coleta': datetime.now().strftime(TIMESTAMP_FORMAT)
                         })
                 
                 return processed_data
@@ -51,8 +67,18 @@ class IBGEAPIClient:
             st.warning(f"⚠️ API de Localidades do IBGE indisponível: {e}")
             return None
     
-    def _get_static_population_for_state(self, estado_nome, year):
-        """Retorna população estática para um estado específico"""
+    def _get_static_population_for_state(self, estado_id, year):
+        """Retorna população estática para um estado específico (pelo código IBGE)"""
+        if IBGEAPIClient._static_by_code is None:
+            # Tabela indexada por nome convertida uma única vez para índice por código
+            localidades = get_localidades()
+            IBGEAPIClient._static_by_code = {
+                localidades.code(nome): dados for nome, dados in self._static_population_table().items()
+            }
+        return IBGEAPIClient._static_by_code.get(estado_id, {}).get(year, 0)
+    
+    def _static_population_table(self):
+        """Estimativas estáticas de população por nome do estado"""
         # Dados baseados em estimativas do IBGE
         static_data = {
             "São Paulo": {
@@ -138,7 +164,7 @@ class IBGEAPIClient:
             }
         }
         
-        return static_data.get(estado_nome, {}).get(year, 0)
+        return static_data
     
     def get_available_years(self):
         """Retorna anos disponíveis (fixos devido a problemas na API de pesquisas)"""
@@ -150,52 +176,229 @@ class IBGEAPIClient:
         try:
             url = f"{self.base_url}/localidades/estados"
             
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            return response.json()
+            increment('http.requests')
+            with span('http.request', url=url) as attributes:
+                response = requests.get(url, timeout=self.timeout)
+                attributes['status_code'] = response.status_code
+                attributes['bytes'] = len(response.content)
+                increment('http.bytes', len(response.content))
+                response.raise_for_status()
+                
+                return response.json()
             
         except requests.exceptions.RequestException as e:
             st.warning(f"⚠️ API de estados indisponível: {e}")
             return None
 
 class DataCache:
-    """Sistema de cache para dados"""
+    """
+    Sistema de cache para dados
+
+    Os registros são gravados em formato colunar (nomes das colunas uma única
+    vez + listas de valores) e lidos de volta com os tipos do esquema.
+
+    Seguro entre threads e processos: gravações atômicas, entradas
+    corrompidas descartadas na leitura e `get_or_fetch` com busca única por
+    chave (os demais esperam o resultado em vez de repetir a requisição).
+    """
+    
+    # Locks por chave compartilhados por todas as instâncias do processo
+    _key_locks = {}
+    _key_locks_guard = threading.Lock()
     
     def __init__(self, cache_dir="data/cache"):
         self.cache_dir = cache_dir
         os.makedirs(cache_dir, exist_ok=True)
     
-    def get_cache_key(self, data_type, year):
-        """Gera chave do cache"""
-        return f"{data_type}_{year}_{datetime.now().strftime('%Y%m%d')}.json"
+    def get_cache_key(self, data_type, year, day=None):
+        """Gera chave do cache (por padrão, do dia atual)"""
+        day = day or datetime.now()
+        return f"{data_type}_{year}_{day.strftime('%Y%m%d')}.json"
     
-    def save_to_cache(self, data, data_type, year):
-        """Salva dados no cache"""
-        cache_key = self.get_cache_key(data_type, year)
+    def save_to_cache(self, data, data_type, year, day=None):
+        """
+        Salva dados no cache
+
+        A gravação é feita em arquivo temporário e renomeada: quem lê o cache
+        vê a entrada anterior ou a nova, nunca um arquivo pela metade.
+        """
+        cache_key = self.get_cache_key(data_type, year, day)
         cache_path = os.path.join(self.cache_dir, cache_key)
         
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with span('cache.save', data_type=data_type, year=year):
+            df = data if isinstance(data, pd.DataFrame) else records_to_frame(data)
+            tmp_path = f"{cache_path}.tmp{os.getpid()}_{threading.get_ident()}"
+            df.to_json(tmp_path, orient='split', index=False, date_format='iso', force_ascii=False)
+            os.replace(tmp_path, cache_path)
         
         return cache_path
     
-    def load_from_cache(self, data_type, year):
-        """Carrega dados do cache"""
-        cache_key = self.get_cache_key(data_type, year)
+    def has_entry(self, data_type, year, day=None):
+        """Indica se há entrada válida (menos de 24h) para o dia"""
+        return self._is_fresh(os.path.join(self.cache_dir, self.get_cache_key(data_type, year, day)))
+    
+    def _is_fresh(self, cache_path, fresher_than=None):
+        try:
+            modified = os.path.getmtime(cache_path)
+        except OSError:
+            return False
+        if fresher_than is not None and modified < fresher_than:
+            return False
+        return time.time() - modified < CACHE_TTL
+    
+    def _read_entry(self, cache_path):
+        """Lê uma entrada como DataFrame tipado (None se ausente ou corrompida)"""
+        try:
+            with open(cache_path, 'r', encoding=ENCODING) as f:
+                payload = json.load(f)
+            if isinstance(payload, list):
+                # Formato antigo: lista de dicionários
+                return records_to_frame(payload)
+            return apply_schema(pd.DataFrame(payload['data'], columns=payload['columns']))
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            # JSON truncado ou fora do formato: descartar para ser buscado de novo
+            self._evict(cache_path, e)
+            return None
+    
+    def load_frame(self, data_type, year, day=None, fresher_than=None):
+        """
+        Carrega dados do cache como DataFrame tipado
+
+        Args:
+            day (datetime): dia da chave (padrão: hoje)
+            fresher_than (float): timestamp; entradas gravadas antes contam como falha
+        """
+        cache_key = self.get_cache_key(data_type, year, day)
         cache_path = os.path.join(self.cache_dir, cache_key)
         
-        if os.path.exists(cache_path):
+        with span('cache.load', data_type=data_type, year=year) as attributes:
             # Verificar se o cache não é muito antigo (menos de 24h)
-            file_age = time.time() - os.path.getmtime(cache_path)
-            if file_age < 86400:  # 24 horas
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            df = self._read_entry(cache_path) if self._is_fresh(cache_path, fresher_than) else None
+            if df is not None:
+                attributes['hit'] = True
+                increment('cache.hits')
+                return df
+            
+            attributes['hit'] = False
+            increment('cache.misses')
+            return None
+    
+    def load_stale(self, data_type, year, max_age=None):
+        """
+        Última entrada válida da chave, mesmo que expirada
+
+        Args:
+            max_age (float): idade máxima aceita em segundos (None: qualquer idade)
+
+        Returns:
+            tuple: (registros, idade em segundos) ou (None, None)
+        """
+        prefix = f"{data_type}_{year}_"
+        # O nome termina com a data (AAAAMMDD): ordem reversa = mais recente primeiro
+        filenames = sorted(
+            (name for name in os.listdir(self.cache_dir) if name.startswith(prefix) and name.endswith('.json')),
+            reverse=True
+        )
+        for filename in filenames:
+            cache_path = os.path.join(self.cache_dir, filename)
+            try:
+                age = time.time() - os.path.getmtime(cache_path)
+            except OSError:
+                continue
+            if max_age is not None and age > max_age:
+                continue
+            df = self._read_entry(cache_path)
+            if df is not None:
+                increment('cache.stale_hits')
+                return frame_to_records(df), age
+        return None, None
+    
+    def _evict(self, cache_path, reason):
+        """Remove uma entrada corrompida"""
+        increment('cache.corrupted')
+        echo(f"⚠️ Entrada de cache corrompida removida: {cache_path} ({reason})")
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+    
+    def load_from_cache(self, data_type, year, day=None, fresher_than=None):
+        """Carrega dados do cache"""
+        df = self.load_frame(data_type, year, day, fresher_than)
+        return frame_to_records(df) if df is not None else None
+    
+    @contextmanager
+    def key_lock(self, data_type, year):
+        """
+        Lock exclusivo da chave (threads do processo + outros processos)
+
+        Entre processos usa `flock` em data/cache/locks/. Se o lock não for
+        obtido em CACHE_LOCK_TIMEOUT segundos (ex.: processo travado), segue
+        sem ele: no pior caso a chave é buscada duas vezes.
+        """
+        name = f"{data_type}_{year}"
+        with self._key_locks_guard:
+            thread_lock = self._key_locks.setdefault(name, threading.Lock())
         
-        return None
+        with thread_lock, ExitStack() as stack:
+            try:
+                stack.enter_context(file_lock(
+                    os.path.join(self.cache_dir, 'locks', f"{name}.lock"), timeout=CACHE_LOCK_TIMEOUT
+                ))
+            except TimeoutError:
+                echo(f"⚠️ Lock do cache '{name}' não obtido em {CACHE_LOCK_TIMEOUT}s; seguindo sem lock")
+            yield
+    
+    def get_or_fetch(self, data_type, year, fetch, day=None, fresher_than=None):
+        """
+        Retorna os registros do cache ou busca com `fetch()` uma única vez
+
+        Em uma falha de cache apenas um chamador (thread ou processo) executa
+        `fetch`; os demais esperam o lock e leem a entrada que ele gravou.
+        Resultados vazios (falha da API) não são gravados.
+
+        Args:
+            day (datetime): dia da chave (padrão: hoje)
+            fresher_than (float): timestamp; entradas gravadas antes são buscadas
+                de novo (atualização forçada que não sobrescreve uma busca mais nova)
+
+        Returns:
+            tuple: (registros ou None, True se vieram do cache)
+        """
+        cached = self.load_from_cache(data_type, year, day, fresher_than)
+        if cached:
+            return cached, True
+        
+        with self.key_lock(data_type, year):
+            # Outro chamador pode ter preenchido a chave enquanto esperávamos
+            cached = self.load_from_cache(data_type, year, day, fresher_than)
+            if cached:
+                return cached, True
+            
+            increment('cache.fetches')
+            data = fetch()
+            if data:
+                self.save_to_cache(data, data_type, year, day=day)
+            return data, False
 
 class DataManager:
-    """Gerenciador de dados com fallback"""
+    """
+    Gerenciador de dados com fallback
+
+    Política de cache (stale-while-revalidate): entrada atual → entrada
+    expirada até CACHE_STALE_MAX_AGE, servida na hora enquanto uma thread
+    atualiza a chave → API (bloqueante) → último snapshot de qualquer idade
+    (CACHE_STALE_IF_ERROR) → dados estáticos.
+    """
+    
+    # Atualizações em segundo plano compartilhadas por todas as instâncias do processo
+    _revalidation_executor = ThreadPoolExecutor(
+        max_workers=CACHE_REVALIDATE_WORKERS, thread_name_prefix='cache-revalidate'
+    )
+    _revalidating = set()
+    _revalidating_lock = threading.Lock()
     
     def __init__(self):
         self.api_client = IBGEAPIClient()
@@ -223,18 +426,163 @@ class DataManager:
             st.info(f"🔄 Usando ano mais próximo: {closest_year}")
             year = closest_year
         
-        # 3. Tentar API
-        api_data = self.api_client.get_population_by_state(year)
+        fetch = lambda: self.api_client.get_population_by_state(year)
+        
+        # 3. Entrada expirada: servir na hora e atualizar em segundo plano
+        if use_cache and CACHE_STALE_WHILE_REVALIDATE:
+            stale_data, age = self.cache.load_stale('population', year, max_age=CACHE_STALE_MAX_AGE)
+            if stale_data:
+                self._revalidate('population', year, fetch)
+                st.info(f"🔄 Dados do cache de {age / 3600:.0f}h atrás (ano: {year}); atualizando em segundo plano")
+                return stale_data
+        
+        # 4. Tentar API (uma única busca por chave entre threads/processos; o resultado vai para o cache)
+        if use_cache:
+            api_data, from_cache = self.cache.get_or_fetch('population', year, fetch)
+        else:
+            api_data, from_cache = fetch(), False
+            if api_data:
+                self.cache.save_to_cache(api_data, 'population', year)
         if api_data:
-            # Salvar no cache
-            self.cache.save_to_cache(api_data, 'population', year)
-            st.success(f"✅ Dados carregados da API de Localidades do IBGE (ano: {year})")
+            origem = "do cache" if from_cache else "da API de Localidades do IBGE"
+            st.success(f"✅ Dados carregados {origem} (ano: {year})")
             return api_data
         
-        # 4. Usar dados estáticos como fallback
+        # 5. API indisponível: último snapshot conhecido, mesmo antigo
+        if CACHE_STALE_IF_ERROR:
+            stale_data, age = self.cache.load_stale('population', year)
+            if stale_data:
+                st.warning(f"⚠️ API indisponível; usando dados do cache de {age / 86400:.0f} dia(s) atrás (ano: {year})")
+                return stale_data
+        
+        # 6. Usar dados estáticos como fallback
         st.warning(f"⚠️ Usando dados estáticos (ano: {year})")
         return self._get_fallback_data_for_year(year)
     
+    def query(self, years=None, level='UF', codes=None, columns=None, as_arrow=False):
+        """
+        Consulta de população para vários anos de uma vez, já como DataFrame tipado
+
+        Os filtros são aplicados na origem: a leitura usa o conjunto
+        particionado em data/processed, com poda de partições por ano/nível,
+        predicado por código e projeção de colunas. No nível 'UF' (e 'regiao',
+        agregado a partir das UFs) os anos ausentes do conjunto vêm do cache
+        já tipado (ou do fallback normal).
+
+        Args:
+            years (list): anos desejados (padrão: anos disponíveis)
+            level (str): 'UF', 'regiao' ou nível gravado no conjunto processado
+            codes (list): códigos IBGE das localidades (UF: 11..53, região: 1..5)
+            columns (list): colunas a retornar (padrão: todas)
+            as_arrow (bool): retorna `pyarrow.Table` em vez de DataFrame
+
+        Returns:
+            pd.DataFrame: uma linha por localidade e ano
+        """
+        years = list(years) if years is not None else self.get_available_years()
+        codes = list(codes) if codes is not None else None
+
+        with span('data.query', level=level, years=len(years)) as attributes:
+            if level in ('UF', 'regiao'):
+                uf_columns = None
+                if columns is not None:
+                    # Código e ano sempre lidos (filtro por código, agregação por região)
+                    extra = ['id', 'ano'] + (['populacao'] if level == 'regiao' else [])
+                    uf_columns = list(dict.fromkeys(list(columns) + extra))
+                df = self._query_uf(years, uf_columns)
+                if level == 'regiao':
+                    df = self._rollup_regions(df)
+                if codes is not None:
+                    df = df[df['id'].isin(codes)]
+            else:
+                df = PartitionedDataset(PROCESSED_DATASET).read(
+                    columns=columns,
+                    filters={'nivel': level, 'ano': years},
+                    predicates=[('id', 'in', codes)] if codes is not None else None
+                )
+
+            if columns is not None:
+                df = df.reindex(columns=list(columns))
+            df = df.reset_index(drop=True)
+            attributes['rows'] = len(df)
+
+        if as_arrow:
+            import pyarrow as pa
+            return pa.Table.from_pandas(df, preserve_index=False)
+        return df
+
+    def _query_uf(self, years, columns=None):
+        """
+        Painel UF × ano lido do conjunto processado em uma única leitura
+
+        Usa a fonte da gravação UF mais recente, com poda por ano e projeção
+        de colunas no armazenamento. Anos ausentes do conjunto vêm do cache
+        tipado ou passam pelo fallback normal (`get_population_data`).
+        """
+        store = PartitionedDataset(PROCESSED_DATASET)
+        partitions = store.partitions({'nivel': 'UF', 'ano': years})
+        frames = []
+        if partitions:
+            source = max(partitions, key=lambda partition: partition['version'])['fonte']
+            stored = store.read(columns=columns, filters={'nivel': 'UF', 'fonte': source, 'ano': years})
+            frames.append(stored)
+            stored_years = set(stored['ano'].dropna().astype(int))
+            years = [year for year in years if year not in stored_years]
+
+        if years:
+            frames.append(self._query_uf_cache(years, columns))
+        return apply_schema(pd.concat(frames, ignore_index=True))
+
+    def _query_uf_cache(self, years, columns=None):
+        """Anos ausentes do conjunto processado: cache tipado por ano ou fallback normal"""
+        frames = []
+        for year in years:
+            frame = self.cache.load_frame('population', year)
+            if frame is None:
+                frame = records_to_frame(self.get_population_data(year))
+            frames.append(frame)
+        df = apply_schema(pd.concat(frames, ignore_index=True))
+
+        # Registros sem código (ex.: entradas antigas do cache): associar pelo nome normalizado
+        if 'id' not in df.columns or df['id'].isna().any():
+            localidades = get_localidades()
+            codes = localidades.codes_for_names(df['nome'])
+            df['id'] = df['id'].fillna(codes) if 'id' in df.columns else codes
+            siglas = localidades.attributes(df['id'].fillna(0), columns=['sigla'])['sigla']
+            df['sigla'] = df['sigla'].astype(object).fillna(siglas) if 'sigla' in df.columns else siglas
+            df = apply_schema(df)
+        return df if columns is None else df.reindex(columns=columns)
+
+    @staticmethod
+    def _rollup_regions(df):
+        """Agrega o painel UF por grande região (o 1º dígito do código da UF é o código da região)"""
+        df = df.dropna(subset=['id'])
+        region_codes = (df['id'] // 10).astype('int32')
+        grouped = df.groupby([df['ano'], region_codes.rename('id')], sort=True)['populacao'].sum().reset_index()
+        grouped['nome'] = pd.Categorical.from_codes(grouped['id'] - 1, REGIOES).astype(str)
+        grouped['regiao'] = grouped['nome']
+        return apply_schema(grouped[['id', 'nome', 'regiao', 'populacao', 'ano']])
+
+    def _revalidate(self, data_type, year, fetch):
+        """Agenda a atualização da chave em segundo plano (no máximo uma por chave)"""
+        key = (self.cache.cache_dir, data_type, year)
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        
+        def refresh():
+            try:
+                with span('cache.revalidate', data_type=data_type, year=year):
+                    self.cache.get_or_fetch(data_type, year, fetch)
+            except Exception as e:
+                echo(f"⚠️ Falha ao atualizar o cache de {data_type} {year}: {e}")
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+        
+        self._revalidation_executor.submit(refresh)
+    
     def get_available_years(self):
         """Obtém anos disponíveis na API"""
         return self.api_client.get_available_years()
@@ -329,14 +677,18 @@ class DataManager:
         """Retorna dados estáticos para um ano específico"""
         fallback_data = []
         
+        localidades = get_localidades()
         for estado, dados_ano in self.fallback_data.items():
             if year in dados_ano:
+                uf = localidades.lookup(estado) or {}
                 fallback_data.append({
+                    'id': uf.get('id'),
+                    'sigla': uf.get('sigla'),
                     'nome': estado,
                     'populacao': dados_ano[year],
                     'ano': year,
                     'fonte': 'Dados Estáticos',
-                    'data_coleta': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    'data_coleta': datetime.now().strftime(TIMESTAMP_FORMAT)
                 })
         
         return fallback_data
@@ -347,6 +699,11 @@ def get_data_with_fallback(year=2023):
     data_manager = DataManager()
     return data_manager.get_population_data(year)
 
+def query_population(years=None, level='UF', codes=None, columns=None):
+    """Função para consultar vários anos/níveis de uma vez (ver DataManager.query)"""
+    data_manager = DataManager()
+    return data_manager.query(years, level, codes, columns)
+
 def get_available_years():
     """Função para obter anos disponíveis na API"""
     data_manager = DataManager()
@@ -0,0 +1,268 @@
+"""
+Captura de alterações (inserções, atualizações e remoções) entre coletas
+
+Cada coleta traz o snapshot completo, mas de um dia para o outro quase
+nada muda. O `ChangeTracker` guarda, por chave (ex.: id × ano), um hash do
+conteúdo das linhas e compara o snapshot novo com o anterior:
+
+    tracker = ChangeTracker('painel_pipeline', keys=['id', 'ano'])
+    delta = tracker.diff(df)
+    if not delta.is_empty:
+        ...  # processar só delta.upserts / delta.changed_keys
+    tracker.commit(delta)
+
+Só o delta é gravado (um CSV por versão, com a operação de cada chave),
+junto com a tabela de hashes do snapshot atual. `commit` é separado de
+`diff` para que o snapshot só avance depois que as etapas seguintes
+gravaram seus resultados.
+
+Layout em disco:
+
+    data/processed/changes/<nome>/
+        _estado.json           versão atual e metadados do último commit
+        snapshot.csv           chaves + hash da chave + hash do conteúdo
+        delta-<versão>.csv     linhas inseridas/atualizadas e chaves removidas
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from config.data_config import CHANGES_PATH, ENCODING, TIMESTAMP_FORMAT
+from src.monitoring.instrumentation import echo, increment, span
+
+# Colunas que mudam a cada execução sem que o dado tenha mudado
+VOLATILE_COLUMNS = ('data_coleta', 'data_limpeza')
+STATE_FILENAME = '_estado.json'
+SNAPSHOT_FILENAME = 'snapshot.csv'
+KEY_HASH = '_chave'
+ROW_HASH = '_hash'
+OPERATION = '_operacao'
+
+
+def _normalize_numeric(df):
+    """
+    Colunas numéricas como float64 antes do hash
+
+    O hash do pandas depende do tipo: 12 (int) e 12.0 (float) dão hashes
+    diferentes, e um CSV com valores ausentes lê a coluna inteira como float.
+    """
+    columns = {
+        column: df[column].astype('float64') for column in df.columns
+        if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column])
+    }
+    return df.assign(**columns) if columns else df
+
+
+def key_hashes(df, keys):
+    """Hash (uint64) das colunas-chave de cada linha"""
+    return pd.util.hash_pandas_object(_normalize_numeric(df[keys]), index=False).to_numpy()
+
+
+def record_hashes(df, keys, value_columns=None, key_hash=None):
+    """
+    Hash do conteúdo por chave, independente da ordem das linhas
+
+    Linhas com a mesma chave são combinadas em um único hash (soma dos
+    hashes das linhas, como em `insights.location_hashes`). Colunas numéricas
+    são normalizadas para float64 (inteiros e floats com os mesmos valores dão
+    o mesmo hash) e o hash do pandas não depende de a coluna ser texto ou
+    categoria, então os tipos do esquema e os lidos de JSON/CSV dão o mesmo
+    resultado.
+
+    Returns:
+        pd.DataFrame: colunas-chave, `_chave` e `_hash`, uma linha por chave
+    """
+    if value_columns is None:
+        value_columns = [column for column in df.columns if column not in keys and column not in VOLATILE_COLUMNS]
+    if key_hash is None:
+        key_hash = key_hashes(df, keys)
+    row_hash = pd.util.hash_pandas_object(_normalize_numeric(df[sorted(value_columns)]), index=False).to_numpy()
+
+    combined = pd.Series(row_hash).groupby(key_hash).sum()
+    first = pd.Series(range(len(df))).groupby(key_hash).first()
+    table = df[keys].iloc[first.to_numpy()].reset_index(drop=True)
+    table[KEY_HASH] = first.index.to_numpy()
+    table[ROW_HASH] = combined.reindex(first.index).to_numpy()
+    return table
+
+
+class Delta:
+    """Diferença entre dois snapshots"""
+
+    def __init__(self, keys, inserts, updates, deletes, base_version, hashes):
+        """
+        Args:
+            keys (list): colunas-chave
+            inserts (pd.DataFrame): linhas de chaves novas
+            updates (pd.DataFrame): linhas (novas) de chaves com conteúdo alterado
+            deletes (pd.DataFrame): chaves que deixaram de existir
+            base_version (int): versão do snapshot comparado (0 = nenhum)
+            hashes (pd.DataFrame): tabela de hashes do snapshot novo
+        """
+        self.keys = keys
+        self.inserts = inserts
+        self.updates = updates
+        self.deletes = deletes
+        self.base_version = base_version
+        self.hashes = hashes
+        self.state_version = base_version
+
+    def __repr__(self):
+        counts = self.counts()
+        return (f"Delta(base={self.base_version}, inserts={counts['inserts']}, "
+                f"updates={counts['updates']}, deletes={counts['deletes']})")
+
+    @property
+    def is_empty(self):
+        return self.inserts.empty and self.updates.empty and self.deletes.empty
+
+    @property
+    def upserts(self):
+        """Linhas a (re)processar: inserções + atualizações"""
+        return pd.concat([self.inserts, self.updates], ignore_index=True)
+
+    @property
+    def changed_keys(self):
+        """Chaves alteradas em qualquer sentido (para invalidar resultados derivados)"""
+        frames = [frame[self.keys] for frame in (self.inserts, self.updates, self.deletes)]
+        return pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+
+    def counts(self):
+        return {
+            'inserts': int(self.inserts[self.keys].drop_duplicates().shape[0]),
+            'updates': int(self.updates[self.keys].drop_duplicates().shape[0]),
+            'deletes': len(self.deletes)
+        }
+
+    def to_frame(self):
+        """Delta em formato longo, com a operação de cada linha"""
+        return pd.concat([
+            self.inserts.assign(**{OPERATION: 'insert'}),
+            self.updates.assign(**{OPERATION: 'update'}),
+            self.deletes.assign(**{OPERATION: 'delete'})
+        ], ignore_index=True)
+
+
+class ChangeTracker:
+    """Snapshot de hashes por chave e histórico de deltas de um conjunto de dados"""
+
+    def __init__(self, name, keys=('id', 'ano'), base_dir=CHANGES_PATH):
+        self.name = name
+        self.keys = list(keys)
+        self.root = os.path.join(base_dir, name)
+        self.state_path = os.path.join(self.root, STATE_FILENAME)
+        self.snapshot_path = os.path.join(self.root, SNAPSHOT_FILENAME)
+
+    def load_state(self):
+        """Estado do último commit (versão 0 se não houver)"""
+        try:
+            with open(self.state_path, 'r', encoding=ENCODING) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'name': self.name, 'keys': self.keys, 'version': 0, 'metadata': {}}
+
+    def load_snapshot(self, state=None):
+        """Tabela de hashes do último commit (None se não houver)"""
+        if (state or self.load_state())['version'] == 0:
+            return None
+        try:
+            return pd.read_csv(self.snapshot_path, dtype={KEY_HASH: 'uint64', ROW_HASH: 'uint64'},
+                               encoding=ENCODING)
+        except (OSError, ValueError):
+            return None
+
+    def diff(self, df, value_columns=None):
+        """
+        Compara `df` com o último snapshot gravado (nada é gravado aqui)
+
+        Args:
+            df (pd.DataFrame): snapshot completo atual
+            value_columns (list): colunas comparadas (padrão: todas menos chaves e colunas voláteis)
+
+        Returns:
+            Delta: inserções, atualizações e remoções
+        """
+        with span('changes.diff', dataset=self.name, rows=len(df)) as attributes:
+            row_keys = key_hashes(df, self.keys)
+            current = record_hashes(df, self.keys, value_columns, row_keys)
+            state = self.load_state()
+            previous = self.load_snapshot(state)
+            base_version = state['version'] if previous is not None else 0
+            if previous is None:
+                previous = current.iloc[0:0]
+
+            previous_hashes = pd.Series(previous[ROW_HASH].to_numpy(), index=previous[KEY_HASH].to_numpy())
+            known = previous_hashes.reindex(current[KEY_HASH].to_numpy())
+            inserted = known.isna().to_numpy()
+            updated = ~inserted & (known.to_numpy() != current[ROW_HASH].to_numpy())
+            deleted = ~previous[KEY_HASH].isin(current[KEY_HASH])
+
+            inserts = df[pd.Series(row_keys).isin(current.loc[inserted, KEY_HASH]).to_numpy()]
+            updates = df[pd.Series(row_keys).isin(current.loc[updated, KEY_HASH]).to_numpy()]
+            delta = Delta(
+                self.keys,
+                inserts.reset_index(drop=True),
+                updates.reset_index(drop=True),
+                previous.loc[deleted, self.keys].reset_index(drop=True),
+                base_version,
+                current
+            )
+            delta.state_version = state['version']
+            attributes.update(delta.counts())
+            return delta
+
+    def commit(self, delta, metadata=None):
+        """
+        Grava o delta e avança o snapshot (arquivos temporários + rename)
+
+        Args:
+            delta (Delta): resultado de `diff`
+            metadata (dict): informações das etapas seguintes (ex.: hash da saída gerada)
+
+        Returns:
+            dict: novo estado
+        """
+        state = self.load_state()
+        if delta.state_version != state['version']:
+            raise RuntimeError(
+                f"Snapshot de '{self.name}' mudou desde o diff (versão {state['version']}, "
+                f"delta sobre {delta.state_version})"
+            )
+
+        counts = delta.counts()
+        os.makedirs(self.root, exist_ok=True)
+        version = state['version'] + (0 if delta.is_empty else 1)
+        if not delta.is_empty:
+            self._write_csv(delta.to_frame(), os.path.join(self.root, f"delta-{version:05d}.csv"))
+            self._write_csv(delta.hashes, self.snapshot_path)
+
+        state.update({
+            'keys': self.keys,
+            'version': version,
+            'updated_at': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'last_delta': counts,
+            'metadata': metadata or {}
+        })
+        tmp_path = f"{self.state_path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding=ENCODING) as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+        for operation, count in counts.items():
+            increment(f"changes.{operation}", count)
+        echo(f"🔁 {self.name}: versão {version} "
+             f"(+{counts['inserts']} ~{counts['updates']} -{counts['deletes']})")
+        return state
+
+    @staticmethod
+    def _write_csv(df, path):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        df.to_csv(tmp_path, index=False, encoding=ENCODING, date_format=TIMESTAMP_FORMAT)
+        os.replace(tmp_path, path)
+
+    def load_delta(self, version):
+        """Delta gravado de uma versão (formato longo, coluna `_operacao`)"""
+        return pd.read_csv(os.path.join(self.root, f"delta-{version:05d}.csv"), encoding=ENCODING)
@@ -1,41 +1,47 @@
 import requests
-import pandas as pd
-import json
 from datetime import datetime
-import os
 import time 
-from config.data_config import IBGE_POPULATION_URL, IBGE_STATES_URL, RAW_DATA_PATH, PROCESSED_DATA_PATH, EXTERNAL_DATA_PATH, REQUEST_TIMEOUT, MAX_RETRIES, ENCODING, DATE_FORMAT
+from config.data_config import PROCESSED_DATA_PATH, IBGE_API_BASE_URL, REQUEST_TIMEOUT, MAX_RETRIES, RETRY_BACKOFF, TIMESTAMP_FORMAT, PROCESSED_DATASET
+from src.data.change_capture import ChangeTracker
+from src.data.dataset_store import PartitionedDataset
+from src.data.hierarchy import BRASIL_CODE
+from src.data.localidades import get_localidades
+from src.data.raw_archive import get_raw_archive
+from src.data.schema import records_to_frame, apply_schema
+from src.monitoring.instrumentation import echo, span, increment, timed, write_metrics
 
+SECONDS_PER_YEAR = 365.25 * 86400
+
+# Endpoints consultados em ordem (nome lógico no arquivo de dados brutos, URL)
+COLLECTION_ENDPOINTS = [
+    # 1. Lista de estados (sempre funciona)
+    ('localidades_estados', f"{IBGE_API_BASE_URL}/v1/localidades/estados"),
+
+    # 2. População por UF - dados agregados (Censo/PNAD)
+    ('agregados_4714', f"{IBGE_API_BASE_URL}/v3/agregados/4714/periodos/2022/variaveis/93?localidades=N3[all]"),
+
+    # 3. Projeções populacionais por UF
+    ('projecoes_populacao', f"{IBGE_API_BASE_URL}/v1/projecoes/populacao/BR"),
+
+    # 4. Dados de população estimada por município (podemos agregar por estado)
+    ('agregados_6579', f"{IBGE_API_BASE_URL}/v3/agregados/6579/periodos/2023/variaveis/9324?localidades=N3[all]")
+]
+
+@timed('collect.population_data')
 def collect_population_data():
     """
     Coleta dados de população por estado do IBGE
     """
-    print("🔄 Iniciando coleta de dados do IBGE...")
+    echo("🔄 Iniciando coleta de dados do IBGE...")
     
-    # URL da API do IBGE para população por estado
-    endpoints = [
-        # 1. Lista de estados (sempre funciona)
-        "https://servicodados.ibge.gov.br/api/v1/localidades/estados",
-        
-        # 2. População por UF - dados agregados (Censo/PNAD)
-        "https://servicodados.ibge.gov.br/api/v3/agregados/4714/periodos/2022/variaveis/93?localidades=N3[all]",
-        
-        # 3. Projeções populacionais por UF
-        "https://servicodados.ibge.gov.br/api/v1/projecoes/populacao/BR",
-        
-        # 4. Dados de população estimada por município (podemos agregar por estado)
-        "https://servicodados.ibge.gov.br/api/v3/agregados/6579/periodos/2023/variaveis/9324?localidades=N3[all]"
-
-    ]
-    
-    for i, url in enumerate(endpoints, 1):
-        print(f"\n🌐 Tentando endpoint {i}: {url}")
+    for i, (name, url) in enumerate(COLLECTION_ENDPOINTS, 1):
+        echo(f"\n🌐 Tentando endpoint {i}: {url}")
 
         try:
             data = make_request_with_retry(url)
             if data: 
-                print(f"✅ Dados coletados com sucesso do endpoint {i+1}!")
-                save_raw_data(data, f"endpoin_{i}")
+                echo(f"✅ Dados coletados com sucesso do endpoint {i+1}!")
+                save_raw_data(data, name, url=url)
 
                 # Processa os dados dependendo do endpoint
                 if i == 1: #Estados
@@ -43,17 +49,20 @@ def collect_population_data():
                 elif i in [2, 4]: #Dados agregados
                     processed_data = process_aggregated_data(data)
                 elif i == 3: #Projeções
-                    processed_data = process_projections_data(data)
+                    # Totais nacionais: ficam no arquivo bruto como insumo do motor de projeção,
+                    # não servem como dados por estado
+                    process_projections_data(data)
+                    continue
 
                 if processed_data is not None and len(processed_data) > 0:
-                    print(f"✅ Dados processados: {len(processed_data)}")
+                    echo(f"✅ Dados processados: {len(processed_data)}")
                     return processed_data
                 return processed_data
         except Exception as e:
-            print(f"❌ Erro ao coletar dados do endpoint {i}: {str(e)}")
+            echo(f"❌ Erro ao coletar dados do endpoint {i}: {str(e)}")
             continue
     # Se todos os endpoints falharem, usar dados de exemplo
-    print("❌ Não foi possível coletar dados de nenhum endpoint. Usando dados de exemplo...")
+    echo("❌ Não foi possível coletar dados de nenhum endpoint. Usando dados de exemplo...")
     return use_sample_data()
 
 
@@ -64,37 +73,46 @@ def make_request_with_retry(url, max_retries=MAX_RETRIES):
         'Accept': 'application/json',
         'Accept-Encoding': 'gzip, deflate'
     }
-    """Faz requisição com tentativas múltiplicas"""
     for attempt in range(max_retries):
         try: 
-            print(f"Tentativa {attempt +1}/{max_retries}...")
-            response = requests.get(url, timeout=REQUEST_TIMEOUT)
-            print(f"  📊 Status Code: {response.status_code}")
-            print(f"  📊 Headers: {response.headers}")
-            
-            if response.status_code == 503:
-                print("  ⚠️  Serviço temporariamente indisponível (503)")
-                raise requests.exceptions.RequestException("Service unavailable")
-
-            response.raise_for_status()
-            data = response.json()
+            echo(f"Tentativa {attempt +1}/{max_retries}...")
+            increment('http.requests')
+            if attempt > 0:
+                increment('http.retries')
+            with span('http.request', url=url, attempt=attempt + 1) as attributes:
+                response = requests.get(url, timeout=REQUEST_TIMEOUT)
+                attributes['status_code'] = response.status_code
+                attributes['bytes'] = len(response.content)
+                increment('http.bytes', len(response.content))
+                echo(f"  📊 Status Code: {response.status_code}")
+                
+                if response.status_code == 503:
+                    echo("  ⚠️  Serviço temporariamente indisponível (503)")
+                    raise requests.exceptions.RequestException("Service unavailable")
+
+                response.raise_for_status()
+                with span('http.parse_json', url=url):
+                    data = response.json()
 
             if data:
-                print(f"Respostas recebidas: {len(data) if isinstance(data, list) else 1} item(s)")
+                echo(f"Respostas recebidas: {len(data) if isinstance(data, list) else 1} item(s)")
                 return data
             else:
-                print("⚠️ Resposta vazia")
+                echo("⚠️ Resposta vazia")
         except requests.exceptions.RequestException as e:
-            print(f"Tentativa {attempt + 1} falhou: {str(e)}")
+            increment('http.errors')
+            echo(f"Tentativa {attempt + 1} falhou: {str(e)}")
             if attempt < max_retries - 1:
-                print(f"  ⏳ Aguardando 2 segundos antes da próxima tentativa...")
-                time.sleep(2)
+                echo(f"  ⏳ Aguardando {RETRY_BACKOFF:g} segundos antes da próxima tentativa...")
+                with span('http.backoff', url=url):
+                    time.sleep(RETRY_BACKOFF)
             else: 
                 raise e
     
+@timed('parse.states')
 def process_states_data(data):
     """Processa dados básicos dos estados"""
-    print("🔧 Processando dados dos estados...")
+    echo("🔧 Processando dados dos estados...")
 
     states_data = []
     for state in data:
@@ -103,13 +121,14 @@ def process_states_data(data):
             'sigla': state.get('sigla'),
             'nome': state.get('nome'),
             'regiao': state.get('regiao', {}).get('nome', 'N/A'),
-            'data_coleta': datetime.now().strftime('%Y-%m-%d %H-:%M:%S')
+            'data_coleta': datetime.now().strftime(TIMESTAMP_FORMAT)
         })
     return states_data
 
+@timed('parse.aggregated')
 def process_aggregated_data(data):
     """Processa dados agregados de população por estado"""
-    print("🔧 Processando dados agregados...")
+    echo("🔧 Processando dados agregados...")
 
     population_data = []
     try: 
@@ -117,6 +136,7 @@ def process_aggregated_data(data):
             if 'localidade' in item:
                 for localidade in item['localidades']:
                     nome = localidade.get('localidade', {}).get('nome', 'N/A')
+                    codigo = localidade.get('localidade', {}).get('id')
 
                     # Pega o valor da série
                     serie_value = None
@@ -129,28 +149,69 @@ def process_aggregated_data(data):
                                     break
                     if serie_value:
                         population_data.append({
+                            'id': int(codigo) if codigo else None,
                             'nome': nome,
                             'populacao': int(str(serie_value).replace('.', '').replace(',', '')),
-                            'data_coleta': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                            'data_coleta': datetime.now().strftime(TIMESTAMP_FORMAT)
                         })
 
     except Exception as e:
-        print(f"❌ Erro ao processar dados agregados: {str(e)}")
+        echo(f"❌ Erro ao processar dados agregados: {str(e)}")
         return None
 
     return population_data
 
+@timed('parse.projections')
 def process_projections_data(data):
-    """Processa dados de projeções populacionais por estado"""
-    print("🔧 Processando dados de projeções...")
+    """
+    Processa as projeções populacionais (/projecoes/populacao/<localidade>)
+
+    A API informa a população projetada e o intervalo médio, em segundos,
+    entre nascimentos, óbitos e incrementos da população. Daí saem os
+    eventos por ano e as taxas brutas usadas no motor de projeção
+    (`src/analytics/projection.py`); a migração líquida é o incremento que
+    o saldo de nascimentos e óbitos não explica.
+
+    Returns:
+        list: um registro por localidade (código 1 = Brasil) ou None
+    """
+    echo("🔧 Processando dados de projeções...")
+
+    def events_per_year(seconds):
+        return SECONDS_PER_YEAR / seconds if seconds else 0.0
+
+    projections_data = []
+    for payload in data if isinstance(data, list) else [data]:
+        projecao = payload.get('projecao') or {}
+        periodo = projecao.get('periodoMedio') or {}
+        populacao = projecao.get('populacao')
+        if not populacao:
+            continue
 
-    # A API de projeções tem estrutura diferente
-    # Retorna dados agregados para usar como fallback
-    return None
+        nascimentos = events_per_year(periodo.get('nascimento'))
+        obitos = events_per_year(periodo.get('obito'))
+        incremento = events_per_year(periodo.get('incrementoPopulacional')) or nascimentos - obitos
+        migracao = incremento - (nascimentos - obitos)
+        localidade = str(payload.get('localidade', 'BR'))
+
+        projections_data.append({
+            'id': BRASIL_CODE if localidade.upper() == 'BR' else int(localidade),
+            'localidade': localidade,
+            'populacao': int(populacao),
+            'nascimentos_ano': round(nascimentos),
+            'obitos_ano': round(obitos),
+            'migracao_liquida_ano': round(migracao),
+            'taxa_natalidade': nascimentos / populacao,
+            'taxa_mortalidade': obitos / populacao,
+            'taxa_migracao': migracao / populacao,
+            'horario': payload.get('horario'),
+            'data_coleta': datetime.now().strftime(TIMESTAMP_FORMAT)
+        })
+    return projections_data or None
 
 def use_sample_data():
     """Usa dados de exemplo se a coleta falhar"""
-    print("🔄 Usando dados de exemplo...")
+    echo("🔄 Usando dados de exemplo...")
 
     # Dados de população por estado(exemplo)
     sample_data = [
@@ -184,66 +245,68 @@ def use_sample_data():
     ]
 
     for item in sample_data:
-        item['data_coleta'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        item['data_coleta'] = datetime.now().strftime(TIMESTAMP_FORMAT)
 
-    print(f"Dados de exemplo criados com {len(sample_data)} estados.")
+    echo(f"Dados de exemplo criados com {len(sample_data)} estados.")
     return sample_data
 
-def save_raw_data(data, source="api"):
+def save_raw_data(data, source="api", url=None, params=None):
     """
-    Salva os dados brutos em formato JSON
-    """
-    # Criando pasta se não existir
-    os.makedirs("data/raw", exist_ok=True)
-    
-    # Nome do arquivo com timestamp
-    timestamp = datetime.now().strftime(DATE_FORMAT)
-    filename = f"{RAW_DATA_PATH}/ibge_population_{source}_{timestamp}.json"
+    Arquiva os dados brutos (blob comprimido por hash de conteúdo + índice)
 
-    with open(filename, "w", encoding=ENCODING) as f: 
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"Dados salvos em: {filename}")
+    Payloads idênticos aos já arquivados não ocupam espaço de novo.
+    """
+    entry = get_raw_archive().put(data, source, params=params, url=url)
+    echo(f"Dados brutos arquivados: {source} → {entry['hash'][:12]} "
+         f"({entry['bytes']:,} bytes, {entry['stored_bytes']:,} comprimidos)")
+    return entry
 
 def process_and_save_final_data(data):
     """Processa e salva os dados finais"""
-    print("🔧 Processamento final dos dados...")
+    echo("🔧 Processamento final dos dados...")
     
-    # Cria DataFrame
-    df = pd.DataFrame(data)
+    # Cria DataFrame com os tipos do esquema
+    df = records_to_frame(data)
+
+    # Registros sem código (dados de exemplo, agregados antigos): associar pelo nome normalizado
+    if 'nome' in df.columns and ('id' not in df.columns or df['id'].isna().any()):
+        codes = get_localidades().codes_for_names(df['nome'])
+        df['id'] = df['id'].fillna(codes) if 'id' in df.columns else codes
+        df = apply_schema(df)
     
+    # Alterações em relação à coleta anterior (inserções, atualizações, remoções por código)
+    tracker = ChangeTracker(PROCESSED_DATASET, keys=['id'] + (['ano'] if 'ano' in df.columns else []))
+    delta = tracker.diff(df)
+    echo(f"🔁 Alterações desde a última coleta: {delta.counts()}")
+
     # Informações básicas
-    print(f"📋 Colunas disponíveis: {list(df.columns)}")
-    print(f"📊 Primeiras 5 linhas:")
-    print(df.head())
-    print(f"📈 Total de registros: {len(df)}")
+    echo(f"📋 Colunas disponíveis: {list(df.columns)}")
+    echo(f"📊 Primeiras 5 linhas:")
+    echo(df.head())
+    echo(f"📈 Total de registros: {len(df)}")
     
     if 'populacao' in df.columns:
         total_pop = df['populacao'].sum()
-        print(f"👥 População total: {total_pop:,}")
+        echo(f"👥 População total: {total_pop:,}")
         
         # Adiciona percentual
         df['percentual_populacional'] = (df['populacao'] / total_pop * 100).round(2)
     
-    # Salva dados processados
+    # Salva dados processados (partições sem alteração não são regravadas)
     save_processed_data(df)
+    tracker.commit(delta)
     
     return df
 
-def save_processed_data(df):
+@timed('storage.save_processed_data')
+def save_processed_data(df, source="IBGE API", nivel="UF"):
     """
-    Salva os dados processados em CSV
+    Salva os dados processados no conjunto particionado (fonte/ano/nível)
     """
-    # Criando pasta se não existir
-    os.makedirs(PROCESSED_DATA_PATH, exist_ok=True)
-    
-    # Nome do arquivo com timestamp
-    timestamp = datetime.now().strftime(DATE_FORMAT)
-    filename = f"{PROCESSED_DATA_PATH}/ibge_population_{timestamp}.csv"
-    
-    # Salvando arquivo
-    df.to_csv(filename, index=False, encoding=ENCODING)
-    
-    print(f"💾 Dados processados salvos em: {filename}")
+    catalog = PartitionedDataset(PROCESSED_DATASET).write(
+        df, nivel=nivel, fonte=None if 'fonte' in df.columns else source
+    )
+    echo(f"💾 Dados processados salvos em: {PROCESSED_DATA_PATH}/{PROCESSED_DATASET} (versão {catalog['version']})")
 
 if __name__ == "__main__":
     print("🇧🇷 IBGE Data Collector - População por Estado")
@@ -264,3 +327,5 @@ if __name__ == "__main__":
                 print(f"  {row['nome']}: {row['populacao']:,} habitantes")
     else:
         print("❌ Falha na coleta de dados")
+
+    print(f"📈 Métricas da execução: {write_metrics()}")
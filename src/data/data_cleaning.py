@@ -2,42 +2,55 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import sys
 
+# Permite importar os módulos do projeto ao executar este arquivo diretamente
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
+from config.data_config import PROCESSED_DATA_PATH, PROCESSED_DATASET, CLEANED_DATASET, TIMESTAMP_FORMAT
+from src.analytics.insights import update_insights
+from src.data.dataset_store import PartitionedDataset, load_latest_flat_csv
+from src.data.hierarchy import uf_hierarchy
+from src.data.localidades import get_localidades
+from src.monitoring.instrumentation import echo, timed
+
+
+@timed('cleaning.clean_population_data')
 def clean_population_data(df):
     """Limpeza e valida os dados de população"""
-    print("🧹 Iniciando limpeza e validação dos dados de população...")
+    echo("🧹 Iniciando limpeza e validação dos dados de população...")
 
     # Copia o DataFrame para evitar modificações inadequadas
     df_clean = df.copy()
 
     # 1. Verificar dados duplicados
-    print("🔍 Verificando dados duplicados...")
+    echo("🔍 Verificando dados duplicados...")
     duplicates = df_clean.duplicated().sum()
     if duplicates > 0:
-        print(f"🚨 Encontradas {duplicates} linhas duplicadas!")
-        print(f"✅ Duplicatas removidas")
+        echo(f"🚨 Encontradas {duplicates} linhas duplicadas!")
+        echo(f"✅ Duplicatas removidas")
 
     # 2. Verificar valores nulos
-    print("🔍 Verificando valores nulos...")
+    echo("🔍 Verificando valores nulos...")
     null_counts = df_clean.isnull().sum()
-    print("Valores nulos por coluna:")
-    print(null_counts)
+    echo("Valores nulos por coluna:")
+    echo(null_counts)
 
     # 3. Limpar nomes dos estados
     if "nome" in df_clean.columns:
-        print("🔍 Limpeza de nomes de estados...")
-        df_clean["nome"] = df_clean["nome"].str.strip()
-        df_clean["nome"] = df_clean["nome"].str.strip()
+        echo("🔍 Limpeza de nomes de estados...")
+        df_clean = standardize_state_names(df_clean)
 
     # 4. Validar população 
     if "populacao" in df_clean.columns:
-        print("Validando dados de população...")
+        echo("Validando dados de população...")
 
         # Remover valores negativos
         negative_pop = (df_clean["populacao"] < 0).sum()
         if negative_pop > 0:
-            print(f"🚨 Encontrados {negative_pop} valores negativos de população!")
+            echo(f"🚨 Encontrados {negative_pop} valores negativos de população!")
             df_clean = df_clean[df_clean["populacao"] >= 0]
         
         #Verificar valores extremos (outliers)
@@ -50,13 +63,13 @@ def clean_population_data(df):
         outliers = ((df_clean["populacao"] < lower_bound) | (df_clean["populacao"] > upper_bound)).sum()
 
         if outliers > 0:
-            print(f"🚨 Encontrados {outliers} valores extremos de população!")
-            print(f"    Limite inferior: {lower_bound:,.0f}")
-            print(f"    Limite superior: {upper_bound:,.0f}")
+            echo(f"🚨 Encontrados {outliers} valores extremos de população!")
+            echo(f"    Limite inferior: {lower_bound:,.0f}")
+            echo(f"    Limite superior: {upper_bound:,.0f}")
     
     # 5 Padronizar regiões
     if "regiao" in df_clean.columns: 
-        print("🔧 Padronizando regiões...")
+        echo("🔧 Padronizando regiões...")
         region_mapping = {
             "sudeste": "Sudeste",
             "nordeste": "Nordeste",
@@ -64,92 +77,213 @@ def clean_population_data(df):
             "centro-oeste": "Centro-Oeste",
             "norte": "Norte"
         }
-        df_clean["regiao"] = df_clean["regiao"]
+        regioes = df_clean["regiao"].astype(str).str.strip().where(df_clean["regiao"].notna())
+        regioes = regioes.str.lower().map(region_mapping).fillna(regioes)
+
+        # Região oficial pela hierarquia do IBGE (para registros de UF com código)
+        if "id" in df_clean.columns:
+            hierarchy = uf_hierarchy()
+            is_uf = df_clean["id"].isin(hierarchy.codes['UF'])
+            if is_uf.any():
+                region_codes = hierarchy.ancestors('UF', df_clean.loc[is_uf, "id"], 'regiao')
+                official = hierarchy.names['regiao'][hierarchy.index_of('regiao', region_codes)]
+                divergent = (regioes[is_uf] != official).sum()
+                if divergent > 0:
+                    echo(f"🚨 {divergent} registros com região diferente da hierarquia do IBGE (corrigidos)")
+                regioes[is_uf] = official
+        df_clean["regiao"] = regioes
 
     # 6. Adicionar metadados de limpeza
-    df_clean['data_limpeza'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    df_clean['data_limpeza'] = pd.Timestamp.now().floor('s')
     df_clean['versao_dados'] = '1.0'
 
-    print("✅ Limpeza concluída!")
-    print(f"✅ Dados finais: {len(df_clean)} registros")
+    echo("✅ Limpeza concluída!")
+    echo(f"✅ Dados finais: {len(df_clean)} registros")
 
     return df_clean
 
+@timed('cleaning.standardize_state_names')
+def standardize_state_names(df):
+    """
+    Padroniza os nomes de UF pela dimensão de localidades
+
+    Registros com código de UF recebem o nome oficial (junção por código).
+    Registros sem código só são associados a uma UF quando se sabe que são
+    do nível UF (`nivel == 'UF'`, ou uma `sigla` cujo nome confere com a UF):
+    pela sigla, pelo nome normalizado ou pela busca aproximada (n-gramas); o
+    código encontrado preenche o `id`. Municípios sem código recebem o código
+    pelo índice municipal (restrito à UF da `sigla`, quando houver) e, como
+    os demais nomes (locais sintéticos, níveis desconhecidos), apenas perdem
+    os espaços extras.
+    """
+    df = df.copy()
+    localidades = get_localidades()
+    df["nome"] = df["nome"].str.strip()
+
+    has_ids = "id" in df.columns
+    ids = pd.to_numeric(df["id"], errors='coerce').astype('Int64') if has_ids else pd.Series(pd.NA, index=df.index, dtype='Int64')
+    levels = df["nivel"].astype(object) if "nivel" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    siglas = df["sigla"].astype(object) if "sigla" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    to_match = ids.isna() & df["nome"].notna()
+
+    # Nível UF: declarado na coluna 'nivel' ou indicado por uma sigla que confere com o nome
+    uf_rows = to_match & levels.eq('UF')
+    candidates = to_match & levels.isna() & siglas.notna()
+    if candidates.any():
+        sigla_codes = localidades.codes_for_siglas(siglas[candidates])
+        name_codes = localidades.codes_for_names(df.loc[candidates, "nome"], fuzzy=True)
+        uf_rows[candidates] = (sigla_codes == name_codes).fillna(False).astype(bool)
+    if uf_rows.any():
+        codes = localidades.codes_for_names(df.loc[uf_rows, "nome"], fuzzy=True)
+        if "sigla" in df.columns:
+            codes = localidades.codes_for_siglas(siglas[uf_rows]).fillna(codes)
+        ids[uf_rows] = codes.astype('Int64')
+
+    # Municípios: índice municipal, com os nomes repetidos desambiguados pela UF
+    municipal_rows = to_match & ~uf_rows & (levels.eq('municipio') | candidates)
+    if municipal_rows.any():
+        ufs = siglas[municipal_rows] if "sigla" in df.columns else None
+        ids[municipal_rows] = localidades.codes_for_names(
+            df.loc[municipal_rows, "nome"], level='municipio', ufs=ufs, fuzzy=True
+        ).astype('Int64')
+
+    is_uf = ids.isin(localidades.ufs["id"])
+    if is_uf.any():
+        official = localidades.attributes(ids[is_uf], columns=['nome'])["nome"]
+        renamed = (df.loc[is_uf, "nome"] != official).sum()
+        if renamed > 0:
+            echo(f"🔧 {renamed} nomes de UF padronizados")
+        df.loc[is_uf, "nome"] = official
+
+    filled = (to_match & ids.notna()).sum()
+    if has_ids and filled > 0:
+        echo(f"🔧 {filled} códigos preenchidos pelo nome ({(to_match & is_uf).sum()} de UF)")
+        df["id"] = ids if ids.isna().any() else ids.astype(df["id"].dtype)
+
+    unmatched = ((uf_rows | municipal_rows) & ids.isna()).sum()
+    if unmatched > 0:
+        echo(f"⚠️ {unmatched} nomes sem localidade correspondente")
+    return df
+
+@timed('cleaning.validate_data_quality')
 def validate_data_quality(df):
     """Valida a qualidade dos dados após limepeza"""
-    print("\n🔍 Validando qualidade dos dados:")
+    echo("\n🔍 Validando qualidade dos dados:")
     
     # 1. Verificar se todos os estados estão presentes
     expected_states =  27 # Brasil tem 26 estados + DF
     actual_states = len(df)
-    print(f"🔍 Estados esperados: {expected_states}")
-    print(f"🔍 Estados encontrados: {actual_states}")
+    echo(f"🔍 Estados esperados: {expected_states}")
+    echo(f"🔍 Estados encontrados: {actual_states}")
 
     if actual_states < expected_states:
-        print("⚠️ Alguns estados podem estar faltando")
+        echo("⚠️ Alguns estados podem estar faltando")
 
     # 2. Verificar população total
     if "populacao" in df.columns:
         total_pop = df['populacao'].sum()
-        print(f"🔍 População total: {total_pop:,}")
+        echo(f"🔍 População total: {total_pop:,}")
 
         # Verificar se está próximo do esperado (cerca de 214 milhões)
         if 200_000_000 <= total_pop <= 230_000_000:
-            print("✅ População total está dentro do esperado")
+            echo("✅ População total está dentro do esperado")
         else: 
-            print("⚠️ População total pode estar incorreta")
+            echo("⚠️ População total pode estar incorreta")
+
+    # 3. Verificar consistência com a hierarquia do IBGE (UF → região → Brasil)
+    if {"id", "populacao"}.issubset(df.columns):
+        validate_hierarchy(df)
         
-    # 3. Verificar distribuição por região
+    # 4. Verificar distribuição por região
     if "regiao" in df.columns:
-        print("\nDistribuição por região:")
+        echo("\nDistribuição por região:")
         region_dist = df['regiao'].value_counts()
         for region, count in region_dist.items():
-            print(f"🔍 {region}: {count} estados")
+            echo(f"🔍 {region}: {count} estados")
     
     return True
 
-def save_cleaned_data(df, filename=None):
-    """Salva os dados limpos"""
+def validate_hierarchy(df, hierarchy=None, tolerance=0.0):
+    """
+    Confere os dados com a hierarquia geográfica do IBGE
 
-    if filename is None:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%m%S')
-        filename = f"data/processed/cleaned_population_{timestamp}.csv"
-    
-    # Criar pasta se não existir
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    Códigos desconhecidos e UFs duplicadas são apontados. Se o DataFrame
+    trouxer totais em mais de um nível (coluna 'nivel'), a soma dos filhos
+    é comparada com o total de cada pai, em todos os níveis.
+
+    Returns:
+        pd.DataFrame: pais inconsistentes (vazio quando tudo confere)
+    """
+    hierarchy = hierarchy or uf_hierarchy()
+    levels = df['nivel'] if 'nivel' in df.columns else pd.Series('UF', index=df.index)
+    known = pd.Series(False, index=df.index)
+    for level in levels.unique():
+        if level in hierarchy.levels:
+            mask = levels == level
+            known[mask] = df.loc[mask, 'id'].isin(hierarchy.codes[level])
+
+    unknown = df.loc[~known, 'id']
+    if len(unknown) > 0:
+        echo(f"⚠️ {len(unknown)} registros com código fora da hierarquia: {unknown.unique()[:10].tolist()}")
+
+    reported = df[known].assign(nivel=levels[known])
+    keys = ['nivel', 'id'] + [column for column in ('ano',) if column in df.columns]
+    duplicated = reported.duplicated(keys).sum()
+    if duplicated > 0:
+        echo(f"⚠️ {duplicated} localidades repetidas no mesmo ano")
+
+    if reported['nivel'].nunique() < 2:
+        return pd.DataFrame()
+
+    problems = hierarchy.check_consistency(reported, 'populacao', tolerance=tolerance)
+    if problems.empty:
+        echo("✅ Totais consistentes com a hierarquia do IBGE")
+    else:
+        echo(f"⚠️ {len(problems)} totais diferentes da soma dos filhos:")
+        echo(problems.head(10))
+    return problems
+
+@timed('storage.save_cleaned_data')
+def save_cleaned_data(df, filename=None, nivel="UF"):
+    """Salva os dados limpos (no conjunto particionado, ou em `filename` se informado)"""
+
+    if filename is not None:
+        # Criar pasta se não existir
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-    # Salvar dados
-    df.to_csv(filename, index=False, encoding='utf-8')
-    print(f"✅ Dados salvos em: {filename}")
+        # Salvar dados
+        df.to_csv(filename, index=False, encoding='utf-8', date_format=TIMESTAMP_FORMAT)
+        echo(f"✅ Dados salvos em: {filename}")
+        return filename
 
-    return filename
+    catalog = PartitionedDataset(CLEANED_DATASET).write(df, nivel=nivel)
+    echo(f"✅ Dados limpos publicados: {CLEANED_DATASET} (versão {catalog['version']})")
+    return catalog
 
 if __name__ == "__main__":
     # Teste da limpeza
     print("🧹 Iniciando teste de limpeza...")
     print("=" * 40)
 
-    # Carregar dados processador mais recentes
-    processed_dir = "data/processed"
-    if os.path.exists(processed_dir):
-        files = [f for f in os.listdir(processed_dir) if f.endswith(".csv")]
-        if files:
-            latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(processed_dir, x)))
-            file_path = os.path.join(processed_dir, latest_file)
+    # Carregar a versão atual dos dados processados (pelo catálogo)
+    df = PartitionedDataset(PROCESSED_DATASET).read()
+    if df.empty:
+        df = load_latest_flat_csv(PROCESSED_DATA_PATH, "ibge_population")
 
-            print(f"📂 Carregando: {file_path}")
-            df = pd.read_csv(file_path)
+    if df is not None and not df.empty:
+        print(f"📂 Registros carregados: {len(df)}")
 
-            # Aplicar limpeza
-            df_clean = clean_population_data(df)
+        # Aplicar limpeza
+        df_clean = clean_population_data(df)
 
-            #Valida qualidade
-            validate_data_quality(df_clean)
+        #Valida qualidade
+        validate_data_quality(df_clean)
 
-            # Salvar dados limpos
-            save_cleaned_data(df_clean)
+        # Salvar dados limpos
+        save_cleaned_data(df_clean)
 
-        else:
-            print("🔍 Nenhum arquivo processado encontrado")
+        # Atualizar insights pré-calculados (requer painel com ano e população)
+        if {'ano', 'populacao', 'nome'}.issubset(df_clean.columns):
+            update_insights(df_clean)
     else:
-        print("🔍 Diretório de dados processados não encontrado")
\ No newline at end of file
+        print("🔍 Nenhum dado processado encontrado")
@@ -0,0 +1,312 @@
+"""
+Conjuntos de dados particionados em data/processed com catálogo
+
+Layout em disco:
+
+    data/processed/<conjunto>/
+        _catalog.json
+        fonte=<fonte>/ano=<ano>/nivel=<nivel>/part-<versão>.csv
+
+O catálogo registra o esquema, a versão atual e, por partição, o número de
+linhas, os valores mínimo/máximo das colunas numéricas e o hash do conteúdo
+(partições com o mesmo conteúdo da versão atual não são regravadas). Os leitores usam o
+catálogo para descartar partições (filtros por fonte/ano/nível e predicados
+comparados com min/max) e leem apenas as colunas necessárias, sem varrer o
+diretório nem ordenar arquivos por data de criação.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+
+import pandas as pd
+
+from config.data_config import PROCESSED_DATA_PATH, ENCODING, TIMESTAMP_FORMAT, DATASET_LOCK_TIMEOUT
+from src.data.change_capture import VOLATILE_COLUMNS
+from src.data.file_lock import file_lock
+from src.data.fingerprint import data_fingerprint
+from src.data.schema import apply_schema, read_population_csv
+from src.monitoring.instrumentation import echo, span
+
+CATALOG_FILENAME = '_catalog.json'
+LOCK_FILENAME = '_catalog.lock'
+PARTITION_KEYS = ('fonte', 'ano', 'nivel')
+ALL_YEARS = 'todos'
+
+OPERATORS = {
+    '==': lambda series, value: series == value,
+    '!=': lambda series, value: series != value,
+    '<': lambda series, value: series < value,
+    '<=': lambda series, value: series <= value,
+    '>': lambda series, value: series > value,
+    '>=': lambda series, value: series >= value,
+    'in': lambda series, value: series.isin(value)
+}
+
+
+def slugify(value):
+    """Normaliza um texto para uso em nome de diretório"""
+    text = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_') or 'desconhecida'
+
+
+def _may_match(stats, column, operator, value):
+    """Verifica pelos min/max da partição se algum registro pode satisfazer o predicado"""
+    if column not in stats:
+        return True
+    low, high = stats[column]['min'], stats[column]['max']
+    if operator == '==':
+        return low <= value <= high
+    if operator == '<':
+        return low < value
+    if operator == '<=':
+        return low <= value
+    if operator == '>':
+        return high > value
+    if operator == '>=':
+        return high >= value
+    if operator == 'in':
+        return any(low <= item <= high for item in value)
+    return True
+
+
+class PartitionedDataset:
+    """Conjunto de dados particionado por fonte, ano e nível geográfico"""
+
+    def __init__(self, name, base_dir=PROCESSED_DATA_PATH):
+        self.name = name
+        self.root = os.path.join(base_dir, name)
+        self.catalog_path = os.path.join(self.root, CATALOG_FILENAME)
+        self.lock_path = os.path.join(self.root, LOCK_FILENAME)
+
+    def load_catalog(self):
+        """Carrega o catálogo (vazio se o conjunto ainda não existe)"""
+        try:
+            with open(self.catalog_path, 'r', encoding=ENCODING) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'name': self.name, 'version': 0, 'schema': {}, 'partitions': []}
+
+    def _save_catalog(self, catalog):
+        """Grava o catálogo de forma atômica (arquivo temporário + rename)"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.catalog_path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding=ENCODING) as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.catalog_path)
+
+    @staticmethod
+    def _column_stats(df):
+        """Mínimo e máximo de cada coluna numérica"""
+        stats = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series) and series.notna().any():
+                low, high = series.min(), series.max()
+                stats[column] = {
+                    'min': low.item() if hasattr(low, 'item') else low,
+                    'max': high.item() if hasattr(high, 'item') else high
+                }
+        return stats
+
+    def write(self, df, nivel='UF', fonte=None):
+        """
+        Grava o DataFrame particionado e publica uma nova versão do catálogo
+
+        Partições com as mesmas chaves (fonte, ano, nível) são substituídas;
+        as demais continuam valendo. Partições cujo conteúdo (sem as colunas
+        voláteis, como data_coleta) não mudou mantêm o arquivo atual; se
+        nenhuma mudou, nenhuma versão nova é publicada.
+
+        Args:
+            df (pd.DataFrame): dados a gravar
+            nivel (str): nível geográfico ('UF', 'municipio', 'regiao', ...)
+            fonte (str): fonte dos dados; se omitida usa a coluna 'fonte'
+
+        Returns:
+            dict: catálogo publicado
+        """
+        with span('storage.write_dataset', dataset=self.name, rows=len(df)):
+            # Catálogo → versão → partes → catálogo sob um único lock: sem ele dois
+            # escritores pegariam a mesma versão e um perderia as partições do outro
+            with file_lock(self.lock_path, timeout=DATASET_LOCK_TIMEOUT):
+                return self._write(df, nivel, fonte)
+
+    def _write(self, df, nivel, fonte):
+        """Grava as partições e o catálogo (ver `write`)"""
+        catalog = self.load_catalog()
+        version = catalog['version'] + 1
+
+        df = apply_schema(df)
+        if fonte is not None or 'fonte' not in df.columns:
+            df['fonte'] = fonte or 'desconhecida'
+        # Chaves ausentes viram partições explícitas (nenhuma linha é descartada pelo groupby)
+        df['fonte'] = df['fonte'].astype(object).where(df['fonte'].notna(), 'desconhecida')
+        year_values = pd.Series(ALL_YEARS, index=df.index, dtype=object)
+        if 'ano' in df.columns:
+            year_values = df['ano'].astype(object).where(df['ano'].notna(), ALL_YEARS)
+
+        current = {tuple(p[key] for key in PARTITION_KEYS): p for p in catalog['partitions']}
+        new_partitions, unchanged = [], 0
+        for (source, year), part in df.groupby([df['fonte'], year_values], sort=False):
+            year = year.item() if hasattr(year, 'item') else year
+            content_hash = data_fingerprint(part.drop(columns=[c for c in VOLATILE_COLUMNS if c in part.columns]))
+            previous = current.get((slugify(source), year, slugify(nivel)))
+            if previous and previous.get('hash') == content_hash and \
+                    os.path.exists(os.path.join(self.root, previous['path'])):
+                unchanged += 1
+                continue
+
+            relative_dir = os.path.join(f"fonte={slugify(source)}", f"ano={year}", f"nivel={slugify(nivel)}")
+            relative_path = os.path.join(relative_dir, f"part-{version:05d}.csv")
+            os.makedirs(os.path.join(self.root, relative_dir), exist_ok=True)
+            part.to_csv(
+                os.path.join(self.root, relative_path),
+                index=False, encoding=ENCODING, date_format=TIMESTAMP_FORMAT
+            )
+
+            new_partitions.append({
+                'path': relative_path,
+                'fonte': slugify(source),
+                'fonte_nome': str(source),
+                'ano': year,
+                'nivel': slugify(nivel),
+                'rows': len(part),
+                'stats': self._column_stats(part),
+                'hash': content_hash,
+                'version': version
+            })
+
+        if not new_partitions:
+            echo(f"💾 {self.name}: {unchanged} partição(ões) sem alteração; versão {catalog['version']} mantida")
+            return catalog
+
+        replaced_keys = {tuple(p[key] for key in PARTITION_KEYS) for p in new_partitions}
+        kept = [p for p in catalog['partitions'] if tuple(p[key] for key in PARTITION_KEYS) not in replaced_keys]
+        replaced = [p for p in catalog['partitions'] if tuple(p[key] for key in PARTITION_KEYS) in replaced_keys]
+
+        catalog.update({
+            'version': version,
+            'updated_at': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'schema': {**catalog['schema'], **{column: str(dtype) for column, dtype in df.dtypes.items()}},
+            'partitions': kept + new_partitions,
+            'total_rows': sum(p['rows'] for p in kept + new_partitions)
+        })
+        self._save_catalog(catalog)
+
+        # Remover arquivos das partições substituídas (já fora do catálogo)
+        for partition in replaced:
+            try:
+                os.remove(os.path.join(self.root, partition['path']))
+            except OSError:
+                pass
+
+        echo(f"💾 {self.name}: versão {version} com {len(new_partitions)} partição(ões) gravada(s)"
+             f"{f', {unchanged} sem alteração' if unchanged else ''}")
+        return catalog
+
+    def partitions(self, filters=None, predicates=None, catalog=None):
+        """
+        Partições que podem conter registros relevantes (poda pelo catálogo)
+
+        Args:
+            filters (dict): chave de partição -> valor ou lista de valores
+            predicates (list): tuplas (coluna, operador, valor) comparadas com min/max
+        """
+        catalog = catalog or self.load_catalog()
+        selected = []
+        for partition in catalog['partitions']:
+            matches = True
+            for key, wanted in (filters or {}).items():
+                wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+                if key in ('fonte', 'nivel'):
+                    wanted = [slugify(value) for value in wanted]
+                if partition[key] not in wanted:
+                    matches = False
+                    break
+            if matches and all(_may_match(partition['stats'], *predicate) for predicate in predicates or []):
+                selected.append(partition)
+        return selected
+
+    def read(self, columns=None, filters=None, predicates=None):
+        """
+        Lê o conjunto aplicando poda de partições e projeção de colunas
+
+        Returns:
+            pd.DataFrame: registros que satisfazem filtros e predicados
+        """
+        for attempt in range(2):
+            catalog = self.load_catalog()
+            try:
+                with span('storage.read_dataset', dataset=self.name) as attributes:
+                    df = self._read_partitions(catalog, columns, filters, predicates)
+                    attributes['rows'] = len(df)
+                    return df
+            except FileNotFoundError:
+                # Um escritor publicou nova versão durante a leitura: recarregar o catálogo
+                if attempt == 1:
+                    raise
+
+    def _read_partitions(self, catalog, columns, filters, predicates):
+        """Lê as partições selecionadas usando o esquema do catálogo"""
+        schema = catalog['schema']
+        predicates = predicates or []
+        needed = None
+        if columns is not None:
+            # Colunas ausentes do esquema não são lidas (voltam preenchidas com nulos)
+            requested = list(columns) + [column for column, _, _ in predicates]
+            needed = [column for column in dict.fromkeys(requested) if column in schema]
+
+        dtypes, date_columns = {}, []
+        for column, dtype in schema.items():
+            if needed is not None and column not in needed:
+                continue
+            if dtype.startswith('datetime'):
+                date_columns.append(column)
+            else:
+                dtypes[column] = dtype
+
+        # O esquema é a união das gravações: cada partição pode ter só parte das colunas,
+        # então a seleção tolera ausentes e as datas são convertidas depois da leitura
+        usecols = (lambda column: column in needed) if needed is not None else None
+        frames = []
+        for partition in self.partitions(filters, predicates, catalog):
+            part = pd.read_csv(
+                os.path.join(self.root, partition['path']),
+                usecols=usecols,
+                dtype=dtypes,
+                encoding=ENCODING
+            )
+            if needed is not None:
+                part = part.reindex(columns=needed)
+            for column in date_columns:
+                if column in part.columns:
+                    part[column] = pd.to_datetime(part[column], format=TIMESTAMP_FORMAT, errors='coerce')
+            for column, operator, value in predicates:
+                if column not in part.columns:
+                    part[column] = pd.NA
+                part = part[OPERATORS[operator](part[column], value)]
+            frames.append(part)
+
+        if not frames:
+            return pd.DataFrame(columns=list(columns) if columns is not None else list(schema))
+
+        # Categorias diferentes entre partições viram texto no concat: reaplicar o esquema
+        df = apply_schema(pd.concat(frames, ignore_index=True))
+        if columns is None:
+            return df
+        return df.reindex(columns=list(columns))
+
+
+def load_latest_flat_csv(directory, prefix):
+    """Lê o CSV mais recente no formato antigo (um arquivo por execução)"""
+    if not os.path.exists(directory):
+        return None
+    files = [f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith('.csv')]
+    if not files:
+        return None
+    latest_file = max(files, key=lambda x: os.path.getctime(os.path.join(directory, x)))
+    echo(f"📂 Carregando (formato antigo): {os.path.join(directory, latest_file)}")
+    return read_population_csv(os.path.join(directory, latest_file))
@@ -0,0 +1,51 @@
+"""
+Locks de arquivo entre processos (`flock`) para seções read-modify-write
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+    FILE_LOCKS_AVAILABLE = True
+except ImportError:
+    # Windows: sem lock entre processos (os chamadores mantêm o lock entre threads)
+    FILE_LOCKS_AVAILABLE = False
+
+
+@contextmanager
+def file_lock(path, timeout=None, poll_interval=0.05):
+    """
+    Lock exclusivo sobre `path` (criado se não existir)
+
+    Como o `flock` vale por descritor aberto, também exclui threads do
+    mesmo processo que abrem o arquivo separadamente.
+
+    Args:
+        path (str): arquivo de lock
+        timeout (float): segundos de espera (None = sem limite)
+        poll_interval (float): intervalo entre tentativas
+
+    Raises:
+        TimeoutError: se o lock não for obtido em `timeout` segundos
+    """
+    if not FILE_LOCKS_AVAILABLE:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as lock_file:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Lock não obtido em {timeout}s: {path}")
+                time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
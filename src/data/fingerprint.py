@@ -0,0 +1,19 @@
+"""
+Impressões digitais de conteúdo para chaves de cache
+"""
+
+import hashlib
+
+import pandas as pd
+
+
+def data_fingerprint(df):
+    """Gera uma impressão digital estável do conteúdo de um DataFrame"""
+    hasher = hashlib.sha1()
+    hasher.update(str(list(df.columns)).encode('utf-8'))
+    try:
+        hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    except TypeError:
+        # Colunas com valores não hasheáveis (ex.: dicionários vindos da API)
+        hasher.update(df.to_csv(index=False).encode('utf-8'))
+    return hasher.hexdigest()
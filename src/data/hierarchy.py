@@ -0,0 +1,312 @@
+"""
+Hierarquia geográfica do IBGE e agregação vetorizada
+
+    município → microrregião → UF → grande região → Brasil
+
+A hierarquia é montada a partir da API de localidades e guardada em arrays:
+para cada nível, os códigos ordenados, os nomes e o índice do pai no nível
+de cima. Com isso qualquer medida sobe a hierarquia inteira em uma passada
+por nível (soma por segmento com `np.add.reduceat`, vetorizada também nos
+anos), e a soma dos filhos pode ser comparada com o total informado de cada
+pai em todos os níveis.
+
+    hierarchy = fetch_hierarchy()
+    totals = hierarchy.rollup_frame(df_municipios, 'populacao')
+    problems = hierarchy.check_consistency(df_todos_os_niveis, 'populacao')
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config.data_config import IBGE_API_BASE_URL
+from src.data.schema import REGIOES, SIGLAS_UF
+from src.monitoring.instrumentation import span
+
+LEVELS = ['municipio', 'microrregiao', 'UF', 'regiao', 'brasil']
+BRASIL_CODE = 1
+
+# Códigos IBGE das UFs, na mesma ordem de SIGLAS_UF (o 1º dígito é o código da região)
+UF_CODES = [
+    11, 12, 13, 14, 15, 16, 17,
+    21, 22, 23, 24, 25, 26, 27, 28, 29,
+    31, 32, 33, 35,
+    41, 42, 43,
+    50, 51, 52, 53
+]
+
+
+class GeoHierarchy:
+    """Hierarquia geográfica em arrays: códigos, nomes e ponteiros para o pai"""
+
+    def __init__(self, levels, codes, names, parent_codes):
+        """
+        Args:
+            levels (list): níveis, do mais detalhado ao mais agregado
+            codes (dict): nível -> códigos das unidades
+            names (dict): nível -> nomes (mesma ordem de `codes`)
+            parent_codes (dict): nível -> código do pai de cada unidade (todos os níveis menos o topo)
+        """
+        self.levels = list(levels)
+        self.codes, self.names, self.parents = {}, {}, {}
+
+        sorted_parent_codes = {}
+        for level in self.levels:
+            level_codes = np.asarray(codes[level], dtype='int64')
+            order = np.argsort(level_codes, kind='stable')
+            self.codes[level] = level_codes[order]
+            self.names[level] = np.asarray(names[level], dtype=object)[order]
+            if len(np.unique(self.codes[level])) != len(self.codes[level]):
+                raise ValueError(f"Códigos duplicados no nível {level}")
+            if level in parent_codes:
+                sorted_parent_codes[level] = np.asarray(parent_codes[level], dtype='int64')[order]
+
+        # Segmentos para o reduceat: filhos ordenados pelo pai + início de cada grupo
+        self._segments = {}
+        for lower, upper in zip(self.levels, self.levels[1:]):
+            parents = self.index_of(upper, sorted_parent_codes[lower])
+            self.parents[lower] = parents
+            order = np.argsort(parents, kind='stable')
+            grouped = parents[order]
+            starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]]) if len(grouped) else grouped
+            self._segments[lower] = (order, starts, grouped[starts])
+
+    def __len__(self):
+        return len(self.codes[self.levels[0]])
+
+    def __repr__(self):
+        sizes = ', '.join(f"{level}={len(self.codes[level])}" for level in self.levels)
+        return f"GeoHierarchy({sizes})"
+
+    @classmethod
+    def from_municipios(cls, municipios):
+        """
+        Monta a hierarquia completa a partir de /localidades/municipios
+
+        Municípios sem microrregião na API (criados recentemente) ficam em
+        uma microrregião "sem microrregião" da própria UF (código UF × 1000).
+        """
+        municipio_rows, microrregioes, ufs, regioes = [], {}, {}, {}
+        for municipio in municipios:
+            micro = municipio.get('microrregiao') or {}
+            uf = (micro.get('mesorregiao') or {}).get('UF')
+            if uf is None:
+                uf = municipio['regiao-imediata']['regiao-intermediaria']['UF']
+            micro_id = micro.get('id') or uf['id'] * 1000
+            micro_nome = micro.get('nome') or f"Sem microrregião ({uf['sigla']})"
+
+            municipio_rows.append((municipio['id'], municipio['nome'], micro_id))
+            microrregioes[micro_id] = (micro_nome, uf['id'])
+            ufs[uf['id']] = (uf['nome'], uf['regiao']['id'])
+            regioes[uf['regiao']['id']] = uf['regiao']['nome']
+
+        codes, names, parents = {}, {}, {}
+        codes['municipio'], names['municipio'], parents['municipio'] = map(list, zip(*municipio_rows))
+        for level, units in (('microrregiao', microrregioes), ('UF', ufs)):
+            codes[level] = list(units)
+            names[level] = [name for name, _ in units.values()]
+            parents[level] = [parent for _, parent in units.values()]
+        cls._add_top_levels(codes, names, parents, regioes)
+        return cls(LEVELS, codes, names, parents)
+
+    @classmethod
+    def from_states(cls, estados):
+        """Hierarquia UF → região → Brasil a partir de /localidades/estados"""
+        codes = {'UF': [estado['id'] for estado in estados]}
+        names = {'UF': [estado['nome'] for estado in estados]}
+        parents = {'UF': [estado['regiao']['id'] for estado in estados]}
+        regioes = {estado['regiao']['id']: estado['regiao']['nome'] for estado in estados}
+        cls._add_top_levels(codes, names, parents, regioes)
+        return cls(['UF', 'regiao', 'brasil'], codes, names, parents)
+
+    @staticmethod
+    def _add_top_levels(codes, names, parents, regioes):
+        codes['regiao'] = list(regioes)
+        names['regiao'] = list(regioes.values())
+        parents['regiao'] = [BRASIL_CODE] * len(regioes)
+        codes['brasil'], names['brasil'] = [BRASIL_CODE], ['Brasil']
+
+    def index_of(self, level, codes):
+        """Posição de cada código no nível (KeyError para códigos desconhecidos)"""
+        codes = np.asarray(codes, dtype='int64')
+        level_codes = self.codes[level]
+        positions = np.searchsorted(level_codes, codes)
+        clipped = np.minimum(positions, len(level_codes) - 1)
+        unknown = (positions >= len(level_codes)) | (level_codes[clipped] != codes)
+        if unknown.any():
+            raise KeyError(f"Códigos desconhecidos no nível {level}: {np.unique(codes[unknown])[:10].tolist()}")
+        return positions
+
+    def parent_codes(self, level, codes):
+        """Código do pai de cada unidade do nível"""
+        upper = self.levels[self.levels.index(level) + 1]
+        return self.codes[upper][self.parents[level][self.index_of(level, codes)]]
+
+    def ancestors(self, level, codes, target):
+        """Código do ancestral no nível `target` de cada unidade (ex.: UF de cada município)"""
+        positions = self.index_of(level, codes)
+        for lower in self.levels[self.levels.index(level):self.levels.index(target)]:
+            positions = self.parents[lower][positions]
+        return self.codes[target][positions]
+
+    def _dense(self, level, codes, values, group_ids, n_groups):
+        """Matriz (grupos × unidades do nível) com a soma dos valores informados"""
+        n_units = len(self.codes[level])
+        flat = group_ids * n_units + self.index_of(level, codes)
+        dense = np.bincount(flat, weights=values, minlength=n_groups * n_units)
+        return dense.reshape(n_groups, n_units)
+
+    def _roll_up_one(self, totals, level):
+        """Soma cada linha da matriz do nível para o nível de cima (um reduceat por nível)"""
+        order, starts, targets = self._segments[level]
+        upper = self.levels[self.levels.index(level) + 1]
+        result = np.zeros((totals.shape[0], len(self.codes[upper])), dtype=totals.dtype)
+        if len(order):
+            result[:, targets] = np.add.reduceat(totals[:, order], starts, axis=1)
+        return result
+
+    def rollup(self, level, codes, values, group_ids=None, n_groups=1):
+        """
+        Agrega a medida do nível informado para todos os níveis acima
+
+        Args:
+            level (str): nível das unidades informadas
+            codes (array): código de cada registro
+            values (array): valor da medida de cada registro
+            group_ids (array): grupo de cada registro (ex.: índice do ano), 0..n_groups-1
+            n_groups (int): número de grupos
+
+        Returns:
+            dict: nível -> matriz (grupos × unidades do nível)
+        """
+        values = np.asarray(values, dtype='float64')
+        group_ids = np.zeros(len(values), dtype='int64') if group_ids is None else np.asarray(group_ids)
+        totals = {level: self._dense(level, codes, values, group_ids, n_groups)}
+        for lower, upper in zip(self.levels[self.levels.index(level):], self.levels[self.levels.index(level) + 1:]):
+            totals[upper] = self._roll_up_one(totals[lower], lower)
+        return totals
+
+    def rollup_frame(self, df, measure='populacao', level=None, code_column='id', group_column='ano'):
+        """
+        Agrega a medida do DataFrame para todos os níveis acima
+
+        Returns:
+            pd.DataFrame: colunas nivel, id, nome, <grupo>, <medida> (uma linha por unidade e grupo)
+        """
+        level = level or self.levels[0]
+        with span('hierarchy.rollup', level=level, rows=len(df)):
+            group_ids, groups = self._factorize_groups(df, group_column)
+            totals = self.rollup(level, df[code_column].to_numpy(), df[measure].to_numpy(), group_ids, len(groups))
+            frames = [self._level_frame(lvl, matrix, groups, group_column, measure) for lvl, matrix in totals.items()]
+            result = pd.concat(frames, ignore_index=True)
+            if pd.api.types.is_integer_dtype(df[measure]):
+                result[measure] = result[measure].round().astype('int64')
+            return result
+
+    def check_consistency(self, df, measure='populacao', level_column='nivel', code_column='id',
+                          group_column='ano', tolerance=0.0):
+        """
+        Compara a soma dos filhos com o total informado de cada pai, em todos os níveis
+
+        `df` traz totais informados em vários níveis (coluna `level_column`).
+        Para cada par de níveis informados consecutivos, os valores do nível
+        de baixo são agregados até o de cima e comparados com o informado.
+
+        Args:
+            tolerance (float): diferença relativa aceita (0.0 = exata)
+
+        Returns:
+            pd.DataFrame: um registro por pai inconsistente (diferença acima da
+            tolerância ou filhos ausentes); vazio quando tudo confere
+        """
+        with span('hierarchy.check_consistency', rows=len(df)) as attributes:
+            group_ids, groups = self._factorize_groups(df, group_column)
+            reported_levels = [level for level in self.levels if (df[level_column] == level).any()]
+
+            problems = []
+            for child, parent in zip(reported_levels, reported_levels[1:]):
+                child_mask = (df[level_column] == child).to_numpy()
+                parent_mask = (df[level_column] == parent).to_numpy()
+                child_codes = df.loc[child_mask, code_column].to_numpy()
+                child_groups = group_ids[child_mask]
+
+                sums = self.rollup(child, child_codes, df.loc[child_mask, measure].to_numpy(),
+                                   child_groups, len(groups))[parent]
+                reported_children = self.rollup(child, child_codes, np.ones(child_mask.sum()),
+                                                child_groups, len(groups))[parent]
+                expected_children = self.rollup(child, self.codes[child], np.ones(len(self.codes[child])))[parent]
+
+                reported = np.full_like(sums, np.nan)
+                parent_positions = self.index_of(parent, df.loc[parent_mask, code_column].to_numpy())
+                reported[group_ids[parent_mask], parent_positions] = df.loc[parent_mask, measure].to_numpy()
+
+                difference = sums - reported
+                missing = expected_children - reported_children
+                bad = ~np.isnan(reported) & (
+                    (np.abs(difference) > tolerance * np.abs(reported)) | (missing > 0)
+                )
+                rows, columns = np.nonzero(bad)
+                problems.append(pd.DataFrame({
+                    'nivel': parent,
+                    'nivel_filhos': child,
+                    'id': self.codes[parent][columns],
+                    'nome': self.names[parent][columns],
+                    group_column: groups[rows],
+                    'informado': reported[rows, columns],
+                    'soma_filhos': sums[rows, columns],
+                    'diferenca': difference[rows, columns],
+                    'filhos_ausentes': missing[rows, columns].astype('int64')
+                }))
+
+            result = pd.concat(problems, ignore_index=True) if problems else pd.DataFrame()
+            attributes['problems'] = len(result)
+            return result
+
+    @staticmethod
+    def _factorize_groups(df, group_column):
+        if group_column in df.columns:
+            group_ids, groups = pd.factorize(df[group_column], sort=True)
+            return group_ids, np.asarray(groups)
+        return np.zeros(len(df), dtype='int64'), np.array([None])
+
+    def _level_frame(self, level, matrix, groups, group_column, measure):
+        n_groups, n_units = matrix.shape
+        frame = pd.DataFrame({
+            'nivel': level,
+            'id': np.tile(self.codes[level], n_groups),
+            'nome': np.tile(self.names[level], n_groups),
+            group_column: np.repeat(groups, n_units),
+            measure: matrix.ravel()
+        })
+        return frame if groups[0] is not None else frame.drop(columns=group_column)
+
+
+@lru_cache(maxsize=1)
+def uf_hierarchy():
+    """Hierarquia UF → região → Brasil sem acesso à rede (nomes das UFs = siglas)"""
+    estados = [
+        {'id': code, 'nome': sigla, 'regiao': {'id': code // 10, 'nome': REGIOES[code // 10 - 1]}}
+        for code, sigla in zip(UF_CODES, SIGLAS_UF)
+    ]
+    return GeoHierarchy.from_states(estados)
+
+
+def fetch_hierarchy(municipios=True):
+    """
+    Baixa a hierarquia da API de localidades do IBGE
+
+    Args:
+        municipios (bool): hierarquia completa (municípios) ou só UF → região → Brasil
+
+    Returns:
+        GeoHierarchy: hierarquia, ou None se a API não respondeu
+    """
+    from src.data.collect_ibge_data import make_request_with_retry
+
+    endpoint = 'municipios' if municipios else 'estados'
+    with span('hierarchy.fetch', endpoint=endpoint):
+        payload = make_request_with_retry(f"{IBGE_API_BASE_URL}/v1/localidades/{endpoint}")
+        if not payload:
+            return None
+        return GeoHierarchy.from_municipios(payload) if municipios else GeoHierarchy.from_states(payload)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Dimensão de localidades (UFs e municípios) com busca por código, sigla ou nome
+
+Tabelas carregadas uma única vez por processo, com índices em dicionários
+(busca O(1)) e mapeamento vetorizado de nomes para códigos, para que as
+junções do pipeline sejam feitas por código IBGE (inteiro) e não por nome:
+
+    localidades = get_localidades()
+    localidades.code('Sao Paulo')                      # 35
+    localidades.lookup('SP')['nome']                   # 'São Paulo'
+    df['id'] = localidades.codes_for_names(df['nome'])
+
+Os nomes são comparados na forma normalizada (sem acentos, minúsculos,
+espaços/pontuação colapsados). A dimensão é versionada pelo conteúdo e
+gravada em data/cache/localidades; sem arquivo salvo, usa a tabela de
+referência das 27 UFs embutida abaixo.
+
+Uso (atualiza a partir da API de localidades):
+    python src/data/localidades.py [--sem-municipios]
+"""
+
+import argparse
+import hashlib
+import json
+import numbers
+import os
+import sys
+import threading
+
+import pandas as pd
+
+# Permite importar os módulos do projeto ao executar este arquivo diretamente
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.data_config import IBGE_API_BASE_URL, LOCALIDADES_PATH, ENCODING
+from src.data.name_matching import normalize_name, normalize_names, NGramIndex, MIN_FUZZY_SCORE
+from src.monitoring.instrumentation import echo, increment, span
+
+LATEST_POINTER = 'latest.json'
+
+# Referência embutida: (código, sigla, nome, região)
+UFS_REFERENCIA = [
+    (11, 'RO', 'Rondônia', 'Norte'), (12, 'AC', 'Acre', 'Norte'), (13, 'AM', 'Amazonas', 'Norte'),
+    (14, 'RR', 'Roraima', 'Norte'), (15, 'PA', 'Pará', 'Norte'), (16, 'AP', 'Amapá', 'Norte'),
+    (17, 'TO', 'Tocantins', 'Norte'), (21, 'MA', 'Maranhão', 'Nordeste'), (22, 'PI', 'Piauí', 'Nordeste'),
+    (23, 'CE', 'Ceará', 'Nordeste'), (24, 'RN', 'Rio Grande do Norte', 'Nordeste'),
+    (25, 'PB', 'Paraíba', 'Nordeste'), (26, 'PE', 'Pernambuco', 'Nordeste'), (27, 'AL', 'Alagoas', 'Nordeste'),
+    (28, 'SE', 'Sergipe', 'Nordeste'), (29, 'BA', 'Bahia', 'Nordeste'), (31, 'MG', 'Minas Gerais', 'Sudeste'),
+    (32, 'ES', 'Espírito Santo', 'Sudeste'), (33, 'RJ', 'Rio de Janeiro', 'Sudeste'),
+    (35, 'SP', 'São Paulo', 'Sudeste'), (41, 'PR', 'Paraná', 'Sul'), (42, 'SC', 'Santa Catarina', 'Sul'),
+    (43, 'RS', 'Rio Grande do Sul', 'Sul'), (50, 'MS', 'Mato Grosso do Sul', 'Centro-Oeste'),
+    (51, 'MT', 'Mato Grosso', 'Centro-Oeste'), (52, 'GO', 'Goiás', 'Centro-Oeste'),
+    (53, 'DF', 'Distrito Federal', 'Centro-Oeste')
+]
+
+UF_COLUMNS = ['id', 'sigla', 'nome', 'regiao']
+MUNICIPIO_COLUMNS = ['id', 'nome', 'uf_id', 'sigla']
+
+
+class LocalidadesDimension:
+    """Tabelas de UFs e municípios com índices por código, sigla e nome normalizado"""
+
+    def __init__(self, ufs, municipios=None):
+        """
+        Args:
+            ufs (pd.DataFrame): colunas id, sigla, nome, regiao
+            municipios (pd.DataFrame): colunas id, nome, uf_id, sigla (opcional)
+        """
+        self.ufs = ufs[UF_COLUMNS].astype({'id': 'int32'}).reset_index(drop=True)
+        self.ufs['nome_normalizado'] = normalize_names(self.ufs['nome'])
+        if municipios is None:
+            municipios = pd.DataFrame(columns=MUNICIPIO_COLUMNS)
+        self.municipios = municipios[MUNICIPIO_COLUMNS].astype({'id': 'int32', 'uf_id': 'int32'}).reset_index(drop=True)
+        self.municipios['nome_normalizado'] = normalize_names(self.municipios['nome'])
+        self.version = self._content_hash()
+        self._build_indexes()
+        self._fuzzy_indexes = {}
+
+    def _content_hash(self):
+        hasher = hashlib.sha1()
+        for table in (self.ufs, self.municipios):
+            hasher.update(table[['id', 'nome']].to_csv(index=False).encode('utf-8'))
+        return hasher.hexdigest()[:12]
+
+    def _build_indexes(self):
+        """Dicionários código/sigla/nome -> posição ou código"""
+        self._rows = {
+            'UF': dict(zip(self.ufs['id'].tolist(), range(len(self.ufs)))),
+            'municipio': dict(zip(self.municipios['id'].tolist(), range(len(self.municipios))))
+        }
+        self._by_sigla = dict(zip(self.ufs['sigla'].tolist(), self.ufs['id'].tolist()))
+        self._by_name = {'UF': dict(zip(self.ufs['nome_normalizado'].tolist(), self.ufs['id'].tolist()))}
+
+        # Nomes de município se repetem entre UFs: índice por (nome, UF) e, só para nomes únicos, por nome
+        municipios = self.municipios
+        self._by_name_uf = dict(zip(
+            (municipios['nome_normalizado'] + '|' + municipios['sigla'].astype(str)).tolist(),
+            municipios['id'].tolist()
+        ))
+        unique = ~municipios['nome_normalizado'].duplicated(keep=False)
+        self._by_name['municipio'] = dict(zip(
+            municipios.loc[unique, 'nome_normalizado'].tolist(), municipios.loc[unique, 'id'].tolist()
+        ))
+
+    def __repr__(self):
+        return f"LocalidadesDimension(versao={self.version}, ufs={len(self.ufs)}, municipios={len(self.municipios)})"
+
+    def _table(self, level):
+        return self.ufs if level == 'UF' else self.municipios
+
+    def code(self, key, level='UF', uf=None):
+        """
+        Código IBGE a partir de código, sigla (UF) ou nome (None se desconhecido)
+
+        Args:
+            key: código (int), sigla da UF ou nome (com ou sem acentos)
+            level (str): 'UF' ou 'municipio'
+            uf (str): sigla da UF, para desambiguar nomes de municípios
+        """
+        if isinstance(key, numbers.Integral) or (isinstance(key, str) and key.strip().isdigit()):
+            code = int(key)
+            return code if code in self._rows[level] else None
+        if level == 'UF' and isinstance(key, str) and key.strip().upper() in self._by_sigla:
+            return self._by_sigla[key.strip().upper()]
+        name = normalize_name(key)
+        if level == 'municipio' and uf is not None:
+            return self._by_name_uf.get(f"{name}|{uf}")
+        return self._by_name[level].get(name)
+
+    def lookup(self, key, level='UF', uf=None):
+        """Registro completo da localidade (dicionário) ou None"""
+        code = self.code(key, level, uf)
+        if code is None:
+            return None
+        row = self._table(level).iloc[self._rows[level][code]]
+        return row.to_dict()
+
+    def codes_for_names(self, names, level='UF', ufs=None, fuzzy=False, min_score=MIN_FUZZY_SCORE):
+        """
+        Mapeia nomes para códigos de forma vetorizada
+
+        Args:
+            names (pd.Series): nomes a mapear
+            ufs (pd.Series): siglas das UFs (municípios com nomes repetidos)
+            fuzzy (bool): busca aproximada (n-gramas) para os nomes sem casamento exato
+            min_score (float): similaridade mínima da busca aproximada
+
+        Returns:
+            pd.Series: códigos (Int32, nulo para nomes desconhecidos), mesmo índice de `names`
+        """
+        names = pd.Series(names, copy=False)
+        normalized = normalize_names(names)
+        if level == 'municipio' and ufs is not None:
+            ufs = pd.Series(ufs, index=names.index).astype(str)
+            codes = (normalized + '|' + ufs).map(self._by_name_uf)
+        else:
+            ufs = None
+            codes = normalized.map(self._by_name[level])
+
+        if fuzzy:
+            residual = codes.isna() & normalized.ne('')
+            if residual.any():
+                codes = codes.astype(object)
+                codes[residual] = self._match_fuzzy(normalized[residual], level,
+                                                    ufs[residual] if ufs is not None else None, min_score)
+        return codes.astype('Int32')
+
+    def _fuzzy_index(self, level, uf=None):
+        """Índice de n-gramas (em cache) dos nomes do nível; só os da UF quando informada"""
+        key = (level, uf)
+        if key not in self._fuzzy_indexes:
+            if uf is not None:
+                table = self.municipios[self.municipios['sigla'] == uf]
+                self._fuzzy_indexes[key] = NGramIndex(table['nome_normalizado'], table['id'])
+            else:
+                names = self._by_name[level]
+                self._fuzzy_indexes[key] = NGramIndex(list(names), list(names.values()))
+        return self._fuzzy_indexes[key]
+
+    def _match_fuzzy(self, normalized, level, ufs, min_score):
+        """Códigos por busca aproximada, uma vez por nome (ou par nome/UF) distinto"""
+        with span('localidades.fuzzy_match', level=level, names=len(normalized)) as attributes:
+            residuals = pd.DataFrame({'nome': normalized, 'uf': ufs if ufs is not None else None})
+            distinct = residuals.drop_duplicates()
+            matched = pd.Series(None, index=distinct.index, dtype=object)
+            for uf, group in distinct.groupby('uf', dropna=False, sort=False):
+                index = self._fuzzy_index(level, None if pd.isna(uf) else uf)
+                matched[group.index] = index.match(group['nome'], min_score)[0]
+
+            keys = pd.MultiIndex.from_frame(distinct)
+            codes = pd.Series(matched.to_numpy(), index=keys).reindex(pd.MultiIndex.from_frame(residuals))
+            attributes['distinct'] = len(distinct)
+            attributes['matched'] = int(matched.notna().sum())
+            increment('localidades.fuzzy_matches', attributes['matched'])
+            return codes.to_numpy()
+
+    def codes_for_siglas(self, siglas):
+        """Mapeia siglas de UF para códigos (Int32, nulo para siglas desconhecidas)"""
+        siglas = pd.Series(siglas, copy=False)
+        return siglas.astype(str).str.strip().str.upper().map(self._by_sigla).astype('Int32')
+
+    def attributes(self, codes, columns=('sigla', 'nome', 'regiao'), level='UF'):
+        """Atributos da dimensão para uma Series de códigos (junção por código)"""
+        codes = pd.Series(codes, copy=False)
+        table = self._table(level).set_index('id')[list(columns)]
+        result = table.reindex(codes.astype('int64').to_numpy())
+        result.index = codes.index
+        return result
+
+    @classmethod
+    def reference(cls):
+        """Dimensão embutida: apenas as 27 UFs"""
+        return cls(pd.DataFrame(UFS_REFERENCIA, columns=UF_COLUMNS))
+
+    @classmethod
+    def from_api(cls, estados, municipios=None):
+        """Monta a dimensão a partir de /localidades/estados e /localidades/municipios"""
+        ufs = pd.DataFrame([
+            (estado['id'], estado['sigla'], estado['nome'], estado['regiao']['nome']) for estado in estados
+        ], columns=UF_COLUMNS)
+        municipios_df = None
+        if municipios:
+            rows = []
+            for municipio in municipios:
+                micro = municipio.get('microrregiao') or {}
+                uf = (micro.get('mesorregiao') or {}).get('UF')
+                if uf is None:
+                    uf = municipio['regiao-imediata']['regiao-intermediaria']['UF']
+                rows.append((municipio['id'], municipio['nome'], uf['id'], uf['sigla']))
+            municipios_df = pd.DataFrame(rows, columns=MUNICIPIO_COLUMNS)
+        return cls(ufs, municipios_df)
+
+    def save(self, base_dir=LOCALIDADES_PATH):
+        """Grava a versão (se ainda não existir) e aponta `latest.json` para ela"""
+        os.makedirs(base_dir, exist_ok=True)
+        filename = f"localidades_{self.version}.json"
+        path = os.path.join(base_dir, filename)
+        if not os.path.exists(path):
+            payload = {
+                'version': self.version,
+                'ufs': self.ufs[UF_COLUMNS].to_dict('split')['data'],
+                'municipios': self.municipios[MUNICIPIO_COLUMNS].to_dict('split')['data']
+            }
+            _write_json_atomic(path, payload)
+        _write_json_atomic(os.path.join(base_dir, LATEST_POINTER), {'file': filename, 'version': self.version})
+        return path
+
+    @classmethod
+    def load_latest(cls, base_dir=LOCALIDADES_PATH):
+        """Carrega a versão apontada por `latest.json` (ou None)"""
+        try:
+            with open(os.path.join(base_dir, LATEST_POINTER), 'r', encoding=ENCODING) as f:
+                pointer = json.load(f)
+            with open(os.path.join(base_dir, pointer['file']), 'r', encoding=ENCODING) as f:
+                payload = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(
+            pd.DataFrame(payload['ufs'], columns=UF_COLUMNS),
+            pd.DataFrame(payload['municipios'], columns=MUNICIPIO_COLUMNS)
+        )
+
+
+def _write_json_atomic(path, payload):
+    """Grava JSON em arquivo temporário e renomeia"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding=ENCODING) as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+# Instância do processo (carregada no primeiro uso)
+_localidades = None
+_localidades_lock = threading.Lock()
+
+
+def get_localidades():
+    """Retorna a dimensão de localidades do processo (versão salva ou referência embutida)"""
+    global _localidades
+    if _localidades is None:
+        with _localidades_lock:
+            if _localidades is None:
+                with span('localidades.load'):
+                    _localidades = LocalidadesDimension.load_latest() or LocalidadesDimension.reference()
+    return _localidades
+
+
+def refresh_localidades(municipios=True, base_dir=LOCALIDADES_PATH):
+    """
+    Atualiza a dimensão a partir da API de localidades, salva a nova versão e a publica no processo
+
+    Returns:
+        LocalidadesDimension: dimensão nova, ou a atual se a API não respondeu
+    """
+    global _localidades
+    from src.data.collect_ibge_data import make_request_with_retry
+
+    with span('localidades.refresh', municipios=municipios):
+        try:
+            estados = make_request_with_retry(f"{IBGE_API_BASE_URL}/v1/localidades/estados")
+            lista_municipios = (
+                make_request_with_retry(f"{IBGE_API_BASE_URL}/v1/localidades/municipios") if municipios else None
+            )
+        except Exception as e:
+            echo(f"⚠️ API de localidades indisponível ({e}); mantendo a dimensão atual")
+            return get_localidades()
+        if not estados:
+            return get_localidades()
+
+        dimension = LocalidadesDimension.from_api(estados, lista_municipios)
+        dimension.save(base_dir)
+        with _localidades_lock:
+            _localidades = dimension
+        return dimension
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza a dimensão de localidades do IBGE")
+    parser.add_argument('--sem-municipios', action='store_true', help="apenas UFs")
+    args = parser.parse_args()
+
+    dimension = refresh_localidades(municipios=not args.sem_municipios)
+    print(f"🗺️ {dimension}")
@@ -0,0 +1,155 @@
+"""
+Normalização de nomes de localidades e casamento aproximado por n-gramas
+
+A normalização (NFKD sem acentos, casefold, pontuação e espaços colapsados)
+é vetorizada e memoizada: cada nome distinto é normalizado uma única vez por
+processo, e as Series são convertidas por um mapeamento de valores únicos.
+
+Nomes que não casam exatamente depois de normalizados vão para o
+`NGramIndex`: trigramas de caracteres em uma matriz esparsa e similaridade
+de Dice calculada por produto de matrizes, em lotes e, quando há UF, apenas
+entre candidatos da mesma UF (nomes de municípios se repetem entre estados).
+"""
+
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+NGRAM_SIZE = 3
+MIN_FUZZY_SCORE = 0.7
+MAX_MEMO_ENTRIES = 1_000_000
+QUERY_CHUNK = 2048
+
+# Tabela memoizada nome original -> nome normalizado (compartilhada pelo processo)
+_normalized_memo = {}
+_memo_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """Forma normalizada de um nome (sem acentos, casefold, espaços simples)"""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(''.join(char if char.isalnum() else ' ' for char in text.casefold()).split())
+
+
+def _normalize_vectorized(names):
+    return (
+        names.astype(str)
+        .str.normalize('NFKD')
+        .str.encode('ascii', 'ignore')
+        .str.decode('ascii')
+        .str.casefold()
+        .str.replace(r'[^a-z0-9]+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def normalize_names(names):
+    """
+    Versão vetorizada de `normalize_name` para uma Series de nomes
+
+    Só os valores distintos ainda não vistos passam pela normalização; os
+    demais vêm da tabela memoizada.
+    """
+    names = pd.Series(names, copy=False)
+    codes, uniques = pd.factorize(names)
+    uniques = pd.Series(uniques, dtype=object)
+
+    memo = _normalized_memo
+    known = uniques.map(memo).astype(object)
+    missing = known.isna()
+    if missing.any():
+        fresh = _normalize_vectorized(uniques[missing])
+        known[missing] = fresh.to_numpy(dtype=object)
+        with _memo_lock:
+            if len(memo) + len(fresh) > MAX_MEMO_ENTRIES:
+                memo.clear()
+            memo.update(zip(uniques[missing].tolist(), fresh.tolist()))
+
+    values = known.to_numpy(dtype=object)
+    normalized = np.where(codes >= 0, values[np.maximum(codes, 0)] if len(values) else '', '')
+    return pd.Series(normalized, index=names.index, dtype=str)
+
+
+def _ngrams(text, n=NGRAM_SIZE):
+    padded = f"  {text} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class NGramIndex:
+    """Índice de trigramas para busca aproximada de nomes já normalizados"""
+
+    def __init__(self, names, values=None, n=NGRAM_SIZE):
+        """
+        Args:
+            names (list): nomes normalizados dos candidatos
+            values (list): valor devolvido para cada candidato (padrão: posição)
+            n (int): tamanho dos n-gramas
+        """
+        self.n = n
+        self.names = list(names)
+        self.values = np.asarray(values if values is not None else np.arange(len(self.names)))
+        self.vocabulary = {}
+        self.matrix, self.sizes = self._vectorize(self.names, grow=True)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _vectorize(self, names, grow=False):
+        """
+        Matriz binária esparsa nomes × n-gramas e o número de n-gramas distintos de cada nome
+
+        Nas consultas (`grow=False`) n-gramas fora do vocabulário não entram
+        na matriz, mas contam no tamanho do nome.
+        """
+        grams = [set(_ngrams(name, self.n)) for name in names]
+        sizes = np.fromiter(map(len, grams), dtype='float64', count=len(grams))
+        rows = np.repeat(np.arange(len(grams)), sizes.astype('int64'))
+        vocabulary = self.vocabulary
+        if grow:
+            columns = np.array([vocabulary.setdefault(gram, len(vocabulary)) for row in grams for gram in row], dtype='int64')
+        else:
+            columns = np.array([vocabulary.get(gram, -1) for row in grams for gram in row], dtype='int64')
+            rows, columns = rows[columns >= 0], columns[columns >= 0]
+        data = np.ones(len(rows), dtype='float32')
+        matrix = sparse.csr_matrix((data, (rows, columns)), shape=(len(names), max(len(vocabulary), 1)))
+        return matrix, sizes
+
+    def match(self, queries, min_score=MIN_FUZZY_SCORE):
+        """
+        Melhor candidato para cada consulta (similaridade de Dice entre os conjuntos de n-gramas)
+
+        Args:
+            queries (list): nomes normalizados a procurar
+            min_score (float): similaridade mínima para aceitar o candidato
+
+        Returns:
+            tuple: (valores casados, com None abaixo de `min_score`; similaridades)
+        """
+        queries = list(queries)
+        matched = np.full(len(queries), None, dtype=object)
+        scores = np.zeros(len(queries))
+        if not queries or not self.names:
+            return matched, scores
+
+        candidates_t = self.matrix.T.tocsc()
+        for start in range(0, len(queries), QUERY_CHUNK):
+            vectors, query_sizes = self._vectorize(queries[start:start + QUERY_CHUNK])
+            shared = (vectors @ candidates_t).tocsr()
+            counts = np.diff(shared.indptr)
+            if not counts.any():
+                continue
+
+            # Dice de todos os pares com n-gramas em comum; o melhor de cada consulta via lexsort
+            rows = np.repeat(np.arange(len(counts)), counts)
+            dice = 2 * shared.data / (query_sizes[rows] + self.sizes[shared.indices])
+            order = np.lexsort((-dice, rows))
+            best = order[(np.cumsum(counts) - counts)[counts > 0]]
+
+            positions = start + rows[best]
+            scores[positions] = dice[best]
+            accepted = dice[best] >= min_score
+            matched[positions[accepted]] = self.values[shared.indices[best][accepted]]
+        return matched, scores
@@ -0,0 +1,59 @@
+"""
+Montagem do painel histórico (estado × ano) usado pelo dashboard
+"""
+
+import pandas as pd
+
+from src.data.localidades import get_localidades
+
+
+def build_historical_panel(df_base, yearly_records, static_population=None):
+    """
+    Monta o painel combinando os dados básicos dos estados com a população de cada ano
+
+    Args:
+        df_base (pd.DataFrame): uma linha por estado (id, sigla, nome, regiao)
+        yearly_records (dict): ano -> lista de registros da API ({'id', 'nome', 'populacao', 'fonte'})
+            ou None quando o ano não pôde ser obtido; registros sem 'id' são
+            associados pelo nome normalizado (dimensão de localidades)
+        static_population (callable): (nome, ano) -> população, usado nos anos sem registros
+
+    Returns:
+        pd.DataFrame: painel com uma linha por estado e ano
+    """
+    localidades = get_localidades()
+    # Junção por código IBGE: uma linha de df_base por estado
+    base = df_base.drop_duplicates('nome').copy()
+    base_codes = localidades.codes_for_names(base['nome'])
+    base['id'] = base['id'].fillna(base_codes) if 'id' in base.columns else base_codes
+    base = base.drop_duplicates('id')
+    base = base.set_index(base['id'].astype('int64'), drop=False)
+    codes_by_name = dict(zip(base['nome'], base.index))
+
+    historical_df = []
+
+    for ano, api_data in yearly_records.items():
+        if api_data:
+            # Usar dados da API
+            records = pd.DataFrame.from_records(api_data)
+            # Código do registro → nome idêntico ao de df_base → nome normalizado
+            codes = records['nome'].map(codes_by_name).astype('Int64')
+            if 'id' in records.columns:
+                codes = pd.to_numeric(records['id'], errors='coerce').astype('Int64').fillna(codes)
+            codes = codes.fillna(localidades.codes_for_names(records['nome']).astype('Int64'))
+            estado_data = base.loc[codes.astype('int64').to_numpy()]
+            estado_data['ano'] = ano
+            estado_data['populacao'] = records['populacao'].to_numpy()
+            estado_data['fonte'] = records['fonte'].to_numpy()
+            historical_df.append(estado_data)
+        elif static_population is not None:
+            # Usar dados estáticos
+            estado_data = base.copy()
+            estado_data['ano'] = ano
+            estado_data['populacao'] = [static_population(estado, ano) for estado in base['nome']]
+            estado_data['fonte'] = 'Dados Estáticos'
+            historical_df.append(estado_data)
+
+    if not historical_df:
+        return pd.DataFrame()
+    return pd.concat(historical_df).reset_index(drop=True)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Orquestrador do pipeline de dados (coleta → limpeza → validação → publicação)
+
+Cada etapa declara suas entradas e saídas (arquivos). A partir delas o
+pipeline monta o DAG de dependências, executa em paralelo as etapas
+independentes (ex.: coleta por ano) e pula as etapas cujas entradas não
+mudaram desde a última execução (comparação por hash de conteúdo).
+O tempo de cada etapa fica registrado no arquivo de estado.
+
+Uso:
+    python src/data/pipeline.py [--force] [--workers 4] [--only clean]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from functools import partial
+
+import pandas as pd
+
+# Permite importar os módulos do projeto ao executar este arquivo diretamente
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.data_config import (
+    IBGE_STATES_URL, PIPELINE_PATH, PIPELINE_STATE_FILE, PIPELINE_MAX_WORKERS,
+    PIPELINE_COLLECT_MAX_AGE, ENCODING
+)
+from src.data.schema import read_population_csv
+from src.monitoring.instrumentation import echo, span, profile, write_metrics
+
+PIPELINE_YEARS = list(range(2020, 2026))
+CLEAN_KEYS = ['id', 'ano']
+
+
+def file_hash(path):
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class Stage:
+    """Etapa do pipeline com entradas e saídas declaradas"""
+
+    def __init__(self, name, func, inputs=(), outputs=(), version='1', max_age=None):
+        """
+        Args:
+            name (str): nome único da etapa
+            func (callable): função chamada como func(inputs, outputs)
+            inputs (list): arquivos lidos pela etapa
+            outputs (list): arquivos gravados pela etapa
+            version (str): versão da lógica (alterar força reexecução)
+            max_age (int): idade máxima das saídas em segundos (etapas sem entradas, ex.: coleta)
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.version = version
+        self.max_age = max_age
+
+    def fingerprint(self):
+        """Hash da versão da etapa + conteúdo das entradas"""
+        hasher = hashlib.sha256(f"{self.name}:{self.version}".encode('utf-8'))
+        for path in self.inputs:
+            hasher.update(path.encode('utf-8'))
+            hasher.update(file_hash(path).encode('utf-8'))
+        return hasher.hexdigest()
+
+
+class Pipeline:
+    """DAG de etapas com execução paralela e reaproveitamento de resultados"""
+
+    def __init__(self, stages, state_file=PIPELINE_STATE_FILE, max_workers=PIPELINE_MAX_WORKERS):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.dependencies = self._resolve_dependencies()
+
+    def _resolve_dependencies(self):
+        """Liga cada entrada à etapa que a produz"""
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Saída {output} produzida por mais de uma etapa")
+                producers[output] = stage.name
+
+        dependencies = {
+            name: {producers[path] for path in stage.inputs if path in producers}
+            for name, stage in self.stages.items()
+        }
+        self._check_cycles(dependencies)
+        return dependencies
+
+    @staticmethod
+    def _check_cycles(dependencies):
+        """Garante que o grafo de dependências é acíclico"""
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo de dependências envolvendo a etapa '{name}'")
+            visiting.add(name)
+            for dependency in dependencies[name]:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in dependencies:
+            visit(name)
+
+    def load_state(self):
+        """Carrega o estado da última execução"""
+        try:
+            with open(self.state_file, 'r', encoding=ENCODING) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        """Grava o estado de forma atômica"""
+        os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding=ENCODING) as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_file)
+
+    def is_up_to_date(self, stage, previous, fingerprint):
+        """Verifica se a etapa pode ser pulada"""
+        if not previous or previous.get('status') not in ('ran', 'skipped'):
+            return False
+        if previous.get('fingerprint') != fingerprint:
+            return False
+        for path in stage.outputs:
+            if not os.path.exists(path):
+                return False
+            if previous.get('outputs', {}).get(path) != file_hash(path):
+                return False
+            if stage.max_age is not None and time.time() - os.path.getmtime(path) > stage.max_age:
+                return False
+        return True
+
+    def _run_stage(self, stage, previous, force):
+        """Executa (ou pula) uma etapa e retorna seu registro de estado"""
+        start = time.perf_counter()
+        fingerprint = stage.fingerprint()
+
+        if not force and self.is_up_to_date(stage, previous, fingerprint):
+            record = dict(previous, status='skipped')
+        else:
+            for path in stage.outputs:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with span('pipeline.stage', stage=stage.name):
+                stage.func(stage.inputs, stage.outputs)
+            record = {
+                'status': 'ran',
+                'fingerprint': fingerprint,
+                'outputs': {path: file_hash(path) for path in stage.outputs}
+            }
+
+        record['duration_s'] = round(time.perf_counter() - start, 4)
+        record['finished_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return record
+
+    def run(self, force=False, only=None):
+        """
+        Executa o pipeline
+
+        Args:
+            force (bool): reexecuta todas as etapas mesmo se atualizadas
+            only (list): executa apenas estas etapas (e suas dependências)
+
+        Returns:
+            dict: registro por etapa (status, duração, hashes)
+        """
+        selected = self._select(only)
+        state = self.load_state()
+        records = {}
+        pending = set(selected)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Etapas com dependências falhas não são executadas
+                for name in sorted(pending):
+                    failed = [dep for dep in self.dependencies[name]
+                              if records.get(dep, {}).get('status') in ('failed', 'blocked')]
+                    if failed:
+                        records[name] = {'status': 'blocked', 'blocked_by': failed}
+                        pending.discard(name)
+
+                ready = [name for name in pending
+                         if all(dep in records or dep not in selected for dep in self.dependencies[name])]
+                for name in sorted(ready):
+                    pending.discard(name)
+                    future = executor.submit(self._run_stage, self.stages[name], state.get(name), force)
+                    running[future] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        records[name] = future.result()
+                    except Exception as e:
+                        echo(f"❌ Etapa '{name}' falhou: {e}")
+                        records[name] = {'status': 'failed', 'error': str(e)}
+
+        state.update({name: record for name, record in records.items() if record['status'] != 'blocked'})
+        self.save_state(state)
+        return records
+
+    def _select(self, only):
+        """Etapas pedidas mais todas as suas dependências"""
+        if not only:
+            return set(self.stages)
+
+        selected = set()
+        stack = list(only)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise KeyError(f"Etapa desconhecida: {name}")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.dependencies[name])
+        return selected
+
+
+# --- Etapas padrão ---------------------------------------------------------
+
+def _write_json(path, data):
+    with open(path, 'w', encoding=ENCODING) as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def collect_states_stage(inputs, outputs):
+    """Coleta a lista de estados (API de Localidades)"""
+    from src.data.collect_ibge_data import make_request_with_retry, process_states_data
+
+    try:
+        states = process_states_data(make_request_with_retry(IBGE_STATES_URL))
+    except Exception as e:
+        if os.path.exists(outputs[0]):
+            echo(f"⚠️ API de estados indisponível ({e}); mantendo a última coleta")
+            return
+        raise
+
+    # Sem data de coleta no arquivo: o hash só muda quando o conteúdo muda
+    for state in states:
+        state.pop('data_coleta', None)
+    _write_json(outputs[0], states)
+
+
+def collect_population_stage(year, inputs, outputs):
+    """Coleta a população de um ano (cache → API → dados estáticos)"""
+    from src.data.api_client import DataManager
+
+    records = DataManager().get_population_data(year) or []
+    records = [
+        {key: value for key, value in record.items() if key != 'data_coleta'}
+        for record in records
+    ]
+    _write_json(outputs[0], sorted(records, key=lambda record: record['nome']))
+
+
+def clean_stage(inputs, outputs):
+    """
+    Junta estados e população de todos os anos e aplica a limpeza
+
+    Só as chaves (id × ano) alteradas desde a última execução são limpas de
+    novo; as demais linhas vêm da saída anterior, se ela ainda for a que foi
+    gerada a partir do snapshot registrado.
+    """
+    from src.data.change_capture import ChangeTracker
+
+    states_path, population_paths = inputs[0], inputs[1:]
+    with open(states_path, 'r', encoding=ENCODING) as f:
+        states = pd.DataFrame(json.load(f))
+
+    frames = []
+    for path in population_paths:
+        with open(path, 'r', encoding=ENCODING) as f:
+            frames.append(pd.DataFrame(json.load(f)))
+    population = pd.concat(frames, ignore_index=True)[['nome', 'ano', 'populacao', 'fonte']]
+
+    panel = states.merge(population, on='nome', how='inner')
+    tracker = ChangeTracker('painel_pipeline', keys=CLEAN_KEYS)
+    delta = tracker.diff(panel)
+
+    previous_output = tracker.load_state()['metadata'].get('saida')
+    incremental = (delta.base_version > 0 and os.path.exists(outputs[0])
+                   and previous_output == file_hash(outputs[0]))
+    if incremental and delta.is_empty:
+        echo("⏭️ Nenhuma alteração no painel desde a última limpeza")
+    elif incremental:
+        previous = read_population_csv(outputs[0])
+        changed = previous.set_index(CLEAN_KEYS).index.isin(delta.changed_keys.set_index(CLEAN_KEYS).index)
+        frames = [previous[~changed]] + ([_clean_panel(delta.upserts)] if not delta.upserts.empty else [])
+        df_clean = pd.concat(frames, ignore_index=True)
+        _write_clean_output(df_clean, outputs[0])
+        echo(f"🔁 Limpeza incremental: {len(delta.upserts)} linha(s) reprocessada(s), "
+             f"{len(delta.deletes)} chave(s) removida(s)")
+    else:
+        _write_clean_output(_clean_panel(panel), outputs[0])
+
+    tracker.commit(delta, metadata={'saida': file_hash(outputs[0])})
+
+
+def _clean_panel(panel):
+    from src.data.data_cleaning import clean_population_data
+
+    return clean_population_data(panel).drop(columns=['data_limpeza'])
+
+
+def _write_clean_output(df_clean, path):
+    """Grava a saída da limpeza ordenada pelas chaves (mesmo arquivo com ou sem reprocessamento parcial)"""
+    df_clean = df_clean.sort_values(CLEAN_KEYS, kind='stable', ignore_index=True)
+    df_clean.to_csv(path, index=False, encoding=ENCODING)
+
+
+def validate_stage(inputs, outputs):
+    """Valida a qualidade dos dados limpos, ano a ano"""
+    from src.data.data_cleaning import validate_data_quality
+
+    df = read_population_csv(inputs[0])
+    report = {}
+    for year, df_year in df.groupby('ano'):
+        validate_data_quality(df_year)
+        total = int(df_year['populacao'].sum())
+        report[str(year)] = {
+            'estados': len(df_year),
+            'populacao_total': total,
+            'estados_completos': len(df_year) >= 27,
+            'total_plausivel': 200_000_000 <= total <= 230_000_000
+        }
+
+    if not all(year['estados_completos'] and year['total_plausivel'] for year in report.values()):
+        raise ValueError(f"Validação falhou: {report}")
+    _write_json(outputs[0], report)
+
+
+def publish_insights_stage(inputs, outputs):
+    """Publica os insights pré-calculados para o dashboard"""
+    from src.analytics.insights import update_insights
+
+    update_insights(read_population_csv(inputs[0]), insights_dir=os.path.dirname(outputs[0]))
+
+
+def build_default_pipeline(base_dir=PIPELINE_PATH, years=PIPELINE_YEARS):
+    """Monta o pipeline padrão: coleta por ano em paralelo → limpeza → validação → publicação"""
+    from config.data_config import INSIGHTS_PATH
+
+    states_path = os.path.join(base_dir, 'estados.json')
+    population_paths = [os.path.join(base_dir, f"populacao_{year}.json") for year in years]
+    clean_path = os.path.join(base_dir, 'populacao_limpa.csv')
+    validation_path = os.path.join(base_dir, 'validacao.json')
+
+    stages = [Stage('collect_states', collect_states_stage, outputs=[states_path],
+                    max_age=PIPELINE_COLLECT_MAX_AGE)]
+    for year, path in zip(years, population_paths):
+        stages.append(Stage(f"collect_population_{year}", partial(collect_population_stage, year),
+                            outputs=[path], max_age=PIPELINE_COLLECT_MAX_AGE))
+
+    stages += [
+        Stage('clean', clean_stage, inputs=[states_path] + population_paths, outputs=[clean_path]),
+        Stage('validate', validate_stage, inputs=[clean_path], outputs=[validation_path]),
+        Stage('publish_insights', publish_insights_stage, inputs=[clean_path, validation_path],
+              outputs=[os.path.join(INSIGHTS_PATH, 'latest.json')])
+    ]
+    return Pipeline(stages)
+
+
+def print_report(records):
+    """Imprime o resumo da execução"""
+    icons = {'ran': '✅', 'skipped': '⏭️', 'failed': '❌', 'blocked': '⛔'}
+    print("\n📋 Resumo do pipeline:")
+    for name, record in sorted(records.items()):
+        duration = record.get('duration_s')
+        timing = f"{duration:8.3f}s" if duration is not None else " " * 9
+        print(f"  {icons.get(record['status'], '•')} {name:<28} {record['status']:<8} {timing}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline de dados populacionais do IBGE")
+    parser.add_argument('--force', action='store_true', help="reexecuta todas as etapas")
+    parser.add_argument('--workers', type=int, default=PIPELINE_MAX_WORKERS)
+    parser.add_argument('--only', nargs='*', help="etapas a executar (com dependências)")
+    parser.add_argument('--profile', help="grava o perfil cProfile da execução neste arquivo (.prof)")
+    args = parser.parse_args()
+
+    pipeline = build_default_pipeline()
+    pipeline.max_workers = args.workers
+    if args.profile:
+        with profile(args.profile):
+            results = pipeline.run(force=args.force, only=args.only)
+        print(f"🔬 Perfil gravado em: {args.profile}")
+    else:
+        results = pipeline.run(force=args.force, only=args.only)
+    print_report(results)
+    print(f"📈 Métricas da execução: {write_metrics()}")
+
+    if any(record['status'] in ('failed', 'blocked') for record in results.values()):
+        sys.exit(1)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Arquivo de dados brutos endereçado por conteúdo
+
+Cada resposta da API é serializada em JSON canônico (chaves ordenadas, sem
+espaços), identificada pelo SHA-256 desse conteúdo e gravada comprimida uma
+única vez; coletas repetidas do mesmo payload só acrescentam uma linha ao
+índice:
+
+    data/raw/archive/
+        index.jsonl                      (endpoint, parâmetros, url, hora da coleta, hash)
+        blobs/<2 primeiros>/<sha256>.json.zst   (ou .json.gz sem o pacote zstandard)
+
+    archive = get_raw_archive()
+    entry = archive.put(data, endpoint='agregados_4714', url=url)
+    data = archive.get(entry['hash'])
+
+Uso (importa os JSON antigos de data/raw e mostra o resumo):
+    python src/data/raw_archive.py [--import-legacy] [--stats]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+
+# Permite importar os módulos do projeto ao executar este arquivo diretamente
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.data_config import RAW_DATA_PATH, RAW_ARCHIVE_PATH, RAW_ARCHIVE_CODEC, ENCODING, TIMESTAMP_FORMAT, DATE_FORMAT
+from src.monitoring.instrumentation import increment, span
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:  # pacote opcional: sem ele os blobs são gravados com gzip
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+INDEX_FILENAME = 'index.jsonl'
+CODEC_EXTENSIONS = {'zstd': '.json.zst', 'gzip': '.json.gz'}
+LEGACY_PATTERN = re.compile(r'ibge_population_(?P<source>.+)_(?P<stamp>\d{8}_\d{6})\.json$')
+
+
+def canonical_bytes(payload):
+    """Serialização estável do payload (mesmo conteúdo → mesmos bytes → mesmo hash)"""
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Blob gravado com zstd, mas o pacote zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class RawArchive:
+    """Blobs comprimidos por hash de conteúdo + índice das coletas"""
+
+    def __init__(self, base_dir=RAW_ARCHIVE_PATH, codec=RAW_ARCHIVE_CODEC):
+        """
+        Args:
+            base_dir (str): diretório do arquivo
+            codec (str): 'zstd', 'gzip' ou 'auto' (zstd se o pacote estiver instalado)
+        """
+        if codec == 'auto':
+            codec = 'zstd' if ZSTD_AVAILABLE else 'gzip'
+        if codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Compressão não suportada: {codec}. Use uma de {list(CODEC_EXTENSIONS)}")
+        if codec == 'zstd' and not ZSTD_AVAILABLE:
+            raise RuntimeError("Compressão zstd pedida, mas o pacote zstandard não está instalado")
+        self.codec = codec
+        self.root = base_dir
+        self.index_path = os.path.join(base_dir, INDEX_FILENAME)
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest, codec):
+        return os.path.join(self.root, 'blobs', digest[:2], f"{digest}{CODEC_EXTENSIONS[codec]}")
+
+    def _find_blob(self, digest):
+        """Caminho e compressão do blob já gravado (qualquer codec) ou (None, None)"""
+        for codec in CODEC_EXTENSIONS:
+            path = self._blob_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def has(self, digest):
+        return self._find_blob(digest)[0] is not None
+
+    def put(self, payload, endpoint, params=None, url=None, fetched_at=None):
+        """
+        Arquiva um payload (o blob só é gravado se o conteúdo for novo)
+
+        Args:
+            payload: resposta da API (objeto JSON)
+            endpoint (str): nome lógico do endpoint
+            params (dict): parâmetros da requisição
+            url (str): URL consultada
+            fetched_at (datetime): momento da coleta (padrão: agora)
+
+        Returns:
+            dict: entrada do índice
+        """
+        with span('raw_archive.put', endpoint=endpoint) as attributes:
+            raw = canonical_bytes(payload)
+            digest = hashlib.sha256(raw).hexdigest()
+            path, codec = self._find_blob(digest)
+            stored = path is None
+            if stored:
+                codec = self.codec
+                path = self._blob_path(digest, codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp{os.getpid()}_{threading.get_ident()}"
+                with open(tmp_path, 'wb') as f:
+                    f.write(_compress(raw, codec))
+                os.replace(tmp_path, path)
+
+            entry = {
+                'endpoint': endpoint,
+                'params': params or {},
+                'url': url,
+                'fetched_at': (fetched_at or datetime.now()).strftime(TIMESTAMP_FORMAT),
+                'hash': digest,
+                'codec': codec,
+                'bytes': len(raw),
+                'stored_bytes': os.path.getsize(path)
+            }
+            self._append_index(entry)
+
+            attributes.update(hash=digest[:12], new_blob=stored, bytes=len(raw))
+            increment('raw_archive.blobs_written' if stored else 'raw_archive.deduplicated')
+            return entry
+
+    def _append_index(self, entry):
+        """Acrescenta uma linha ao índice (uma única escrita em modo append)"""
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.index_path, 'a', encoding=ENCODING) as f:
+                f.write(line)
+
+    def get(self, digest):
+        """Payload de um hash (KeyError se não estiver no arquivo)"""
+        path, codec = self._find_blob(digest)
+        if path is None:
+            raise KeyError(digest)
+        with open(path, 'rb') as f:
+            return json.loads(_decompress(f.read(), codec))
+
+    def entries(self, endpoint=None, since=None):
+        """
+        Entradas do índice em ordem de coleta
+
+        Args:
+            endpoint (str): apenas este endpoint
+            since (str): apenas coletas a partir deste momento ('%Y-%m-%d %H:%M:%S')
+        """
+        try:
+            with open(self.index_path, 'r', encoding=ENCODING) as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+
+        entries = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # linha incompleta (escrita interrompida)
+            if endpoint is not None and entry['endpoint'] != endpoint:
+                continue
+            if since is not None and entry['fetched_at'] < since:
+                continue
+            entries.append(entry)
+        return sorted(entries, key=lambda entry: entry['fetched_at'])
+
+    def latest(self, endpoint, params=None):
+        """Entrada mais recente de um endpoint (com os mesmos parâmetros, se informados)"""
+        matching = [
+            entry for entry in self.entries(endpoint)
+            if params is None or entry['params'] == params
+        ]
+        return matching[-1] if matching else None
+
+    def import_legacy(self, raw_dir=RAW_DATA_PATH):
+        """
+        Importa os dumps antigos (ibge_population_<fonte>_<timestamp>.json)
+
+        A hora da coleta vem do nome do arquivo e o endpoint fica com o nome
+        de fonte usado no arquivo ('endpoin_2'...), que não identifica com
+        segurança o conteúdo. Os arquivos originais não são apagados.
+
+        Returns:
+            list: entradas criadas
+        """
+        imported = []
+        known = {(entry['endpoint'], entry['fetched_at'], entry['hash']) for entry in self.entries()}
+        for filename in sorted(os.listdir(raw_dir)) if os.path.isdir(raw_dir) else []:
+            match = LEGACY_PATTERN.match(filename)
+            if not match:
+                continue
+            with open(os.path.join(raw_dir, filename), 'r', encoding=ENCODING) as f:
+                payload = json.load(f)
+            fetched_at = datetime.strptime(match['stamp'], DATE_FORMAT)
+            digest = hashlib.sha256(canonical_bytes(payload)).hexdigest()
+            endpoint = match['source']
+            if (endpoint, fetched_at.strftime(TIMESTAMP_FORMAT), digest) in known:
+                continue
+            imported.append(self.put(payload, endpoint, params={'arquivo': filename}, fetched_at=fetched_at))
+        return imported
+
+    def stats(self):
+        """Resumo: coletas indexadas, blobs distintos e bytes brutos × armazenados"""
+        entries = self.entries()
+        blobs = {entry['hash']: entry for entry in entries}
+        return {
+            'coletas': len(entries),
+            'blobs': len(blobs),
+            'bytes_coletados': sum(entry['bytes'] for entry in entries),
+            'bytes_armazenados': sum(entry['stored_bytes'] for entry in blobs.values()),
+            'endpoints': sorted({entry['endpoint'] for entry in entries})
+        }
+
+
+# Instância compartilhada por todo o processo
+_raw_archive = None
+_raw_archive_lock = threading.Lock()
+
+
+def get_raw_archive():
+    """Retorna o arquivo de dados brutos do processo"""
+    global _raw_archive
+    with _raw_archive_lock:
+        if _raw_archive is None:
+            _raw_archive = RawArchive()
+        return _raw_archive
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivo de dados brutos do IBGE")
+    parser.add_argument('--import-legacy', action='store_true', help=f"importa os JSON antigos de {RAW_DATA_PATH}")
+    parser.add_argument('--stats', action='store_true', help="mostra o resumo do arquivo")
+    args = parser.parse_args()
+
+    archive = get_raw_archive()
+    if args.import_legacy:
+        imported = archive.import_legacy()
+        print(f"📥 {len(imported)} arquivo(s) importado(s) de {RAW_DATA_PATH}")
+    if args.stats or not args.import_legacy:
+        stats = archive.stats()
+        print(f"🗄️ {archive.root}: {stats['coletas']} coleta(s), {stats['blobs']} blob(s) distinto(s)")
+        if stats['bytes_coletados']:
+            print(f"   {stats['bytes_coletados']:,} bytes coletados → {stats['bytes_armazenados']:,} bytes armazenados "
+                  f"({stats['bytes_armazenados'] / stats['bytes_coletados']:.1%})")
+        print(f"   endpoints: {', '.join(stats['endpoints']) or '-'}")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Reprocessamento offline a partir do arquivo de dados brutos
+
+Passa as respostas já arquivadas (`RawArchive`) pelos mesmos parsers da
+coleta (`process_states_data`, `process_aggregated_data`...) sem acessar a
+API: útil depois de corrigir um parser e como entrada determinística para
+benchmarks. Cada blob distinto é lido e processado uma única vez, em
+processos paralelos (um blob por tarefa); coletas com o mesmo conteúdo
+reaproveitam o resultado. A data de coleta dos registros é a da coleta
+original, não a do reprocessamento.
+
+Uso:
+    python src/data/replay.py [--endpoint localidades_estados] [--since "2025-08-01 00:00:00"]
+                              [--workers 4] [--save]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Permite importar os módulos do projeto ao executar este arquivo diretamente
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.data_config import REPLAY_MAX_WORKERS
+from src.data.collect_ibge_data import (
+    COLLECTION_ENDPOINTS, process_states_data, process_aggregated_data, process_projections_data,
+    process_and_save_final_data
+)
+from src.data.raw_archive import RawArchive, get_raw_archive
+from src.monitoring.instrumentation import echo, span, worker_task, write_metrics
+
+# Parser de cada tipo de payload
+PAYLOAD_PROCESSORS = {
+    'estados': process_states_data,
+    'agregados': process_aggregated_data,
+    'projecoes': process_projections_data
+}
+
+# Tipo do payload de cada endpoint da coleta
+ENDPOINT_KINDS = {
+    'localidades_estados': 'estados',
+    'agregados_4714': 'agregados',
+    'projecoes_populacao': 'projecoes',
+    'agregados_6579': 'agregados'
+}
+
+
+def payload_kind(endpoint, payload):
+    """
+    Tipo do payload pelo endpoint ou, para endpoints desconhecidos (dumps
+    antigos importados), pela estrutura da resposta
+    """
+    if endpoint in ENDPOINT_KINDS:
+        return ENDPOINT_KINDS[endpoint]
+    if isinstance(payload, dict) and 'projecao' in payload:
+        return 'projecoes'
+    if isinstance(payload, list) and payload and isinstance(payload[0], dict):
+        if 'resultados' in payload[0]:
+            return 'agregados'
+        if 'sigla' in payload[0]:
+            return 'estados'
+    return None
+
+
+@worker_task
+def _replay_blob(archive_root, digest, endpoint):
+    """Lê e processa um blob (executado nos processos do pool)"""
+    payload = RawArchive(base_dir=archive_root).get(digest)
+    kind = payload_kind(endpoint, payload)
+    if kind is None:
+        return None, []
+    return kind, PAYLOAD_PROCESSORS[kind](payload) or []
+
+
+def replay(entries=None, endpoint=None, since=None, max_workers=REPLAY_MAX_WORKERS, archive=None):
+    """
+    Reprocessa coletas arquivadas
+
+    Args:
+        entries (list): entradas do índice (padrão: todas que passam nos filtros)
+        endpoint (str): apenas este endpoint
+        since (str): apenas coletas a partir deste momento
+        max_workers (int): processos em paralelo, limitado ao número de CPUs (1 = no processo atual)
+        archive (RawArchive): arquivo de origem
+
+    Returns:
+        list: por coleta, {'entry', 'kind', 'records', 'error'} em ordem de coleta
+    """
+    archive = archive or get_raw_archive()
+    entries = entries if entries is not None else archive.entries(endpoint, since)
+
+    # Um processamento por blob distinto (o tipo pode depender do endpoint)
+    tasks = list(dict.fromkeys((entry['hash'], entry['endpoint']) for entry in entries))
+    workers = min(max_workers, len(tasks), os.cpu_count() or 1)
+    outcomes = {}
+    with span('replay.run', entries=len(entries), blobs=len(tasks), workers=workers):
+        if workers <= 1:
+            for task in tasks:
+                outcomes[task] = _run_task(lambda: _replay_blob(archive.root, *task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {task: executor.submit(_replay_blob, archive.root, *task) for task in tasks}
+                for task, future in futures.items():
+                    outcomes[task] = _run_task(future.result)
+
+    results = []
+    for entry in entries:
+        kind, records, error = outcomes[(entry['hash'], entry['endpoint'])]
+        results.append({
+            'entry': entry,
+            'kind': kind,
+            'records': [dict(record, data_coleta=entry['fetched_at']) for record in records],
+            'error': error
+        })
+    return results
+
+
+def _run_task(function):
+    try:
+        kind, records = function()
+        return kind, records, None
+    except Exception as e:
+        echo(f"❌ Falha no reprocessamento: {e}")
+        return None, [], str(e)
+
+
+def select_final_records(results):
+    """
+    Registros da coleta mais recente, na mesma prioridade de endpoints da coleta
+
+    Como em `collect_population_data`, vale o primeiro endpoint (em
+    COLLECTION_ENDPOINTS) com registros; endpoints fora da lista vêm depois.
+    As projeções (totais nacionais) não entram como dados por estado.
+    """
+    priority = {name: position for position, (name, _) in enumerate(COLLECTION_ENDPOINTS)}
+    latest = {}
+    for result in results:
+        if result['records'] and result['kind'] != 'projecoes':
+            latest[result['entry']['endpoint']] = result
+    if not latest:
+        return None
+    endpoint = min(latest, key=lambda name: (priority.get(name, len(priority)), name))
+    return latest[endpoint]
+
+
+def print_report(results):
+    """Resumo por coleta reprocessada"""
+    print("\n📋 Reprocessamento:")
+    for result in results:
+        entry = result['entry']
+        status = f"❌ {result['error']}" if result['error'] else f"{len(result['records'])} registro(s)"
+        print(f"  {entry['fetched_at']}  {entry['endpoint']:<22} {result['kind'] or '?':<10} "
+              f"{entry['hash'][:12]}  {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reprocessa as coletas arquivadas sem acessar a API")
+    parser.add_argument('--endpoint', help="apenas este endpoint")
+    parser.add_argument('--since', help="apenas coletas a partir deste momento ('%%Y-%%m-%%d %%H:%%M:%%S')")
+    parser.add_argument('--workers', type=int, default=REPLAY_MAX_WORKERS)
+    parser.add_argument('--save', action='store_true',
+                        help="grava o resultado da coleta mais recente como na coleta normal")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = replay(endpoint=args.endpoint, since=args.since, max_workers=args.workers)
+    print_report(results)
+    print(f"⏱️ {len(results)} coleta(s) reprocessada(s) em {time.perf_counter() - start:.2f}s")
+
+    if args.save:
+        final = select_final_records(results)
+        if final is None:
+            print("❌ Nenhuma coleta arquivada gerou registros")
+            sys.exit(1)
+        df = process_and_save_final_data(final['records'])
+        print(f"🎉 {len(df)} registros gravados a partir de {final['entry']['endpoint']} "
+              f"({final['entry']['fetched_at']})")
+    print(f"📈 Métricas da execução: {write_metrics()}")
+
+    if any(result['error'] for result in results):
+        sys.exit(1)
@@ -0,0 +1,163 @@
+"""
+Esquema tipado dos registros de população
+
+Contrato único de tipos usado por todos os leitores e escritores (cache da
+API, conjuntos particionados, dashboard):
+
+    id               int32      código IBGE da localidade
+    sigla            category   sigla da UF (categorias fixas)
+    nome             str        nome da localidade
+    regiao           category   grande região (categorias fixas)
+    populacao        int64      população
+    ano              int16      ano de referência
+    fonte            category   origem dos dados
+    data_coleta      datetime64 momento da coleta
+    data_limpeza     datetime64 momento da limpeza
+
+Com os tipos declarados, a leitura de CSV não precisa inferir tipos e cada
+linha ocupa bem menos memória que os dicionários com chaves repetidas.
+"""
+
+import pandas as pd
+
+from config.data_config import TIMESTAMP_FORMAT, ENCODING
+
+REGIOES = ['Norte', 'Nordeste', 'Sudeste', 'Sul', 'Centro-Oeste']
+SIGLAS_UF = [
+    'RO', 'AC', 'AM', 'RR', 'PA', 'AP', 'TO',
+    'MA', 'PI', 'CE', 'RN', 'PB', 'PE', 'AL', 'SE', 'BA',
+    'MG', 'ES', 'RJ', 'SP',
+    'PR', 'SC', 'RS',
+    'MS', 'MT', 'GO', 'DF'
+]
+
+POPULATION_SCHEMA = {
+    'id': 'int32',
+    'sigla': pd.CategoricalDtype(SIGLAS_UF),
+    'nome': str,
+    'regiao': pd.CategoricalDtype(REGIOES),
+    'populacao': 'int64',
+    'ano': 'int16',
+    'fonte': pd.CategoricalDtype(),
+    'data_coleta': 'datetime64[ns]',
+    'data_limpeza': 'datetime64[ns]',
+    'percentual_populacional': 'float64',
+    'versao_dados': str
+}
+
+DATETIME_COLUMNS = [column for column, dtype in POPULATION_SCHEMA.items() if dtype == 'datetime64[ns]']
+INTEGER_COLUMNS = [column for column, dtype in POPULATION_SCHEMA.items() if dtype in ('int16', 'int32', 'int64')]
+
+# Formatos antigos encontrados nos arquivos (ex.: '%H-:%M' gravado por process_states_data)
+LEGACY_TIMESTAMP_FORMATS = ['%Y-%m-%d %H-:%M:%S', 'ISO8601']
+
+
+def parse_timestamps(series):
+    """Converte textos de data/hora para datetime64, aceitando os formatos antigos"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]')
+
+    parsed = pd.to_datetime(series, format=TIMESTAMP_FORMAT, errors='coerce')
+    for legacy_format in LEGACY_TIMESTAMP_FORMATS:
+        missing = parsed.isna() & series.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(series[missing], format=legacy_format, errors='coerce')
+    return parsed.astype('datetime64[ns]')
+
+
+def _categorical_dtype(dtype, series):
+    """Categorias fixas do esquema + valores inesperados (sem perder dados)"""
+    if dtype.categories is None:
+        return 'category'
+    values = series.dropna().astype(str).unique()
+    extra = sorted(set(values) - set(dtype.categories))
+    return pd.CategoricalDtype(list(dtype.categories) + extra) if extra else dtype
+
+
+def apply_schema(df):
+    """
+    Converte as colunas conhecidas do DataFrame para os tipos do esquema
+
+    Colunas fora do esquema são mantidas como estão. Inteiros com valores
+    ausentes ficam em float64 (representação usual do pandas para nulos).
+
+    Returns:
+        pd.DataFrame: novo DataFrame com os tipos do contrato
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        dtype = POPULATION_SCHEMA.get(column)
+        if dtype is None:
+            columns[column] = series
+        elif column in DATETIME_COLUMNS:
+            columns[column] = parse_timestamps(series)
+        elif column in INTEGER_COLUMNS:
+            numeric = pd.to_numeric(series, errors='coerce')
+            columns[column] = numeric.astype(dtype) if numeric.notna().all() else numeric.astype('float64')
+        elif isinstance(dtype, pd.CategoricalDtype):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                if dtype.categories is None:
+                    columns[column] = series
+                else:
+                    # Mesmas categorias na ordem do esquema: códigos estáveis entre arquivos
+                    target = _categorical_dtype(dtype, series.cat.categories.to_series())
+                    columns[column] = series.cat.set_categories(target.categories)
+            else:
+                text = series.where(series.isna(), series.astype(str))
+                columns[column] = text.astype(_categorical_dtype(dtype, text))
+        else:
+            columns[column] = series.astype(dtype) if series.notna().all() else series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def records_to_frame(records):
+    """Converte a lista de registros (dicionários) em DataFrame tipado"""
+    return apply_schema(pd.DataFrame.from_records(records))
+
+
+def frame_to_records(df):
+    """Converte o DataFrame tipado de volta para registros com tipos nativos do Python"""
+    frame = df.copy()
+    for column in DATETIME_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].dt.strftime(TIMESTAMP_FORMAT)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def csv_read_options(columns=None):
+    """
+    Argumentos de `pd.read_csv` que aplicam o esquema já na leitura
+
+    Args:
+        columns (list): colunas presentes no arquivo (padrão: todas do esquema)
+    """
+    columns = list(POPULATION_SCHEMA) if columns is None else columns
+    dtypes = {
+        column: POPULATION_SCHEMA[column]
+        for column in columns
+        if column in POPULATION_SCHEMA and column not in DATETIME_COLUMNS
+    }
+    return {'dtype': dtypes, 'encoding': ENCODING}
+
+
+def read_population_csv(path, usecols=None):
+    """
+    Lê um CSV de população com os tipos do esquema (sem inferência)
+
+    Se o arquivo violar o contrato (ex.: inteiros ausentes ou categorias
+    inesperadas), lê sem tipos e converte com `apply_schema`.
+    """
+    header = pd.read_csv(path, nrows=0, encoding=ENCODING).columns
+    columns = [column for column in header if usecols is None or column in usecols]
+    options = csv_read_options(columns)
+
+    try:
+        df = pd.read_csv(path, usecols=columns, **options)
+        if df[[c for c in columns if c in POPULATION_SCHEMA]].isna().any().any():
+            raise ValueError("valores fora do contrato")
+    except ValueError:
+        df = pd.read_csv(path, usecols=columns, encoding=ENCODING)
+    return apply_schema(df)
@@ -0,0 +1,226 @@
+"""
+Camada de dados compartilhada entre sessões do dashboard
+
+O painel (estado × ano) é mantido uma única vez por processo em arrays NumPy
+somente leitura. Os arrays podem ser mapeados em memória a partir de disco
+(`np.load(mmap_mode='r')`), de modo que vários processos do servidor
+compartilham as mesmas páginas. As linhas ficam ordenadas por (ano, região),
+então os filtros do dashboard viram fatias contíguas: DataFrames que apenas
+referenciam os arrays compartilhados, sem cópia. Colunas de data/hora são
+guardadas como int64 (nanossegundos desde a época) e voltam como datetime64.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config.data_config import SHARED_DATA_PATH, ENCODING
+from src.data.fingerprint import data_fingerprint
+from src.monitoring.instrumentation import echo
+
+SORT_COLUMNS = ['ano', 'regiao', 'nome']
+META_FILENAME = 'meta.json'
+# Versão do formato em disco (parte do nome do diretório; muda quando a codificação muda)
+STORE_FORMAT = 3
+
+
+class SharedPopulationDataset:
+    """Painel populacional somente leitura com filtros sem cópia"""
+
+    def __init__(self, arrays, categories, fingerprint, datetimes=None):
+        """
+        Args:
+            arrays (dict): coluna -> np.ndarray (códigos inteiros para colunas categóricas)
+            categories (dict): coluna categórica -> lista de categorias
+            fingerprint (str): impressão digital dos dados de origem
+            datetimes (dict): coluna de data/hora (int64 em ns) -> fuso horário ou None
+        """
+        self.arrays = arrays
+        self.categories = categories
+        self.datetimes = datetimes or {}
+        self.fingerprint = fingerprint
+        self.columns = list(arrays)
+        self._dtypes = {
+            column: pd.CategoricalDtype(values) for column, values in categories.items()
+        }
+
+        for array in self.arrays.values():
+            if array.flags.writeable:
+                array.setflags(write=False)
+
+        self._build_offsets()
+
+    def __len__(self):
+        return len(self.arrays[self.columns[0]]) if self.columns else 0
+
+    @property
+    def nbytes(self):
+        """Tamanho total dos arrays em bytes"""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Cria o conjunto compartilhado a partir de um DataFrame"""
+        fingerprint = data_fingerprint(df)
+        df = df.infer_objects()
+        sort_columns = [column for column in SORT_COLUMNS if column in df.columns]
+        if sort_columns:
+            df = df.sort_values(sort_columns, kind='stable')
+
+        arrays = {}
+        categories = {}
+        datetimes = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                # Datas viram int64 em ns (NaT = mínimo do int64); o fuso fica nos metadados
+                timezone = getattr(series.dtype, 'tz', None)
+                if timezone is not None:
+                    series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+                values = series.to_numpy(dtype='datetime64[ns]')
+                arrays[column] = np.ascontiguousarray(values.view(np.int64))
+                datetimes[column] = str(timezone) if timezone is not None else None
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                arrays[column] = np.ascontiguousarray(series.to_numpy())
+            else:
+                # Textos viram códigos inteiros + categorias (compacto e mapeável em memória);
+                # valores ausentes ficam com o código -1 (nulos na volta, não o texto 'nan')
+                categorical = pd.Categorical(series)
+                arrays[column] = np.ascontiguousarray(categorical.codes)
+                categories[column] = [str(value) for value in categorical.categories]
+
+        return cls(arrays, categories, fingerprint, datetimes)
+
+    def save(self, base_dir=SHARED_DATA_PATH):
+        """
+        Salva os arrays em um diretório versionado pela impressão digital
+
+        Um diretório existente nunca é sobrescrito, pois outros processos
+        podem estar com os arquivos mapeados em memória.
+        """
+        target_dir = os.path.join(base_dir, f"{self.fingerprint}.v{STORE_FORMAT}")
+        if os.path.exists(os.path.join(target_dir, META_FILENAME)):
+            return target_dir
+
+        tmp_dir = f"{target_dir}.tmp{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for column, array in self.arrays.items():
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), array)
+
+        meta = {
+            'fingerprint': self.fingerprint,
+            'columns': self.columns,
+            'categories': self.categories,
+            'datetimes': self.datetimes
+        }
+        with open(os.path.join(tmp_dir, META_FILENAME), 'w', encoding=ENCODING) as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            # Outro processo publicou a mesma versão primeiro
+            for filename in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, filename))
+            os.rmdir(tmp_dir)
+
+        return target_dir
+
+    @classmethod
+    def load(cls, target_dir, mmap_mode='r'):
+        """Carrega um conjunto salvo, mapeando os arrays em memória"""
+        with open(os.path.join(target_dir, META_FILENAME), 'r', encoding=ENCODING) as f:
+            meta = json.load(f)
+
+        arrays = {
+            column: np.load(os.path.join(target_dir, f"{column}.npy"), mmap_mode=mmap_mode)
+            for column in meta['columns']
+        }
+        return cls(arrays, meta['categories'], meta['fingerprint'], meta.get('datetimes'))
+
+    def _build_offsets(self):
+        """Calcula os intervalos contíguos de cada ano e de cada (ano, região)"""
+        self._year_offsets = {}
+        self._year_region_offsets = {}
+        if 'ano' not in self.arrays or len(self) == 0:
+            return
+
+        years = np.asarray(self.arrays['ano'])
+        keys = [years]
+        if 'regiao' in self.arrays:
+            keys.append(np.asarray(self.arrays['regiao']))
+
+        # Posições onde a chave (ano[, região]) muda
+        change = np.zeros(len(years), dtype=bool)
+        change[0] = True
+        for key in keys:
+            change[1:] |= key[1:] != key[:-1]
+        starts = np.flatnonzero(change)
+        stops = np.append(starts[1:], len(years))
+
+        for start, stop in zip(starts, stops):
+            year = int(years[start])
+            first, _ = self._year_offsets.get(year, (start, stop))
+            self._year_offsets[year] = (int(first), int(stop))
+            if 'regiao' in self.arrays:
+                code = self.arrays['regiao'][start]
+                if code < 0:
+                    # Região ausente: o código -1 indexaria a última categoria
+                    continue
+                region = self.categories['regiao'][code]
+                self._year_region_offsets[(year, region)] = (int(start), int(stop))
+
+    def years(self):
+        """Anos disponíveis"""
+        return sorted(self._year_offsets)
+
+    def regions(self):
+        """Regiões disponíveis"""
+        return list(self.categories.get('regiao', []))
+
+    def frame(self, ano=None, regiao=None, columns=None):
+        """
+        Retorna um DataFrame que referencia os arrays compartilhados
+
+        Filtros por ano e região resultam em fatias contíguas (sem cópia).
+        """
+        start, stop = 0, len(self)
+        if ano is not None and regiao is not None:
+            start, stop = self._year_region_offsets.get((int(ano), regiao), (0, 0))
+        elif ano is not None:
+            start, stop = self._year_offsets.get(int(ano), (0, 0))
+        elif regiao is not None:
+            # Região sem ano não é contígua: única situação com cópia
+            full = self.frame(columns=columns)
+            return full[full['regiao'] == regiao]
+
+        index = pd.RangeIndex(start, stop)
+        series = {}
+        for column in columns or self.columns:
+            values = self.arrays[column][start:stop]
+            if column in self._dtypes:
+                values = pd.Categorical.from_codes(values, dtype=self._dtypes[column])
+            elif column in self.datetimes:
+                # Visão datetime64 sobre os mesmos bytes (sem cópia)
+                values = values.view('datetime64[ns]')
+                if self.datetimes[column] is not None:
+                    values = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(self.datetimes[column])
+            series[column] = pd.Series(values, index=index, name=column, copy=False)
+
+        return pd.DataFrame(series, copy=False)
+
+
+def build_shared_dataset(df, base_dir=SHARED_DATA_PATH, mmap=True):
+    """Publica o DataFrame como conjunto compartilhado e o carrega (mapeado em memória)"""
+    dataset = SharedPopulationDataset.from_dataframe(df)
+    if not mmap:
+        return dataset
+
+    try:
+        target_dir = dataset.save(base_dir)
+        return SharedPopulationDataset.load(target_dir)
+    except OSError as e:
+        echo(f"⚠️ Não foi possível mapear os dados em memória: {e}")
+        return dataset
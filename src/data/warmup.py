@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Pré-aquecimento do cache de dados (para rodar via cron)
+
+As chaves do `DataCache` mudam a cada dia, então o primeiro acesso do dia
+ao dashboard pagaria as falhas de cache de todos os anos. Este comando busca
+de antemão todas as combinações (tipo de dado, ano) usadas pelo dashboard e
+pelas análises, em paralelo com número limitado de threads. Cada busca passa
+por `DataCache.get_or_fetch`, sob o mesmo lock por chave usado pelo pipeline
+e pelo dashboard: uma chave nunca é buscada duas vezes ao mesmo tempo e uma
+busca mais nova de outro processo não é sobrescrita. Cada entrada é trocada
+de forma atômica (arquivo temporário + rename): quem lê o cache vê a versão
+anterior ou a nova da chave, nunca um arquivo pela metade.
+
+Rodando perto da meia-noite com --tomorrow, as entradas do dia seguinte já
+estão prontas quando as chaves virarem.
+
+Uso:
+    python src/data/warmup.py [--workers 4] [--years 2020 2021] [--tomorrow] [--force]
+
+Exemplo de crontab:
+    55 23 * * * cd /caminho/do/projeto && python src/data/warmup.py --tomorrow
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Permite importar os módulos do projeto ao executar este arquivo diretamente
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.data_config import WARMUP_MAX_WORKERS
+from src.data.api_client import IBGEAPIClient, DataCache
+from src.monitoring.instrumentation import span, echo, write_metrics
+
+# Tipos de dado do cache consumidos pelo dashboard (DataManager.get_population_data, nível UF)
+WARMUP_DATA_TYPES = {
+    'population': lambda client, year: client.get_population_by_state(year)
+}
+
+
+def warmup_targets(client, years=None, data_types=None):
+    """Todas as combinações (tipo de dado, ano) a pré-carregar"""
+    years = years or client.get_available_years()
+    data_types = data_types or list(WARMUP_DATA_TYPES)
+    return [(data_type, year) for data_type in data_types for year in years]
+
+
+def _fetch(client, data_type, year):
+    """Busca uma combinação na API; retorna os registros ou None"""
+    with span('warmup.fetch', data_type=data_type, year=year) as attributes:
+        data = WARMUP_DATA_TYPES[data_type](client, year)
+        attributes['records'] = len(data) if data else 0
+        return data
+
+
+def _warm(cache, client, data_type, year, day, fresher_than):
+    """Busca e publica uma combinação pelo cache (lock por chave); retorna o status"""
+    data, from_cache = cache.get_or_fetch(
+        data_type, year, lambda: _fetch(client, data_type, year), day=day, fresher_than=fresher_than
+    )
+    if from_cache:
+        return 'fresh'
+    return 'warmed' if data else 'failed'
+
+
+def warm_cache(years=None, data_types=None, max_workers=WARMUP_MAX_WORKERS, day=None,
+               force=False, cache=None, client=None):
+    """
+    Pré-carrega o cache para o dia informado
+
+    Args:
+        years (list): anos a buscar (padrão: anos disponíveis na API)
+        data_types (list): tipos de dado (padrão: todos de WARMUP_DATA_TYPES)
+        max_workers (int): buscas simultâneas na API
+        day (datetime): dia das chaves do cache (padrão: hoje)
+        force (bool): busca de novo as entradas gravadas antes do início do aquecimento
+        cache (DataCache): cache de destino
+        client (IBGEAPIClient): cliente da API
+
+    Returns:
+        dict: (tipo de dado, ano) -> 'warmed', 'fresh' (já estava no cache) ou 'failed'
+    """
+    cache = cache or DataCache()
+    client = client or IBGEAPIClient()
+    # Com --force, só conta como atual o que for gravado a partir de agora
+    fresher_than = time.time() if force else None
+    results = {}
+
+    pending = []
+    for target in warmup_targets(client, years, data_types):
+        if not force and cache.has_entry(*target, day=day):
+            results[target] = 'fresh'
+        else:
+            pending.append(target)
+
+    # Entradas que falharam mantêm a versão anterior (resultados vazios não são gravados)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            target: executor.submit(_warm, cache, client, *target, day, fresher_than) for target in pending
+        }
+        for target, future in futures.items():
+            try:
+                results[target] = future.result()
+            except Exception as e:
+                echo(f"❌ Falha ao buscar {target}: {e}")
+                results[target] = 'failed'
+
+    return results
+
+
+def print_report(results):
+    """Imprime o resultado por combinação"""
+    icons = {'warmed': '🔥', 'fresh': '✅', 'failed': '❌'}
+    print("\n📋 Pré-aquecimento do cache:")
+    for (data_type, year), status in sorted(results.items()):
+        print(f"  {icons[status]} {data_type:<12} {year}  {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-aquecimento do cache de dados do IBGE")
+    parser.add_argument('--workers', type=int, default=WARMUP_MAX_WORKERS)
+    parser.add_argument('--years', type=int, nargs='*', help="anos a buscar (padrão: todos disponíveis)")
+    parser.add_argument('--tomorrow', action='store_true', help="prepara as chaves do dia seguinte")
+    parser.add_argument('--force', action='store_true', help="busca mesmo as entradas já válidas")
+    args = parser.parse_args()
+
+    day = datetime.now() + timedelta(days=1) if args.tomorrow else None
+    start = time.perf_counter()
+    results = warm_cache(years=args.years, max_workers=args.workers, day=day, force=args.force)
+    print_report(results)
+    print(f"⏱️ Concluído em {time.perf_counter() - start:.2f}s")
+    print(f"📈 Métricas da execução: {write_metrics()}")
+
+    if 'failed' in results.values():
+        sys.exit(1)
@@ -0,0 +1 @@
+# Módulo de instrumentação (métricas e perfil)
@@ -0,0 +1,261 @@
+"""
+Instrumentação: spans de tempo, contadores e perfil de execução
+
+Substitui os `print()` espalhados por medições estruturadas:
+
+    with span('http.request', url=url):
+        ...
+    increment('cache.hits')
+
+    @timed('cleaning.clean_population_data')
+    def clean_population_data(df): ...
+
+Cada span concluído vira um evento JSON (uma linha) no log de métricas e é
+agregado por nome (contagem, tempo total/máximo, erros). Os eventos ficam em
+memória e são gravados em lote (buffer cheio, `write_metrics()` ou saída do
+processo; tarefas de pools de processos usam `@worker_task`, pois os
+processos de trabalho saem sem rodar o `atexit`); o log é rotacionado por
+tamanho. `write_metrics()` grava o resumo e `profile()` gera um perfil
+cProfile da execução.
+
+As mensagens de progresso passam por `echo()`, que não imprime nada em
+produção (APP_ENV=production): a escrita no stdout tem custo em escala.
+"""
+
+import atexit
+import cProfile
+import functools
+import io
+import json
+import multiprocessing
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from config.data_config import (
+    INSTRUMENTATION_ENABLED, METRICS_EVENTS_FILE, METRICS_EVENTS_BUFFER, METRICS_EVENTS_MAX_BYTES,
+    METRICS_EVENTS_BACKUPS, METRICS_SUMMARY_FILE, VERBOSE_OUTPUT, ENCODING
+)
+
+
+class Instrumentation:
+    """Coletor de spans e contadores do processo (seguro entre threads)"""
+
+    def __init__(self, events_file=METRICS_EVENTS_FILE, enabled=INSTRUMENTATION_ENABLED,
+                 buffer_size=METRICS_EVENTS_BUFFER, max_bytes=METRICS_EVENTS_MAX_BYTES,
+                 backups=METRICS_EVENTS_BACKUPS):
+        self.events_file = events_file
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Zera contadores e agregados (o log de eventos não é apagado)"""
+        with self._lock:
+            self._counters = defaultdict(float)
+            self._spans = defaultdict(lambda: {'count': 0, 'errors': 0, 'total_s': 0.0, 'max_s': 0.0})
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Mede um trecho de código; atributos extras vão para o evento"""
+        if not self.enabled:
+            yield attributes
+            return
+
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        status = 'ok'
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            self._record(name, duration, status, parent, attributes)
+
+    def _record(self, name, duration, status, parent, attributes):
+        with self._lock:
+            aggregate = self._spans[name]
+            aggregate['count'] += 1
+            aggregate['errors'] += status == 'error'
+            aggregate['total_s'] += duration
+            aggregate['max_s'] = max(aggregate['max_s'], duration)
+
+        if self.events_file:
+            event = {
+                'ts': datetime.now().isoformat(timespec='milliseconds'),
+                'span': name,
+                'parent': parent,
+                'duration_ms': round(duration * 1000, 3),
+                'status': status,
+                'thread': threading.current_thread().name,
+                **attributes
+            }
+            with self._lock:
+                self._events.append(event)
+                full = len(self._events) >= self.buffer_size
+            if full:
+                self.flush_events()
+
+    def flush_events(self):
+        """Grava os eventos em memória no log (uma escrita por lote)"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events or not self.events_file:
+                return
+
+            payload = ''.join(
+                json.dumps(event, ensure_ascii=False, default=str) + '\n' for event in events
+            ).encode(ENCODING)
+            os.makedirs(os.path.dirname(self.events_file) or '.', exist_ok=True)
+            self._rotate(len(payload))
+            with open(self.events_file, 'ab') as f:
+                f.write(payload)
+
+    def _rotate(self, incoming):
+        """Rotaciona o log (events.jsonl -> .1 -> .2 ...) se passar de `max_bytes`"""
+        try:
+            size = os.path.getsize(self.events_file)
+        except OSError:
+            return
+        if not self.max_bytes or size + incoming <= self.max_bytes:
+            return
+
+        if self.backups <= 0:
+            os.remove(self.events_file)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.events_file}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.events_file}.{index + 1}")
+        os.replace(self.events_file, f"{self.events_file}.1")
+
+    def increment(self, counter, value=1):
+        """Soma `value` ao contador (acertos de cache, retentativas, bytes...)"""
+        if self.enabled:
+            with self._lock:
+                self._counters[counter] += value
+
+    def snapshot(self):
+        """Resumo atual: contadores e agregados por span"""
+        with self._lock:
+            spans = {
+                name: {**values, 'mean_s': values['total_s'] / values['count'] if values['count'] else 0.0}
+                for name, values in self._spans.items()
+            }
+            counters = {name: int(value) if float(value).is_integer() else value
+                        for name, value in self._counters.items()}
+        return {'counters': counters, 'spans': spans}
+
+    def write_metrics(self, path=METRICS_SUMMARY_FILE):
+        """Grava o resumo em JSON (arquivo temporário + rename) e descarrega os eventos"""
+        self.flush_events()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        summary = {'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), **self.snapshot()}
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding=ENCODING) as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+
+# Instância compartilhada por todo o processo (eventos pendentes gravados na saída)
+_instrumentation = Instrumentation()
+atexit.register(_instrumentation.flush_events)
+
+
+def get_instrumentation():
+    """Retorna o coletor de métricas do processo"""
+    return _instrumentation
+
+
+def span(name, **attributes):
+    """Atalho para `get_instrumentation().span(...)`"""
+    return _instrumentation.span(name, **attributes)
+
+
+def increment(counter, value=1):
+    """Atalho para `get_instrumentation().increment(...)`"""
+    _instrumentation.increment(counter, value)
+
+
+def write_metrics(path=METRICS_SUMMARY_FILE):
+    """Atalho para `get_instrumentation().write_metrics(...)`"""
+    return _instrumentation.write_metrics(path)
+
+
+def timed(name):
+    """Decorador que envolve a função em um span"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _instrumentation.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def worker_task(function):
+    """
+    Decorador para funções executadas em pools de processos
+
+    Os processos de trabalho terminam com `os._exit` (sem `atexit`): os eventos
+    pendentes são gravados ao fim de cada tarefa. No processo principal não muda nada.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if multiprocessing.parent_process() is not None:
+                _instrumentation.flush_events()
+    return wrapper
+
+
+def echo(*args, **kwargs):
+    """`print()` para mensagens de progresso; silencioso em produção"""
+    if VERBOSE_OUTPUT:
+        print(*args, **kwargs)
+
+
+@contextmanager
+def profile(path, top=25):
+    """
+    Perfila o bloco com cProfile e grava o resultado em `path` (.prof)
+
+    O arquivo pode ser aberto com `python -m pstats` ou snakeviz; um resumo
+    das funções mais caras (tempo acumulado) é gravado ao lado, em `.txt`.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(top)
+        with open(f"{os.path.splitext(path)[0]}.txt", 'w', encoding=ENCODING) as f:
+            f.write(summary.getvalue())